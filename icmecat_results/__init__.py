@@ -0,0 +1,6 @@
+'''
+Analysis package for the Möstl et al. (2026) ICMECAT paper.
+
+The notebook moestl_icmecat_results.ipynb produces the paper figures, the
+modules here are the catalog-wide building blocks it and later batch runs use.
+'''
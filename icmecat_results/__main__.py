@@ -0,0 +1,45 @@
+'''
+Command line entry point, run from the top level directory of the repository:
+
+    python -m icmecat_results --stages fits,fig4 --jobs 8
+    python -m icmecat_results --list
+'''
+
+import argparse
+import matplotlib
+
+#non-interactive backend before pyplot is imported by the stages
+matplotlib.use('Agg')
+
+from icmecat_results import stages
+
+
+def main(argv=None):
+    parser=argparse.ArgumentParser(prog='python -m icmecat_results',description='ICMECAT paper results in batch mode')
+    parser.add_argument('--stages',default=','.join(stages.default),help='comma separated stages, dependencies are added (default: %(default)s)')
+    parser.add_argument('--jobs',type=int,default=None,help='worker processes for the parallel stages')
+    parser.add_argument('--min-quality',type=float,default=None,help='fits only with events of at least this quality_score, adds the quality stage')
+    parser.add_argument('--aged',action='store_true',help='fits with the aging corrected mo_bmean_aged instead of mo_bmean, adds the aging stage')
+    parser.add_argument('--list',action='store_true',help='list the stages and their dependencies')
+    args=parser.parse_args(argv)
+
+    if args.list:
+        for name,(_,deps) in stages.stages.items():
+            print(f"{name:10s} needs {', '.join(deps) if deps else '-'}")
+        return
+
+    names=[s.strip() for s in args.stages.split(',') if s.strip()]
+    if args.min_quality is not None:
+        names=['quality']+names
+    if args.aged:
+        names=['aging']+names
+    try:
+        order=stages.resolve(names)
+    except ValueError as e:
+        parser.error(str(e))
+    print('running',', '.join(order))
+    stages.run(order,jobs=args.jobs,ctx={'min_quality':args.min_quality})
+
+
+if __name__=='__main__':
+    main()
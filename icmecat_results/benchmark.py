@@ -0,0 +1,205 @@
+'''
+Regression benchmark of the pipeline stages: fit results and runtime.
+
+Runs stages of stages.py on the catalog in icmecat/ and the stages that need
+the in situ files, with the files in data/ if they are there; otherwise
+synthetic files (synthetic.write_insitu) are written to a temporary
+directory for the run, or with --no-synthetic these stages are skipped.
+Each stage is timed, with the peak resident memory of the process after the
+stage; with trace_memory the peak of the memory allocated in the stage is
+taken with tracemalloc in an extra run, as tracing slows the stages.
+
+The B(r) fit parameters from the fits stage are checked against the
+reference values of the ICMECAT v23 below: a parameter passes if it is
+within rtol of the reference or within sigma_tol of its standard deviation,
+and the number of events must be the same.
+
+Every run appends one row per stage to results/benchmark_history.csv, and
+stage times are compared with the median of the last runs in the history.
+
+    python -m icmecat_results.benchmark
+    python -m icmecat_results.benchmark --stages fits,mcmc --repeat 3 --trace-memory
+
+The exit code is 1 if a check fails, for use in scripts.
+'''
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+import resource
+import argparse
+import datetime
+import subprocess
+import tracemalloc
+import numpy as np
+import pandas as pd
+import matplotlib
+import matplotlib.pyplot as plt
+
+from icmecat_results import data, stages, synthetic
+
+
+history_file='results/benchmark_history.csv'
+
+#fit parameters, standard deviations and number of events for HELIO4CAST_ICMECAT_v23_pandas.p
+reference={'loglog_1au':([-1.5834763,0.99955442],[0.030805498,0.0053960708],1524),
+           'loglog_all':([-1.4652668,1.0085330],[0.015475135,0.0044198630],1972),
+           'powerlaw_bmean':([10.722216,-1.5685194],[0.19300855,0.0084868491],1972),
+           'powerlaw_bmax':([14.922832,-1.5305029],[0.29046817,0.0094007410],1972),
+           'multipower':([10.548703,2.0225736e-06],[0.084579999,3.9305509e-12],1973)}
+
+rtol=1e-6
+sigma_tol=0.01
+
+catalog_stages=['catalog','stats','fits','fig4','export']
+insitu_stages=['insitu','quality','fig2','fig5','windows','shocks']
+
+
+def has_insitu(path=data.data_path):
+    return all(os.path.exists(path+f) for f in data.insitu_files.values())
+
+
+def default_stages(synthetic_data=True):
+    '''
+    catalog and in situ stages and the path of the in situ files: data/ if all
+    files are there, else a temporary directory with synthetic files, which the
+    caller removes; with synthetic_data=False the in situ stages are skipped
+    and the path is None
+    '''
+    if has_insitu():
+        return catalog_stages+insitu_stages,data.data_path
+    if not synthetic_data:
+        print('no in situ files in',data.data_path+', skipped stages:',', '.join(insitu_stages))
+        return catalog_stages,None
+    path=tempfile.mkdtemp(prefix='icmecat_benchmark_')+'/'
+    print('no in situ files in',data.data_path+', writing synthetic files to',path)
+    synthetic.write_insitu(data.load_icmecat()[0],path=path)
+    return catalog_stages+insitu_stages,path
+
+
+def check_fits(results,reference=reference,rtol=rtol,sigma_tol=sigma_tol):
+    '''one row per fit parameter with value, reference, deviation in sigma and pass'''
+    rows=[]
+    for name,(ref,err,n) in reference.items():
+        fit=results['fits'].get(name)
+        for k,(r,e) in enumerate(zip(ref,err)):
+            value=fit['param'][k] if fit is not None else np.nan
+            dev=abs(value-r)
+            ok=bool((dev <= rtol*abs(r)) or (dev <= sigma_tol*e))
+            if fit is not None and fit['attrs']['n']!=n:
+                ok=False
+            rows.append({'fit':name,'param':k,'value':value,'reference':r,'sigma':dev/e,
+                         'n':fit['attrs']['n'] if fit is not None else 0,'n_reference':n,'ok':ok})
+    return pd.DataFrame(rows)
+
+
+def _commit():
+    try:
+        return subprocess.run(['git','rev-parse','--short','HEAD'],capture_output=True,text=True,timeout=10).stdout.strip()
+    except (OSError,subprocess.SubprocessError):
+        return ''
+
+
+def _max_rss():
+    '''peak resident memory of this process in MB (ru_maxrss is in kB on linux, bytes on macOS)'''
+    rss=resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss/1e6 if sys.platform=='darwin' else rss/1e3
+
+
+def time_stages(names,jobs=None,repeat=1,trace_memory=False,data_path=data.data_path):
+    '''
+    runs the stages with their dependencies repeat times, one row per stage
+    and run with seconds and the process peak memory in MB after the stage;
+    with trace_memory one more run gives the traced peak of each stage;
+    returns the rows and the context of the last timed run
+    '''
+    #the figure and export stages write to results/, which a fresh checkout does not have
+    os.makedirs('results',exist_ok=True)
+    rows=[]
+    for run in range(repeat):
+        ctx={'jobs':jobs,'data_path':data_path}
+        for name in stages.resolve(names):
+            t0=time.perf_counter()
+            stages.stages[name][0](ctx)
+            seconds=time.perf_counter()-t0
+            plt.close('all')
+            rows.append({'run':run,'stage':name,'seconds':seconds,'rss_mb':_max_rss()})
+    timing=pd.DataFrame(rows)
+    timing['traced_mb']=np.nan
+    if trace_memory:
+        traced={}
+        tctx={'jobs':jobs,'data_path':data_path}
+        for name in stages.resolve(names):
+            tracemalloc.start()
+            stages.stages[name][0](tctx)
+            traced[name]=tracemalloc.get_traced_memory()[1]/1e6
+            tracemalloc.stop()
+            plt.close('all')
+        timing['traced_mb']=timing.stage.map(traced)
+    return timing,ctx
+
+
+def compare_history(timing,history=history_file,last=5):
+    '''median seconds per stage of the last runs in history and the ratio of this run to it'''
+    res=timing.groupby('stage',sort=False).seconds.median().to_frame()
+    if history is None or not os.path.exists(history):
+        res['history_seconds']=np.nan
+    else:
+        h=pd.read_csv(history)
+        h=h[h.run_id.isin(h.run_id.drop_duplicates().iloc[-last:])]
+        res['history_seconds']=h.groupby('stage').seconds.median().reindex(res.index)
+    res['ratio']=res.seconds/res.history_seconds
+    return res
+
+
+def append_history(timing,history=history_file):
+    '''appends the timing rows with run id, date and commit'''
+    now=datetime.datetime.now(datetime.timezone.utc)
+    out=timing.assign(run_id=now.strftime('%Y%m%dT%H%M%S'),date=now.isoformat(),commit=_commit())
+    os.makedirs(os.path.dirname(history),exist_ok=True)
+    out.to_csv(history,mode='a',header=not os.path.exists(history),index=False)
+
+
+def run_benchmark(names=None,jobs=None,repeat=1,trace_memory=False,history=history_file,synthetic_data=True):
+    '''timing, history comparison and fit checks; True if all checks pass'''
+    data_path=data.data_path
+    if names is None:
+        names,data_path=default_stages(synthetic_data)
+    if 'fits' not in names:
+        names=names+['fits']
+    try:
+        timing,ctx=time_stages(names,jobs,repeat,trace_memory,data_path or data.data_path)
+    finally:
+        if data_path not in (None,data.data_path):
+            shutil.rmtree(data_path)
+    memory=timing.groupby('stage')[['rss_mb','traced_mb']].max()
+    print(compare_history(timing,history).join(memory).round(3).to_string())
+    if history:
+        append_history(timing,history)
+    checks=check_fits(ctx['results'])
+    print(checks.to_string(index=False))
+    ok=bool(checks.ok.all())
+    print('all checks passed' if ok else 'CHECKS FAILED')
+    return ok
+
+
+def main(argv=None):
+    parser=argparse.ArgumentParser(prog='python -m icmecat_results.benchmark',description='regression benchmark of the pipeline stages')
+    parser.add_argument('--stages',default=None,help='comma separated stages (default: '+','.join(catalog_stages+insitu_stages)+')')
+    parser.add_argument('--jobs',type=int,default=None,help='worker processes for the parallel stages')
+    parser.add_argument('--repeat',type=int,default=1,help='runs of all stages')
+    parser.add_argument('--trace-memory',action='store_true',help='extra run with tracemalloc for the memory allocated in each stage')
+    parser.add_argument('--no-synthetic',action='store_true',help='skip the in situ stages if there are no files in '+data.data_path+' instead of writing synthetic ones')
+    parser.add_argument('--no-history',action='store_true',help='do not append to '+history_file)
+    args=parser.parse_args(argv)
+    names=None if args.stages is None else [s.strip() for s in args.stages.split(',') if s.strip()]
+    ok=run_benchmark(names,args.jobs,args.repeat,args.trace_memory,history=None if args.no_history else history_file,synthetic_data=not args.no_synthetic)
+    return 0 if ok else 1
+
+
+if __name__=='__main__':
+    #no figures are open yet, so the backend can still be switched
+    matplotlib.use('Agg')
+    sys.exit(main())
@@ -0,0 +1,125 @@
+'''
+Multi-spacecraft conjunctions from the hourly HEEQ positions file.
+
+All pairs of bodies are compared at once on vectorized differences in time
+blocks, a pair is in conjunction while its longitude, latitude and radial
+distance differences are all within the tolerances. Each conjunction interval
+is cross-matched with the ICMECAT events of both bodies.
+'''
+
+import numpy as np
+import pandas as pd
+import matplotlib.dates as mdates
+
+from icmecat_results.data import time_num, sc_bodies
+from icmecat_results.windows import segment_indices
+
+
+def position_array(pos,bodies=None):
+    '''
+    common time grid and array (n_bodies, n_times, 3) of r [au], lon, lat [rad];
+    tracks with a different time grid are interpolated onto the first one
+    '''
+    if bodies is None:
+        bodies=list(pos.keys())
+    t=time_num(pos[bodies[0]].time)
+    p=np.empty((len(bodies),len(t),3))
+    for k,b in enumerate(bodies):
+        tb=time_num(pos[b].time)
+        if len(tb)==len(t) and np.all(tb==t):
+            p[k,:,0]=pos[b].r
+            p[k,:,1]=pos[b].lon
+            p[k,:,2]=pos[b].lat
+        else:
+            p[k,:,0]=np.interp(t,tb,pos[b].r,left=np.nan,right=np.nan)
+            p[k,:,1]=np.interp(t,tb,np.unwrap(pos[b].lon),left=np.nan,right=np.nan)
+            p[k,:,2]=np.interp(t,tb,pos[b].lat,left=np.nan,right=np.nan)
+    return t,p
+
+
+def conjunction_mask(p,dlon=10,dlat=10,dr=None,block=8760):
+    '''
+    boolean array (n_pairs, n_times) for all pairs i < j of bodies in p,
+    tolerances in degrees and au, dr=None for radial alignments at any distance
+    '''
+    i,j=np.triu_indices(p.shape[0],k=1)
+    n=p.shape[1]
+    mask=np.zeros((len(i),n),dtype=bool)
+    dlon=np.radians(dlon)
+    dlat=np.radians(dlat)
+
+    for k in range(0,n,block):
+        a=p[i,k:k+block]
+        b=p[j,k:k+block]
+        d=a-b
+        #longitude difference wrapped to -pi .. pi
+        dl=np.abs((d[...,1]+np.pi) % (2*np.pi)-np.pi)
+        m=(dl <= dlon) & (np.abs(d[...,2]) <= dlat)
+        if dr is not None:
+            m&=np.abs(d[...,0]) <= dr
+        mask[:,k:k+block]=m
+    return i,j,mask
+
+
+def runs(mask):
+    '''start and end index (inclusive) of all runs of True along the last axis, with row number'''
+    padded=np.zeros((mask.shape[0],mask.shape[1]+2),dtype=np.int8)
+    padded[:,1:-1]=mask
+    d=np.diff(padded,axis=1)
+    row,start=np.nonzero(d==1)
+    _,end=np.nonzero(d==-1)
+    return row,start,end-1
+
+
+def find_conjunctions(pos,bodies=None,dlon=10,dlat=10,dr=None,min_hours=1,block=8760):
+    '''
+    all conjunction intervals between pairs of bodies as dataframe with the
+    bodies, start and end time and the minimum longitude separation in degrees
+    '''
+    if bodies is None:
+        bodies=list(pos.keys())
+    t,p=position_array(pos,bodies)
+    i,j,mask=conjunction_mask(p,dlon,dlat,dr,block)
+    row,start,end=runs(mask)
+
+    dt=np.median(np.diff(t))*24
+    keep=(end-start+1)*dt >= min_hours
+    row,start,end=row[keep],start[keep],end[keep]
+
+    #minimum longitude separation in each interval with a segmented reduction
+    ind,seg=segment_indices(start,end+1)
+    dl=np.degrees(np.abs((p[i[row[seg]],ind,1]-p[j[row[seg]],ind,1]+np.pi) % (2*np.pi)-np.pi))
+    minlon=np.minimum.reduceat(dl,np.cumsum(end-start+1)-(end-start+1)) if len(row) > 0 else np.array([])
+
+    conj=pd.DataFrame({'body1':np.array(bodies)[i[row]],'body2':np.array(bodies)[j[row]],
+                       'start_time':mdates.num2date(t[start]),'end_time':mdates.num2date(t[end]),
+                       'hours':(end-start+1)*dt,'min_dlon':minlon})
+    return conj.sort_values('start_time').reset_index(drop=True)
+
+
+def match_events(conj,ic,slack=3.0,bodies=sc_bodies):
+    '''
+    adds the icmecat_ids of events with mo_start_time during each conjunction
+    (extended by slack days on both sides) at body1 and body2 as list columns
+    '''
+    conj=conj.copy()
+    t=time_num(ic.mo_start_time.to_numpy())
+    body=ic.sc_insitu.map(bodies).to_numpy()
+    ids=ic.icmecat_id.to_numpy()
+
+    t0=time_num(conj.start_time.to_numpy())-slack
+    t1=time_num(conj.end_time.to_numpy())+slack
+    #event times sorted for each body, looked up with searchsorted for all conjunctions of the body
+    for col in ['body1','body2']:
+        matched=np.empty(len(conj),dtype=object)
+        for b in np.unique(conj[col]):
+            k=np.where(conj[col].to_numpy()==b)[0]
+            sel=np.where(body==b)[0]
+            order=sel[np.argsort(t[sel])]
+            a=np.searchsorted(t[order],t0[k])
+            e=np.searchsorted(t[order],t1[k])
+            for m,a1,e1 in zip(k,a,e):
+                matched[m]=list(ids[order[a1:e1]])
+        conj['events_'+col]=matched
+    conj['multi']=(conj.events_body1.str.len() > 0) & (conj.events_body2.str.len() > 0)
+    return conj
@@ -0,0 +1,91 @@
+'''
+Batch coordinate transforms between HEEQ spherical, HEEQ cartesian and the
+spacecraft-centred RTN frame.
+
+Angles are in radians as in the positions file, distances in au. All
+functions work on whole arrays and can write into preallocated outputs.
+RTN rotation matrices are computed once per position time step (e.g. the
+1 h positions) and applied to all data samples in that time block, so the
+1 minute PSP and Solar Orbiter data need no per-sample matrix.
+'''
+
+import numpy as np
+
+from icmecat_results.data import time_num
+
+
+def sphere2cart(r,lon,lat,out=None):
+    '''HEEQ spherical to cartesian, returns array (n, 3) of x, y, z'''
+    r=np.asarray(r,dtype=float)
+    if out is None:
+        out=np.empty(r.shape+(3,))
+    coslat=np.cos(lat)
+    np.multiply(r*coslat,np.cos(lon),out=out[...,0])
+    np.multiply(r*coslat,np.sin(lon),out=out[...,1])
+    np.multiply(r,np.sin(lat),out=out[...,2])
+    return out
+
+
+def cart2sphere(xyz,out=None):
+    '''HEEQ cartesian (n, 3) to spherical, returns array (n, 3) of r, lon, lat'''
+    xyz=np.asarray(xyz,dtype=float)
+    if out is None:
+        out=np.empty(xyz.shape)
+    x,y,z=xyz[...,0],xyz[...,1],xyz[...,2]
+    rho=np.hypot(x,y)
+    np.hypot(rho,z,out=out[...,0])
+    np.arctan2(y,x,out=out[...,1])
+    np.arctan2(z,rho,out=out[...,2])
+    return out
+
+
+def rtn_matrices(xyz):
+    '''
+    rotation matrices (n, 3, 3) from HEEQ to RTN for spacecraft positions xyz;
+    R points away from the Sun, T is Z_HEEQ x R, N completes the right-handed system
+    '''
+    xyz=np.asarray(xyz,dtype=float)
+    m=np.empty(xyz.shape[:-1]+(3,3))
+    rad=xyz/np.linalg.norm(xyz,axis=-1)[...,None]
+    tan=np.cross(np.array([0.0,0.0,1.0]),rad)
+    tan/=np.linalg.norm(tan,axis=-1)[...,None]
+    m[...,0,:]=rad
+    m[...,1,:]=tan
+    m[...,2,:]=np.cross(rad,tan)
+    return m
+
+
+def rtn_frame(pos):
+    '''
+    RTN frame of a position recarray (time, r, lon, lat), with the rotation
+    matrices for each time step; compute once and pass to to_rtn / from_rtn
+    '''
+    return {'time':time_num(pos.time),'matrices':rtn_matrices(sphere2cart(pos.r,pos.lon,pos.lat))}
+
+
+def _rotate(frame,time,vec,out,transpose,chunk):
+    t=time_num(time)
+    vec=np.asarray(vec,dtype=float)
+    if out is None:
+        out=np.empty(vec.shape)
+    #matrix of the time block each sample belongs to
+    ind=np.clip(np.searchsorted(frame['time'],t,side='right')-1,0,len(frame['time'])-1)
+    sub='nji,nj->ni' if transpose else 'nij,nj->ni'
+    for k in range(0,len(t),chunk):
+        np.einsum(sub,frame['matrices'][ind[k:k+chunk]],vec[k:k+chunk],out=out[k:k+chunk])
+    return out
+
+
+def to_rtn(frame,time,vec,out=None,chunk=200000):
+    '''HEEQ vectors (n, 3) at times to RTN of the spacecraft in frame'''
+    return _rotate(frame,time,vec,out,False,chunk)
+
+
+def from_rtn(frame,time,vec,out=None,chunk=200000):
+    '''RTN vectors (n, 3) at times back to HEEQ'''
+    return _rotate(frame,time,vec,out,True,chunk)
+
+
+def relative_rtn(frame,time,sc_xyz,target_xyz,out=None,chunk=200000):
+    '''position of targets relative to the spacecraft, in the spacecraft RTN frame'''
+    return to_rtn(frame,time,np.asarray(target_xyz)-np.asarray(sc_xyz),out,chunk)
@@ -0,0 +1,52 @@
+'''
+Loading of the ICMECAT and the in situ data files used for the paper.
+
+File names and paths are the same as in moestl_icmecat_results.py, so
+everything is run from the top level directory of the repository.
+'''
+
+import pickle
+import numpy as np
+import matplotlib.dates as mdates
+
+
+icmecat_file='icmecat/HELIO4CAST_ICMECAT_v23_pandas.p'
+data_path='data/'
+positions_file='positions/positions_2020_all_HEEQ_1h_rad_cm.p'
+
+#in situ data files for each ic.sc_insitu name, available in figshare version 27
+insitu_files={'PSP':'psp_2018_now_rtn.p',
+              'SolarOrbiter':'solo_2020_now_rtn.p'}
+
+#order of the bodies in the positions file
+position_bodies=['PSP','BepiColombo','SolarOrbiter','STEREO-A','JUICE','Earth','Mercury','Venus','Mars',
+                 'Jupiter','Saturn','Uranus','Neptune','L4','L5']
+
+#position track for each ic.sc_insitu name, Wind is at L1 close to Earth
+sc_bodies={'PSP':'PSP','SolarOrbiter':'SolarOrbiter','BepiColombo':'BepiColombo','STEREO-A':'STEREO-A','Wind':'Earth'}
+
+
+def load_icmecat(file=icmecat_file):
+    '''returns the catalog as pandas dataframe, the header and the parameter description'''
+    [ic,h,p]=pickle.load(open(file,'rb'))
+    return ic,h,p
+
+
+def load_insitu(sc,path=data_path,files=insitu_files):
+    '''returns the in situ recarray for spacecraft name sc, e.g. "PSP"'''
+    [data,header]=pickle.load(open(path+files[sc],'rb'))
+    return data
+
+
+def load_positions(file=positions_file):
+    '''returns a dict of position recarrays (time, r [au], lon, lat [rad] HEEQ) for each body'''
+    pos=pickle.load(open(file,'rb'))
+    return dict(zip(position_bodies,pos))
+
+
+def time_num(time):
+    '''matplotlib date numbers for arrays of datetimes, numbers are passed through'''
+    time=np.asarray(time)
+    if time.dtype.kind in 'fi':
+        return time.astype(float)
+    return mdates.date2num(time)
@@ -0,0 +1,145 @@
+'''
+Expansion speed and aging corrected mean field of the magnetic obstacles.
+
+The proton speed inside every MO is fitted with a line V(t) = V0 + k t; the
+sufficient statistics of all events of a data file are segmented sums
+(windows.segment_indices with np.bincount) and the fits are solved at once
+with fits.linear_from_stats. As in the catalog, the expansion speed is
+V(mo_start_time) - V(mo_end_time), and the dimensionless expansion rate is
+zeta = (dV/dt) D / Vc^2 (Démoulin et al. 2008), with the center speed Vc and
+the heliocentric distance D.
+
+Aging: the MO keeps expanding while it passes the spacecraft, with B
+proportional to D^(-2 zeta) for a self-similar expansion. Every |B| sample
+at time t is scaled to the MO center time tc with (1 + Vc (t - tc) / D)^(2 zeta)
+before the mean is taken. The corrected mo_bmean_aged is added as a catalog
+column; the aging stage (python -m icmecat_results --aged) adds it before
+the fits, which then use it in place of mo_bmean (export.collect field).
+'''
+
+import numpy as np
+import pandas as pd
+import astropy.constants as const
+
+from icmecat_results import fits
+from icmecat_results.data import load_insitu, time_num, data_path, insitu_files
+from icmecat_results.windows import event_indices, segment_indices, map_files
+
+
+au_km=const.au.value/1e3
+
+columns=['n_v','v_start','v_end','v_exp','v_center','zeta','bmean','bmean_aged']
+
+#lower limit of 1 + Vc (t - tc) / D, close to the Sun the correction is not defined for long MOs
+min_base=0.1
+
+
+def aging_base(v_center,dt_hours,r):
+    '''1 + Vc (t - tc) / D for speed in km/s, time from the MO center in hours and D in au'''
+    return np.maximum(1+v_center*dt_hours*3600/(r*au_km),min_base)
+
+
+def expansion_data(data,ic,tnum=None,zeta=None):
+    '''
+    linear fits of the speed and aging corrected mean |B| for all events in ic
+    within the recarray data, array (n_events, len(columns)); zeta is taken
+    from the fits, or the given value for all events
+    '''
+    t=time_num(data.time) if tnum is None else tnum
+    start=np.clip(event_indices(t,ic.mo_start_time.to_numpy())+1,0,len(t))
+    end=np.clip(event_indices(t,ic.mo_end_time.to_numpy())+1,0,len(t))
+    ind,seg=segment_indices(start,end)
+    ne=len(ic)
+
+    #hours since mo_start_time
+    t0=time_num(ic.mo_start_time.to_numpy())
+    duration=(time_num(ic.mo_end_time.to_numpy())-t0)*24
+    tt=(t[ind]-t0[seg])*24
+
+    v=np.asarray(data.vt,dtype=float)[ind]
+    ok=np.isfinite(v)
+    v=np.where(ok,v,0.0)
+    x=np.where(ok,tt,0.0)
+    sums=lambda w: np.bincount(seg,weights=w,minlength=ne)
+    stats=np.array([sums(ok.astype(float)),sums(x),sums(v),sums(x*x),sums(x*v),sums(v*v)])
+    with np.errstate(divide='ignore',invalid='ignore'):
+        (k,v0),cov=fits.linear_from_stats(stats)
+    v_start=v0
+    v_end=v0+k*duration
+    v_center=v0+k*duration/2
+    r=ic.mo_sc_heliodistance.to_numpy().astype(float)
+    with np.errstate(divide='ignore',invalid='ignore'):
+        z=(v_start-v_end)/(duration*3600)*r*au_km/v_center**2
+    z[stats[0] < 3]=np.nan
+    zz=z if zeta is None else np.full(ne,float(zeta))
+
+    b=np.asarray(data.bt,dtype=float)[ind]
+    okb=np.isfinite(b)
+    b=np.where(okb,b,0.0)
+    factor=aging_base(v_center[seg],tt-duration[seg]/2,r[seg])**(2*zz[seg])
+    nb=sums(okb.astype(float))
+    with np.errstate(divide='ignore',invalid='ignore'):
+        bmean=sums(b)/nb
+        aged=sums(b*factor)/nb
+    return np.column_stack([stats[0],v_start,v_end,v_start-v_end,v_center,z,bmean,aged])
+
+
+def _expansion_file(args):
+    sc,ic,path,files,zeta=args
+    data=load_insitu(sc,path=path,files=files)
+    return expansion_data(data,ic,zeta=zeta)
+
+
+def expansion_catalog(ic,path=data_path,files=insitu_files,zeta=None,jobs=None):
+    '''expansion fits for every event with in situ data in files, one worker per file'''
+    out=np.full((len(ic),len(columns)),np.nan)
+    for ind,res in map_files(_expansion_file,ic,(zeta,),path,files,jobs):
+        out[ind]=res
+    res=pd.DataFrame(out,columns=columns)
+    res.insert(0,'icmecat_id',ic.icmecat_id.to_numpy())
+    return res
+
+
+def catalog_aging(ic,zeta=None,n=51):
+    '''
+    zeta and mean aging factor from the catalog columns mo_expansion_speed,
+    mo_speed_mean and mo_duration, for events without in situ data files;
+    the factor is averaged over n times in the MO, for a flat |B| profile
+    '''
+    v_exp=ic.mo_expansion_speed.to_numpy().astype(float)
+    v_center=ic.mo_speed_mean.to_numpy().astype(float)
+    duration=ic.mo_duration.to_numpy().astype(float)
+    r=ic.mo_sc_heliodistance.to_numpy().astype(float)
+    with np.errstate(divide='ignore',invalid='ignore'):
+        z=v_exp/(duration*3600)*r*au_km/v_center**2
+    zz=z if zeta is None else np.where(np.isfinite(v_center),float(zeta),np.nan)
+    dt=(np.linspace(0,1,n)[None,:]-0.5)*duration[:,None]
+    factor=np.mean(aging_base(v_center[:,None],dt,r[:,None])**(2*zz[:,None]),axis=1)
+    return z,factor
+
+
+def corrected_catalog(ic,res=None,zeta=None):
+    '''
+    copy of ic with mo_expansion_speed_fit, mo_zeta, mo_bmean_aged and
+    aging_source: 'data' from the fits in res (from expansion_catalog),
+    'catalog' from catalog_aging, 'none' where neither is available and
+    mo_bmean is kept; export.collect(ic, field='mo_bmean_aged') runs the
+    paper fits on the corrected field
+    '''
+    ic=ic.copy()
+    z,factor=catalog_aging(ic,zeta)
+    aged=ic.mo_bmean.to_numpy()*factor
+    source=np.where(np.isfinite(aged),'catalog','none').astype(object)
+    vexp=np.full(len(ic),np.nan)
+    if res is not None:
+        fromdata=np.isfinite(res.bmean_aged.to_numpy())
+        z=np.where(fromdata,res.zeta.to_numpy(),z)
+        vexp=res.v_exp.to_numpy()
+        #the field of the catalog scaled with the aging of the data
+        aged=np.where(fromdata,ic.mo_bmean.to_numpy()*res.bmean_aged.to_numpy()/res.bmean.to_numpy(),aged)
+        source[fromdata]='data'
+    ic['mo_expansion_speed_fit']=vexp
+    ic['mo_zeta']=z
+    ic['mo_bmean_aged']=np.where(np.isfinite(aged),aged,ic.mo_bmean.to_numpy())
+    ic['aging_source']=source
+    return ic
@@ -0,0 +1,156 @@
+'''
+Export of the fit results and figure data to one HDF5 file.
+
+The file holds the parameters and covariances of all B(r) fits, the
+icmecat_ids of the events in each fit and the arrays behind Fig. 4 and 5,
+so comparisons between catalog versions and re-plots only need to read this
+file. Root attributes give the schema version, the creation time and the
+sha256 hashes of the input files.
+
+layout:
+    /fits/<name>/param, /fits/<name>/cov    attrs model, column, rmin, rmax, n
+    /selections/<name>                      icmecat_id of the events in the fit
+    /figures/<figure>/<array>               x and y values as plotted
+'''
+
+import os
+import json
+import hashlib
+import datetime
+import numpy as np
+import scipy.optimize
+import h5py
+
+from icmecat_results import fits, incremental, mcmc
+from icmecat_results.data import icmecat_file
+
+
+results_file='results/icmecat_results.h5'
+schema_version=1
+
+#fitx of Fig. 4 and 5 in au
+fitx=np.linspace(1*mcmc.rs,5.5,num=10000)
+
+
+def file_hash(file,block=2**20):
+    '''sha256 of a file, read in blocks'''
+    h=hashlib.sha256()
+    with open(file,'rb') as f:
+        for chunk in iter(lambda: f.read(block),b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def collect(ic,fitx=fitx,min_quality=None,field='mo_bmean'):
+    '''
+    fit parameters, selections and figure arrays of the paper as nested dict
+    {'fits': {name: {'param', 'cov', 'attrs'}}, 'selections': {name: ids}, 'figures': {name: {array: values}}};
+    min_quality selects on the quality_score column as in fits.fit_selection,
+    field replaces mo_bmean in all fits, e.g. mo_bmean_aged from expansion.corrected_catalog
+    '''
+    res={'fits':{},'selections':{},'figures':{}}
+    ids=ic.icmecat_id.to_numpy().astype(str)
+    r=ic.mo_sc_heliodistance.to_numpy()
+    bmean=ic[field].to_numpy()
+    use=lambda column: field if column=='mo_bmean' else column
+
+    for name,(column,rmin,rmax) in incremental.loglog_fits.items():
+        column=use(column)
+        stats=fits.loglog_stats(ic,column,rmin,rmax,min_quality)
+        param,cov=fits.linear_from_stats(stats)
+        res['fits'][name]={'param':param,'cov':cov,'attrs':{'model':'linear','column':column,'rmin':rmin,'rmax':rmax,'n':int(stats[0])}}
+        res['selections'][name]=ids[fits.fit_selection(ic,column,rmin,rmax,min_quality)]
+
+    for name,(column,rmin,rmax) in incremental.powerlaw_fits.items():
+        column=use(column)
+        sel=fits.fit_selection(ic,column,rmin,rmax,min_quality)
+        param,cov=fits.fit_powerlaw(r[sel],ic[column].to_numpy()[sel])
+        res['fits'][name]={'param':param,'cov':cov,'attrs':{'model':'powerlaw','column':column,'rmin':rmin,'rmax':rmax,'n':int(sel.sum())}}
+        res['selections'][name]=ids[sel]
+
+    #multipower with the sunspot point at 1 Rs, as for Fig. 5
+    rm,bm=mcmc.catalog_data(ic,'multipower',column=field,min_quality=min_quality)
+    param,cov=scipy.optimize.curve_fit(fits.multipower,rm,bm,method='lm')
+    res['fits']['multipower']={'param':param,'cov':cov,'attrs':{'model':'multipower','column':field,'rmin':0.0,'rmax':6.0,'n':len(rm)}}
+    res['selections']['multipower']=res['selections']['powerlaw_bmean']
+    if min_quality is not None:
+        for fit in res['fits'].values():
+            fit['attrs']['min_quality']=float(min_quality)
+
+    f=res['fits']
+    pb=f['powerlaw_bmean']['param']
+    perr=np.sqrt(np.diag(f['powerlaw_bmean']['cov']))
+    fig4={'r':r,'mo_bmean':bmean,'mo_bmax':ic.mo_bmax.to_numpy(),
+          'sc_insitu':ic.sc_insitu.to_numpy().astype(str),'fitx':fitx,
+          'powerlaw_bmean':fits.powerlaw(fitx,*pb),
+          'powerlaw_bmean_low':fits.powerlaw(fitx,pb[0]-2*perr[0],pb[1])-2*perr[0],
+          'powerlaw_bmean_high':fits.powerlaw(fitx,pb[0]+2*perr[0],pb[1])+2*perr[0],
+          'powerlaw_bmax':fits.powerlaw(fitx,*f['powerlaw_bmax']['param'])}
+    for name in incremental.loglog_fits:
+        sel=np.isin(ids,res['selections'][name])
+        x=np.log10(r[sel])
+        fig4[name+'_x']=x
+        fig4[name+'_y']=np.log10(bmean[sel])
+        fig4[name+'_fit']=fits.linear(x,*f[name]['param'])
+    res['figures']['fig4']=fig4
+
+    res['figures']['fig5']={'fitx':fitx,'multipower':fits.multipower(fitx,*f['multipower']['param']),
+                            'powerlaw_bmean':fig4['powerlaw_bmean'],
+                            'sunspot':np.array([mcmc.sunspot_r,mcmc.sunspot_b])}
+    return res
+
+
+def _dataset(group,name,values):
+    values=np.asarray(values)
+    if values.dtype.kind in 'UO':
+        group.create_dataset(name,data=values.astype(object),dtype=h5py.string_dtype())
+    else:
+        group.create_dataset(name,data=values,compression='gzip' if values.size > 1000 else None)
+
+
+def write_results(res,file=results_file,inputs=(icmecat_file,)):
+    '''writes the dict from collect to one HDF5 file with schema version and input hashes'''
+    if os.path.dirname(file):
+        os.makedirs(os.path.dirname(file),exist_ok=True)
+    with h5py.File(file,'w') as f:
+        f.attrs['schema_version']=schema_version
+        f.attrs['created']=datetime.datetime.now(datetime.timezone.utc).isoformat()
+        f.attrs['inputs']=json.dumps({i:file_hash(i) for i in inputs if os.path.exists(i)})
+        for name,fit in res['fits'].items():
+            g=f.create_group('fits/'+name)
+            _dataset(g,'param',fit['param'])
+            _dataset(g,'cov',fit['cov'])
+            for k,v in fit['attrs'].items():
+                g.attrs[k]=v
+        for name,ids in res['selections'].items():
+            _dataset(f.require_group('selections'),name,ids)
+        for name,arrays in res['figures'].items():
+            g=f.create_group('figures/'+name)
+            for k,v in arrays.items():
+                _dataset(g,k,v)
+
+
+def read_results(file=results_file):
+    '''the same nested dict as collect, plus 'attrs' with schema version, creation time and input hashes'''
+    def values(d):
+        return d.asstr()[()] if h5py.check_string_dtype(d.dtype) else d[()]
+
+    with h5py.File(file,'r') as f:
+        res={'attrs':{'schema_version':int(f.attrs['schema_version']),'created':f.attrs['created'],
+                      'inputs':json.loads(f.attrs['inputs'])},
+             'fits':{},'selections':{},'figures':{}}
+        for name,g in f['fits'].items():
+            res['fits'][name]={'param':g['param'][()],'cov':g['cov'][()],
+                               'attrs':{k:(v.item() if hasattr(v,'item') else v) for k,v in g.attrs.items()}}
+        for name,d in f['selections'].items():
+            res['selections'][name]=values(d)
+        for name,g in f['figures'].items():
+            res['figures'][name]={k:values(d) for k,d in g.items()}
+    return res
+
+
+def export(ic,file=results_file,inputs=(icmecat_file,)):
+    '''collects and writes all results, returns the dict'''
+    res=collect(ic)
+    write_results(res,file,inputs)
+    return res
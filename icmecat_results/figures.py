@@ -0,0 +1,343 @@
+'''
+Paper figures 1, 2, 4 and 5 as functions, the same plots as the cells in
+moestl_icmecat_results.py. Fig. 3 is plots.plot_fig3. fig4_quantiles is
+panel (a) of Fig. 4 with the quantile regression bands of quantile.py.
+
+Fit curves come from the result dict of export.collect, so a figure can be
+redone from the exported HDF5 file without refitting. Figs. 4 and 5 plot the
+field column and the events of the fits in it (attrs column and min_quality,
+e.g. mo_bmean_aged with --aged) and note them when they are not the defaults.
+'''
+
+import datetime
+import numpy as np
+import matplotlib.pyplot as plt
+import matplotlib.dates as mdates
+from matplotlib.ticker import MultipleLocator
+import seaborn as sns
+
+from icmecat_results import fits, mcmc, quantile
+
+
+#marker styles for each ic.sc_insitu name, in the order of the legends in Fig. 1
+sc_styles={'PSP':dict(c='black',label='Parker Solar Probe'),
+           'SolarOrbiter':dict(c='black',markerfacecolor='white',label='Solar Orbiter'),
+           'BepiColombo':dict(c='darkblue',markerfacecolor='lightgrey',label='BepiColombo'),
+           'MAVEN':dict(c='orangered',label='MAVEN'),
+           'STEREO-A':dict(c='red',label='STEREO-A'),
+           'MESSENGER':dict(c='coral',label='MESSENGER'),
+           'VEX':dict(c='orange',label='Venus Express'),
+           'STEREO-B':dict(c='royalblue',label='STEREO-B'),
+           'Wind':dict(c='mediumseagreen',label='Wind'),
+           'Juno':dict(c='black',markerfacecolor='yellow',label='Juno'),
+           'ULYSSES':dict(c='chocolate',label='Ulysses')}
+
+ms=5
+al=0.8
+
+scale=1/mcmc.rs #au to Rs
+
+
+def sc_index(ic,sc):
+    return np.where(ic.sc_insitu==sc)[0]
+
+
+def plot_sc(ax,ic,x,y,sc_list=sc_styles,label=True,**kwargs):
+    '''x and y catalog columns (or arrays over all events) for each spacecraft'''
+    for sc in sc_list:
+        i=sc_index(ic,sc)
+        style=dict(sc_styles[sc])
+        if not label:
+            style.pop('label')
+        style.update(kwargs)
+        xv=x(i) if callable(x) else np.asarray(ic[x])[i]
+        ax.plot(xv,np.asarray(ic[y])[i],'o',**style)
+
+
+def fit_events(ic,res):
+    '''field column of the fits in res and mask of the events with a quality_score of at least their min_quality'''
+    attrs=res['fits']['powerlaw_bmean']['attrs']
+    return attrs['column'],fits.fit_selection(ic,attrs['column'],min_quality=attrs.get('min_quality'))
+
+
+def selection_note(ax,res,xy):
+    '''annotation of the field column and min_quality of the fits, if not mo_bmean of all events'''
+    attrs=res['fits']['powerlaw_bmean']['attrs']
+    note=[attrs['column']] if attrs['column']!='mo_bmean' else []
+    if attrs.get('min_quality') is not None:
+        note.append(f"quality_score >= {attrs['min_quality']:g}")
+    if note:
+        ax.annotate(', '.join(note),xy=xy,xycoords='axes fraction',fontsize=12,ha='left',bbox=dict(boxstyle='round',facecolor='white'))
+
+
+def solar_wind_b(r):
+    '''Mann+ 2023 equation 8, |B| in nT of the solar wind at r in au'''
+    x=r*scale
+    return (6/x**3+1.18/x**2)*1e5
+
+
+def fig1(ic,psp,psppos,solopos,plotfile='results/fig1_icmecat_obs'):
+    '''event times, distances, longitudes and latitudes of the catalog'''
+    sns.set_context('paper')
+    sns.set_style('whitegrid')
+    fig=plt.figure(figsize=(14,10),dpi=100)
+
+    ax1=plt.subplot(221)
+    plot_sc(ax1,ic,'mo_start_time','mo_sc_heliodistance',alpha=al,ms=ms)
+    ax1.set_ylabel('Heliocentric distance $r$ [au]')
+    ax1.set_xlabel('Year')
+    ax1.xaxis.set_major_locator(mdates.YearLocator(2))
+    ax1.xaxis.set_major_formatter(mdates.DateFormatter('%Y'))
+    ax1.set_xlim([datetime.datetime(1990,1,1),datetime.datetime(2025,12,1)])
+    ax1.set_yticks(np.arange(0,6,0.5))
+    ax1.set_ylim([0,5.5])
+
+    ax4=plt.subplot(222,projection='polar')
+    plot_sc(ax4,ic,lambda i: np.radians(ic.mo_sc_long_heeq.to_numpy()[i]),'mo_sc_heliodistance',alpha=al,markersize=ms)
+    fsize=10
+    plt.rgrids((0.1,0.2,0.3,0.4,0.6,0.8,1.0,1.2,1.4,1.6,1.8,2.0),('','0.2','','0.4','0.6','0.8','1.0','1.2','1.4','','',''),angle=180,fontsize=fsize-4,alpha=0.8,ha='center',color='white',zorder=5)
+    plt.thetagrids(range(0,360,45),(u'0°',u'45°',u'90°',u'135°',u'±180°',u'- 135°',u'- 90°',u'- 45°'),fmt='%d',ha='center',fontsize=fsize,color='white',zorder=5,alpha=1.0)
+    ax4.set_ylim([0,1.6])
+    ax4.text(0,0,'Sun',color='black',ha='center',fontsize=fsize-5,verticalalignment='top')
+    ax4.text(0,1.1,'Earth',color='green',ha='center',fontsize=fsize-5,verticalalignment='center')
+    ax4.scatter(0,0,s=100,c='yellow',alpha=1,edgecolors='black',linewidth=0.3)
+    ax4.legend(bbox_to_anchor=(-0.35,1.05),loc='upper left',fontsize=9)
+
+    inner=['Wind','STEREO-A','PSP','SolarOrbiter','BepiColombo']
+    ax2=plt.subplot(223)
+    plot_sc(ax2,ic,'mo_start_time','mo_sc_heliodistance',inner,label=False,alpha=0.7,ms=ms)
+    ax2.plot(psp.time,psp.r,'k-',alpha=0.5)
+    ax2.plot(psppos.time,psppos.r,'k-',alpha=0.5)
+    ax2.set_ylabel('Heliocentric distance $r$ [au]')
+    ax2.set_yticks(np.arange(0,6,0.1))
+    ax2.set_ylim([0,1.1])
+
+    ax3=plt.subplot(224)
+    plot_sc(ax3,ic,'mo_start_time','mo_sc_lat_heeq',inner,alpha=0.7,ms=ms)
+    ax3.plot(solopos.time,np.rad2deg(solopos.lat),'g-',alpha=0.5)
+    ax3.set_ylabel('latitude HEEQ [degrees]')
+    ax3.set_yticks(np.arange(-90,90,10))
+    ax3.set_ylim([-40,40])
+    ax3.legend(loc='upper left',fontsize=12)
+    for ax in [ax2,ax3]:
+        ax.set_xlabel('Year')
+        ax.xaxis.set_major_locator(mdates.YearLocator(1))
+        ax.xaxis.set_major_formatter(mdates.DateFormatter('%Y'))
+        ax.set_xlim([datetime.datetime(2018,1,1),datetime.datetime(2030,1,1)])
+
+    plt.tight_layout()
+    for label,xy in zip('abcd',[(0.02,0.97),(0.49,0.97),(0.02,0.48),(0.49,0.48)]):
+        plt.annotate('('+label+')',xy=xy,xycoords='figure fraction',fontsize=13,ha='center')
+    for ext in ['.png','.pdf']:
+        plt.savefig(plotfile+ext,dpi=150,bbox_inches='tight')
+    return fig
+
+
+def fig2(ic,solo,icmecat_id='ICME_SOLO_MOESTL_20230410_01',start=datetime.datetime(2023,4,10,2),end=datetime.datetime(2023,4,10,20),plotfile='results/fig2_solo_example'):
+    '''Solar Orbiter example event'''
+    sns.set_style('whitegrid')
+    sns.set_context('paper')
+    fig=plt.figure(figsize=(8,7),dpi=150)
+
+    startind=np.where(start > solo.time)[0][-1]
+    endind=np.where(end > solo.time)[0][-1]
+    i=np.where(ic.icmecat_id==icmecat_id)[0][0]
+    sc=solo[startind:endind]
+    lw=1.1
+
+    ax1=plt.subplot(411)
+    ax1.plot(sc.time,sc.bx,'-r',label='$B_{R}$',linewidth=lw)
+    ax1.plot(sc.time,sc.by,'-g',label='$B_{T}$',linewidth=lw)
+    ax1.plot(sc.time,sc.bz,'-b',label='$B_{N}$',linewidth=lw)
+    ax1.plot(sc.time,sc.bt,'-k',label='$|B|$',lw=lw)
+    ax1.set_ylabel('B [nT] RTN')
+    ax1.legend(loc=3,ncol=4,fontsize=9)
+    ax1.set_yticks(np.arange(-200,200,50))
+    ax1.set_ylim((-150,150))
+
+    ax2=plt.subplot(412,sharex=ax1)
+    ax2.plot(sc.time,sc.vt,'-k',label='V',linewidth=lw)
+    ax2.set_ylabel('V [km s$^{-1}$]')
+    ax2.set_yticks(np.arange(0,1000,100))
+    ax2.set_ylim((250,700))
+
+    ax3=plt.subplot(413,sharex=ax1)
+    ax3.plot(sc.time,sc.np,'-k',label='Np',linewidth=lw)
+    ax3.set_ylabel('N [ccm$^{-3}]$')
+    ax3.set_ylim((0,1200))
+
+    ax4=plt.subplot(414,sharex=ax1)
+    ax4.plot(sc.time,sc.tp/1e6,'-k',label='Tp',linewidth=lw)
+    ax4.set_ylabel('T [MK]')
+    ax4.set_yticks(np.arange(0,1,0.1))
+    ax4.set_ylim((0,0.8))
+
+    for ax in [ax1,ax2,ax3,ax4]:
+        #plot vertical lines
+        for t in [ic.icme_start_time[i],ic.mo_start_time[i],ic.mo_end_time[i]]:
+            ax.axvline(t,color='k',linewidth=1)
+        ax.set_xlim(start,end)
+    for ax in [ax1,ax2,ax3]:
+        plt.setp(ax.get_xticklabels(),visible=False)
+
+    ax1.annotate('Solar Orbiter MAG',xy=(0.85,0.09),xycoords='axes fraction',fontsize=11,ha='center',bbox=dict(boxstyle='round',facecolor='white'))
+    for ax in [ax2,ax3,ax4]:
+        ax.annotate('SWA/PAS',xy=(0.9,0.88),xycoords='axes fraction',fontsize=11,ha='center',bbox=dict(boxstyle='round',facecolor='white'))
+
+    ax4.xaxis.set_major_formatter(mdates.DateFormatter('%b-%d %H:00'))
+    ax4.xaxis.set_minor_locator(mdates.HourLocator(interval=1))
+    ax4.tick_params(which='both',bottom=True)
+    ax4.xaxis.set_major_locator(mdates.HourLocator(interval=4))
+    ax4.set_xlabel('Year '+str(start.year))
+
+    plt.tight_layout()
+    for ext in ['.png','.pdf']:
+        plt.savefig(plotfile+ext)
+    return fig
+
+
+def fig4(ic,res,plotfile='results/fig4_br_mo'):
+    '''B(r) of the magnetic obstacles with the power law and log-log fits'''
+    sns.set_context('talk')
+    sns.set_style('whitegrid')
+    f=res['figures']['fig4']
+    p=res['fits']
+    column,sel=fit_events(ic,res)
+
+    fig=plt.figure(figsize=(14,13),dpi=100)
+    gs=fig.add_gridspec(2,2,hspace=0.3,wspace=0.3,height_ratios=[1.7,1])
+
+    ax=fig.add_subplot(gs[0,:])
+    ax.set_xlabel('Heliocentric distance $R$ [au]')
+    ax.set_ylabel('Magnetic field magnitude $B$ [nT]')
+    plot_sc(ax,ic[sel],'mo_sc_heliodistance',column,alpha=0.7,ms=ms)
+    selection_note(ax,res,(0.02,0.03))
+    ax.text(-0.08,1.05,'(a)',transform=ax.transAxes,fontsize=16,fontweight='bold',va='top')
+    ax.set_xticks(np.arange(0,5.5,0.2))
+    ax.set_xlim([0,5.5])
+    ax.set_ylim([1e-1,1*1e4])
+    ax.set_yscale('log')
+
+    ax.plot(f['fitx'],f['powerlaw_bmean'],'-k',zorder=5,label='mean($B_{MO}$) fit')
+    ax.plot(f['fitx'],f['powerlaw_bmean_low'],'-k',alpha=0.5,zorder=5)
+    ax.plot(f['fitx'],f['powerlaw_bmean_high'],'-k',alpha=0.5,zorder=5)
+    ax.plot(f['fitx'],f['powerlaw_bmax'],'-.r',zorder=5,label='max($B_{MO}$) fit')
+
+    for name,column,y in [('powerlaw_bmean','mean',0.73),('powerlaw_bmax','max',0.66)]:
+        a,b=p[name]['param']
+        formulastring=r'$\mathrm{'+column+r'}(B_{MO}(R)) = '+str(np.round(a,2))+r' \times R^{'+str(np.round(b,2))+'}$'
+        ax.annotate(formulastring,xy=(0.4,y),xycoords='axes fraction',fontsize=15,ha='center',bbox=dict(boxstyle='round',facecolor='white'))
+    ax.legend(loc=1,fontsize=11)
+
+    for k,(name,label) in enumerate([('loglog_1au','(b)'),('loglog_all','(c)')]):
+        ax2=fig.add_subplot(gs[1,k])
+        ax2.plot(f[name+'_x'],f[name+'_y'],'o',markersize=1.5,alpha=0.9,color='dimgrey')
+        ax2.plot(f[name+'_x'],f[name+'_fit'],'-k',linewidth=1)
+        ax2.set_ylim(-0.5,3.1)
+        ax2.set_xlabel(r'$\log_{10}(R \text{[au]})$')
+        ax2.set_ylabel(r'$\log_{10}(B \text{[nT]})$')
+        ax2.text(-0.15,1.05,label,transform=ax2.transAxes,fontsize=16,fontweight='bold',va='top')
+        kk,d=p[name]['param']
+        formulastring=r'$\mathrm{mean}(B_{MO}(R)) ='+f'{np.round(10**d,2):.2f}'+r' \times R^{'+str(np.round(kk,2))+'}$'
+        ax2.annotate(formulastring,xy=(0.4,0.1),xycoords='axes fraction',fontsize=12,ha='center',bbox=dict(boxstyle='round',facecolor='white'))
+
+    for ext in ['.png','.pdf']:
+        plt.savefig(plotfile+ext,dpi=300,bbox_inches='tight')
+    return fig
+
+
+def fig4_quantiles(ic,res,param,q=quantile.quantiles,plotfile='results/fig4_br_quantiles'):
+    '''B(r) as in Fig. 4 (a) with the bands of the quantile fits param (len(q), 2) and the power law fit'''
+    sns.set_context('talk')
+    sns.set_style('whitegrid')
+    f=res['figures']['fig4']
+    column,sel=fit_events(ic,res)
+
+    fig=plt.figure(figsize=(14,8),dpi=100)
+    ax=plt.subplot(111)
+    ax.set_xlabel('Heliocentric distance $R$ [au]')
+    ax.set_ylabel('Magnetic field magnitude $B$ [nT]')
+    plot_sc(ax,ic[sel],'mo_sc_heliodistance',column,alpha=0.7,ms=ms)
+    quantile.plot_quantile_bands(ax,param,f['fitx'],q)
+    ax.plot(f['fitx'],f['powerlaw_bmean'],'-k',zorder=5,label='mean($B_{MO}$) fit')
+    selection_note(ax,res,(0.02,0.03))
+    ax.set_xticks(np.arange(0,5.5,0.2))
+    ax.set_xlim([0,5.5])
+    ax.set_ylim([1e-1,1*1e4])
+    ax.set_yscale('log')
+    ax.legend(loc=1,fontsize=11)
+
+    for ext in ['.png','.pdf']:
+        plt.savefig(plotfile+ext,dpi=300,bbox_inches='tight')
+    return fig
+
+
+def fig5(ic,res,psp,solo,plotfile='results/fig5_br_mo_zoom'):
+    '''MO fields and fits close to the Sun compared to solar observations'''
+    sns.set_context('talk')
+    sns.set_style('whitegrid')
+    f=res['figures']['fig5']
+    rs=mcmc.rs
+    fitx=f['fitx']
+    column,sel=fit_events(ic,res)
+    ic=ic[sel]
+
+    fig=plt.figure(figsize=(15,9),dpi=100)
+    ax=plt.subplot(111)
+    ax.set_xlabel('Heliocentric distance $R$ [au]')
+    ax.set_ylabel('$B$ [nT]')
+    ax.plot(psp.r,psp.bt,color='mediumseagreen',linewidth=0.2,label='Parker Solar Probe |B|',alpha=0.9)
+    ax.plot(solo.r,solo.bt,color='lightblue',linewidth=0.2,label='Solar Orbiter |B|')
+    for sc in ['MESSENGER','BepiColombo','PSP','SolarOrbiter']:
+        i=sc_index(ic,sc)
+        style=dict(sc_styles[sc])
+        style['label']+=' ICMEs'
+        ax.plot(ic.mo_sc_heliodistance.to_numpy()[i],ic[column].to_numpy()[i],'o',alpha=1.0 if sc=='PSP' else al,ms=ms,zorder=4 if sc=='PSP' else None,**style)
+
+    ax_max_x=0.33
+    ax.set_xticks(np.arange(0,0.5,0.05))
+    ax.set_xlim([0,ax_max_x])
+    ax.set_yscale('log')
+    ax.set_yticks([1,10,10**2,10**3,10**4,10**5,10**6,10**7,10**8,10**9])
+    ax.set_ylim([0.1,10**9])
+    ax.grid(True,which='both',zorder=2)
+
+    #second x-axis with solar radii
+    ax1=ax.twiny()
+    ax1.set_xlabel(r'$R$ [R$_{\odot}$]',color='black')
+    ax1.set_xlim(0,ax_max_x*scale)
+    ax1.set_xticks(np.arange(0,ax_max_x*scale,5))
+    ax1.set_zorder(-1)
+    ax.patch.set_visible(False)
+    ax1.patch.set_visible(True)
+
+    ax.plot(fitx,f['powerlaw_bmean'],'-k',label=r'$\langle B_{MO} \rangle$) fit, k= -1.57',zorder=3)
+    ax.plot(fitx,f['multipower'],color='tab:orange',linewidth=2,zorder=3,label='multipole fit, k1=-1.57, k2=-6')
+    ax.plot(fitx,solar_wind_b(fitx),color='tab:blue',linestyle='-.',label='solar wind model')
+    ax.plot(fitx,fits.powerlaw(fitx,0.46,-3),color='tab:red',label='dipole field k=-3')
+
+    sunspot_r,sunspot_b=f['sunspot']
+    ax.plot(sunspot_r,sunspot_b,marker='s',markerfacecolor='white',markersize='10')
+    ax.errorbar(rs,46*mcmc.gauss,yerr=0,marker='s',markerfacecolor='white',markersize='10',capsize=5)
+
+    ax.axvline(rs,linestyle='-',color='k',linewidth=0.9)
+    ax.axvspan(16*rs,20*rs,alpha=0.2,color='skyblue')
+    ax.axvline(np.nanmin(psp.r),linestyle='-',color='b',linewidth=0.5)
+
+    annotfs=13
+    ax.annotate(r'9.87 R$_{\odot}$ PSP closest approach',xy=(9.86*rs+0.001,5*1e7),xycoords='data',fontsize=annotfs,ha='left')
+    ax.annotate(r'1 R$_{\odot}$',xy=(0.0048,5*1e8),xycoords='data',fontsize=annotfs,ha='left')
+    ax.annotate(r'16-20 R$_{\odot}$, Alfvén surface',xy=(20.1*rs,2*1e8),xycoords='data',fontsize=annotfs,ha='left')
+    ax.annotate('Sunspots',xy=(0.005,1e8),xycoords='data',fontsize=annotfs,ha='left',zorder=2)
+    ax.annotate('Quiet Sun',xy=(0.0065,3*1e6),xycoords='data',fontsize=annotfs,ha='left')
+
+    selection_note(ax,res,(0.55,0.03))
+    ax.legend(fontsize=14,facecolor='white')
+    ax.xaxis.set_minor_locator(MultipleLocator(0.01))
+    ax.tick_params(which='both',bottom=True)
+    ax.grid(False,which='minor')
+
+    plt.tight_layout()
+    for ext in ['.png','.pdf']:
+        plt.savefig(plotfile+ext,dpi=300,bbox_inches='tight')
+    return fig
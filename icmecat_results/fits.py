@@ -0,0 +1,161 @@
+'''
+B(r) fit functions of the paper and the fits on the catalog.
+
+powerlaw, linear and multipower are the same functions as in
+moestl_icmecat_results.py. The linear fit in log-log space is also available
+from its sufficient statistics, so it can be updated when events are added
+or removed without refitting all events.
+'''
+
+import numpy as np
+import scipy.optimize
+
+
+#define powerlaw function
+def powerlaw(x, a, b):
+    return a*x**b
+
+####linear fit
+def linear(x, k, d):
+    return k * x + d
+
+def multipower(x,a,a1):
+    return a*x**(-1.57) + a1*x**(-6)
+
+
+#column of the event quality from quality.py
+quality_column='quality_score'
+
+
+def fit_selection(ic,column='mo_bmean',rmin=0.0,rmax=6.0,min_quality=None):
+    '''
+    boolean mask of events with finite distance and field between rmin and rmax;
+    with min_quality, events with a quality_score below it are left out,
+    events without a score (no in situ data file) are kept
+    '''
+    r=ic.mo_sc_heliodistance.to_numpy()
+    b=ic[column].to_numpy()
+    sel=np.isfinite(r) & np.isfinite(b) & (r > rmin) & (r < rmax)
+    if min_quality is not None:
+        q=ic[quality_column].to_numpy().astype(float)
+        sel&=~(q < min_quality)
+    return sel
+
+
+def fit_powerlaw(r,b,p0=None):
+    '''LM power law fit as for Fig. 4, returns parameters and covariance'''
+    fit=scipy.optimize.curve_fit(powerlaw,r,b,p0=p0,method='lm')
+    return fit[0],fit[1]
+
+
+####sufficient statistics of the log-log linear fit
+
+stats_fields=('n','sx','sy','sxx','sxy','syy')
+
+def linear_stats(x,y):
+    '''sums n, x, y, x^2, xy, y^2 of the linear fit'''
+    x=np.asarray(x,dtype=float)
+    y=np.asarray(y,dtype=float)
+    return np.array([len(x),x.sum(),y.sum(),(x*x).sum(),(x*y).sum(),(y*y).sum()])
+
+
+def loglog_stats(ic,column='mo_bmean',rmin=0.0,rmax=6.0,min_quality=None):
+    '''sufficient statistics of log10(B) vs log10(r) for the events selected as in the paper'''
+    sel=fit_selection(ic,column,rmin,rmax,min_quality)
+    return linear_stats(np.log10(ic.mo_sc_heliodistance.to_numpy()[sel]),np.log10(ic[column].to_numpy()[sel]))
+
+
+def linear_from_stats(stats):
+    '''
+    least squares k, d and covariance from the sufficient statistics,
+    the same as curve_fit(linear, x, y) in the paper script
+    '''
+    n,sx,sy,sxx,sxy,syy=stats
+    det=n*sxx-sx*sx
+    k=(n*sxy-sx*sy)/det
+    d=(sy*sxx-sx*sxy)/det
+    rss=syy-2*k*sxy-2*d*sy+k*k*sxx+2*k*d*sx+n*d*d
+    s2=rss/(n-2)
+    cov=s2/det*np.array([[n,-sx],[-sx,sxx]])
+    return np.array([k,d]),cov
+
+
+####batched fits, one row of r and b for each data set, NaN entries are ignored
+
+def fit_loglog_batch(r,b):
+    '''
+    log-log linear fits for many data sets at once, r and b of shape (n_sets, n_events)
+
+    returns k, d and their standard deviations, each of shape (n_sets,)
+    '''
+    x=np.log10(r)
+    y=np.log10(b)
+    w=np.isfinite(x) & np.isfinite(y)
+    x=np.where(w,x,0.0)
+    y=np.where(w,y,0.0)
+    stats=np.array([w.sum(axis=-1),x.sum(axis=-1),y.sum(axis=-1),(x*x).sum(axis=-1),(x*y).sum(axis=-1),(y*y).sum(axis=-1)])
+    param,cov=linear_from_stats(stats)
+    return param[0],param[1],np.sqrt(cov[0,0]),np.sqrt(cov[1,1])
+
+
+def fit_powerlaw_batch(r,b,p0=None,iterations=100,tol=1e-10):
+    '''
+    least squares fits of powerlaw for many data sets at once with a
+    vectorized Levenberg-Marquardt, r and b of shape (n_sets, n_events);
+    starts from the log-log fit if p0 is None
+
+    returns parameters (n_sets, 2) and covariances (n_sets, 2, 2) as curve_fit
+    '''
+    r=np.atleast_2d(np.asarray(r,dtype=float))
+    b=np.atleast_2d(np.asarray(b,dtype=float))
+    w=np.isfinite(r) & np.isfinite(b) & (r > 0)
+    r=np.where(w,r,1.0)
+    b=np.where(w,b,0.0)
+    logr=np.log(r)
+
+    if p0 is None:
+        k,d,_,_=fit_loglog_batch(np.where(w,r,np.nan),np.where(w,b,np.nan))
+        p=np.stack([10**d,k],axis=-1)
+    else:
+        p=np.broadcast_to(np.asarray(p0,dtype=float),(len(r),2)).copy()
+
+    def cost(p):
+        res=w*(b-p[:,0:1]*r**p[:,1:2])
+        return (res*res).sum(axis=-1)
+
+    lam=np.full(len(r),1e-3)
+    c=cost(p)
+    for it in range(iterations):
+        f=r**p[:,1:2]
+        res=w*(b-p[:,0:1]*f)
+        j1=w*f
+        j2=w*p[:,0:1]*f*logr
+        s11=(j1*j1).sum(-1)
+        s12=(j1*j2).sum(-1)
+        s22=(j2*j2).sum(-1)
+        g1=(j1*res).sum(-1)
+        g2=(j2*res).sum(-1)
+
+        #damped 2x2 normal equations for all sets
+        a11=s11*(1+lam)
+        a22=s22*(1+lam)
+        det=a11*a22-s12*s12
+        step=np.stack([(a22*g1-s12*g2)/det,(a11*g2-s12*g1)/det],axis=-1)
+        trial=p+step
+        ct=cost(trial)
+        better=ct < c
+        p[better]=trial[better]
+        lam=np.where(better,lam/10,lam*10)
+        done=np.abs(c-ct) <= tol*c
+        c=np.where(better,ct,c)
+        if np.all(done | ~np.isfinite(ct)):
+            break
+
+    #covariance scaled with the residual variance, as curve_fit without sigma
+    f=r**p[:,1:2]
+    j1=w*f
+    j2=w*p[:,0:1]*f*logr
+    jtj=np.stack([np.stack([(j1*j1).sum(-1),(j1*j2).sum(-1)],-1),np.stack([(j1*j2).sum(-1),(j2*j2).sum(-1)],-1)],-2)
+    s2=cost(p)/(w.sum(-1)-2)
+    cov=np.linalg.inv(jtj)*s2[:,None,None]
+    return p,cov
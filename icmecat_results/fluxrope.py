@@ -0,0 +1,167 @@
+'''
+Lundquist (cylindrical, force-free) flux rope fits to the magnetic obstacles.
+
+The field of the rope is B0 J0(alpha rho) along the axis and H B0 J1(alpha rho)
+in the azimuthal direction, with alpha = 2.405 so that the axial field
+vanishes at the rope boundary. The spacecraft crosses the rope on a straight
+line along -R relative to the rope, at impact parameter p (in rope radii)
+from the axis. Free parameters are the axis latitude theta and longitude phi
+in RTN, p and the handedness H = +-1; B0 is linear in the model and solved
+exactly for every candidate.
+
+The RTN components inside mo_start_time - mo_end_time are resampled onto
+n points with windows.py. The search is a differential evolution where the
+whole population of every event in a chunk is one array (n_events, n_pop, 3),
+evaluated at once; chunks of events are fitted in parallel worker processes.
+'''
+
+import multiprocessing
+import numpy as np
+import scipy.special
+
+from icmecat_results import fits, windows
+from icmecat_results.data import data_path, insitu_files
+
+
+alpha=2.405
+
+#search bounds of theta [deg], phi [deg], p
+bounds=np.array([[-90.0,90.0],[0.0,360.0],[-1.0,1.0]])
+
+
+def axis_frame(theta,phi):
+    '''
+    unit vectors (..., 3) in RTN of the rope axis z, the path direction x
+    in the plane perpendicular to the axis, and y = z cross x
+    '''
+    th=np.radians(theta)
+    ph=np.radians(phi)
+    z=np.stack([np.cos(th)*np.cos(ph),np.cos(th)*np.sin(ph),np.sin(th)],axis=-1)
+    #spacecraft moves along -R relative to the rope
+    v=np.array([-1.0,0.0,0.0])
+    x=v-(z@v)[...,None]*z
+    x=x/np.maximum(np.linalg.norm(x,axis=-1,keepdims=True),1e-12)
+    y=np.cross(z,x)
+    return z,x,y
+
+
+def _cost(pop,b,w):
+    '''
+    squared residual sum, B0 and H for the population (e, n_pop, 3) and fields
+    b (e, n, 3) with sample weights w (e, n); axial and azimuthal fields are
+    orthogonal, so the best H follows from the signs of their projections
+    '''
+    n=b.shape[-2]
+    z,x,y=axis_frame(pop[...,0],pop[...,1])
+    p=pop[...,2,None]
+    half=np.sqrt(np.maximum(1-p*p,0))
+    s=-half+2*half*np.linspace(0,1,n)
+    rho=np.sqrt(s*s+p*p)
+    j0=scipy.special.j0(alpha*rho)
+    j1=scipy.special.j1(alpha*rho)
+
+    #field components along the axis, path and impact directions
+    bz=np.einsum('enk,epk->epn',b,z)
+    bx=np.einsum('enk,epk->epn',b,x)
+    by=np.einsum('enk,epk->epn',b,y)
+    #e_phi = (s y - p x) / rho
+    b_phi=(s*by-p*bx)/np.maximum(rho,1e-12)
+
+    w=w[:,None,:]
+    sa=np.sum(w*j0*bz,axis=-1)
+    sz=np.sum(w*j1*b_phi,axis=-1)
+    ss=np.sum(w*(j0*j0+j1*j1),axis=-1)
+    h=np.where(sa*sz >= 0,1.0,-1.0)
+    sb=sa+h*sz
+    b0=sb/np.maximum(ss,1e-300)
+    cost=np.sum(w[:,0]*np.sum(b*b,axis=-1),axis=-1)[:,None]-b0*sb
+    return cost,b0,h
+
+
+def fit_fields(b,n_pop=40,generations=150,f=0.7,cr=0.9,seed=None):
+    '''
+    differential evolution fits of the MO fields b (n_events, n, 3) in RTN,
+    NaN samples are ignored
+
+    returns array (n_events, 6) of b0, h, theta, phi, p and the rms residual
+    relative to the mean |B|; the axis is oriented so that B0 > 0
+    '''
+    rng=np.random.default_rng(seed)
+    b=np.asarray(b,dtype=float)
+    ne=b.shape[0]
+    w=np.isfinite(b).all(axis=-1).astype(float)
+    b=np.where(w[...,None] > 0,b,0.0)
+
+    lo,hi=bounds[:,0],bounds[:,1]
+    pop=lo+(hi-lo)*rng.random((ne,n_pop,3))
+    cost,b0,h=_cost(pop,b,w)
+    for _ in range(generations):
+        #rand/1/bin for all events and members at once
+        r=rng.integers(0,n_pop,size=(3,ne,n_pop))
+        e=np.arange(ne)[:,None]
+        mutant=pop[e,r[0]]+f*(pop[e,r[1]]-pop[e,r[2]])
+        cross=rng.random((ne,n_pop,3)) < cr
+        cross[e,np.arange(n_pop)[None,:],rng.integers(0,3,size=(ne,n_pop))]=True
+        trial=np.where(cross,mutant,pop)
+        trial[...,1]=trial[...,1] % 360
+        trial[...,0]=np.clip(trial[...,0],lo[0],hi[0])
+        trial[...,2]=np.clip(trial[...,2],lo[2],hi[2])
+        tcost,tb0,th=_cost(trial,b,w)
+        better=tcost < cost
+        pop=np.where(better[...,None],trial,pop)
+        cost=np.where(better,tcost,cost)
+        b0=np.where(better,tb0,b0)
+        h=np.where(better,th,h)
+
+    k=np.argmin(cost,axis=1)
+    e=np.arange(ne)
+    theta,phi,p=pop[e,k].T
+    b0,h,cost=b0[e,k],h[e,k],cost[e,k]
+
+    #B0 < 0 is the same rope with the axis reversed
+    flip=b0 < 0
+    theta=np.where(flip,-theta,theta)
+    phi=np.where(flip,(phi+180) % 360,phi)
+    p=np.where(flip,-p,p)
+    b0=np.abs(b0)
+
+    nvalid=w.sum(-1)
+    bmean=np.linalg.norm(b,axis=-1).sum(-1)/np.maximum(nvalid,1)
+    rms=np.sqrt(np.maximum(cost,0)/np.maximum(nvalid,1))/bmean
+    out=np.stack([b0,h,theta,phi,p,rms],axis=-1)
+    out[nvalid < 5]=np.nan
+    return out
+
+
+def _fit_chunk(args):
+    b,n_pop,generations,seed=args
+    return fit_fields(b,n_pop,generations,seed=seed)
+
+
+def fit_catalog(ic,sc_list=('PSP','SolarOrbiter'),n=50,n_pop=40,generations=150,chunk=50,path=data_path,files=insitu_files,jobs=None,seed=0):
+    '''
+    flux rope fits of all events of the spacecraft in sc_list, returns a
+    dataframe with icmecat_id, sc_insitu, mo_sc_heliodistance, mo_bmean and
+    the fit parameters b0, h, theta, phi, p, rms
+    '''
+    ic=ic[ic.sc_insitu.isin(sc_list)].reset_index(drop=True)
+    w=windows.extract_event_windows(ic,n_sheath=0,n_mo=n,path=path,files=files,channels=('bx','by','bz'),jobs=jobs)
+    b=np.transpose(w,(0,2,1))
+
+    seeds=np.random.SeedSequence(seed).spawn(int(np.ceil(len(b)/chunk)))
+    tasks=[(b[k*chunk:(k+1)*chunk],n_pop,generations,s) for k,s in enumerate(seeds)]
+    with multiprocessing.Pool(jobs) as pool:
+        res=np.concatenate(pool.map(_fit_chunk,tasks)) if tasks else np.empty((0,6))
+
+    out=ic[['icmecat_id','sc_insitu','mo_sc_heliodistance','mo_bmean']].copy()
+    for k,c in enumerate(['b0','h','theta','phi','p','rms']):
+        out[c]=res[:,k]
+    return out
+
+
+def b0_powerlaws(res,max_rms=0.5):
+    '''power law fits of B0(r) and mo_bmean(r) on the same well fitted events'''
+    sel=np.isfinite(res.b0).to_numpy() & (res.rms < max_rms).to_numpy() & np.isfinite(res.mo_bmean).to_numpy()
+    r=res.mo_sc_heliodistance.to_numpy()[sel]
+    return {'b0':fits.fit_powerlaw(r,res.b0.to_numpy()[sel]),
+            'mo_bmean':fits.fit_powerlaw(r,res.mo_bmean.to_numpy()[sel]),'n':int(sel.sum())}
@@ -0,0 +1,170 @@
+'''
+Gallery of Fig. 2 style plots (B RTN, V, N, T with the three boundary lines),
+one PNG for every PSP and Solar Orbiter event in ICMECAT.
+
+The in situ data are loaded once by the parent process and shared with the
+workers through shared memory (shared.py). Each worker creates the Figure and
+all line artists once, and only updates them with set_data for every event.
+Plots are written as soon as they are done, existing files are skipped so an
+interrupted run can be continued.
+'''
+
+import os
+import multiprocessing
+import numpy as np
+import matplotlib.dates as mdates
+from matplotlib.figure import Figure
+
+from icmecat_results import shared
+from icmecat_results.data import time_num, data_path, insitu_files
+from icmecat_results.windows import event_indices
+
+
+gallery_path='results/gallery/'
+
+instruments={'PSP':('PSP FIELDS','SWEAP'),'SolarOrbiter':('Solar Orbiter MAG','SWA/PAS')}
+
+lw=1.1
+
+#figure and artists of the current worker process, made by init_worker
+_art={}
+
+
+def gallery_figure():
+    '''Figure and dict of all artists that are updated for each event'''
+    fig=Figure(figsize=(8,7),dpi=150)
+    axes=fig.subplots(4,1,sharex=True)
+    art={'fig':fig,'axes':axes}
+
+    ax1,ax2,ax3,ax4=axes
+    art['bx'],=ax1.plot([],[],'-r',label='$B_{R}$',linewidth=lw)
+    art['by'],=ax1.plot([],[],'-g',label='$B_{T}$',linewidth=lw)
+    art['bz'],=ax1.plot([],[],'-b',label='$B_{N}$',linewidth=lw)
+    art['bt'],=ax1.plot([],[],'-k',label='$|B|$',linewidth=lw)
+    art['vt'],=ax2.plot([],[],'-k',label='V',linewidth=lw)
+    art['np'],=ax3.plot([],[],'-k',label='Np',linewidth=lw)
+    art['tp'],=ax4.plot([],[],'-k',label='Tp',linewidth=lw)
+
+    #vertical lines for icme_start_time, mo_start_time, mo_end_time
+    art['boundaries']=[[ax.axvline(0,color='k',linewidth=1) for k in range(3)] for ax in axes]
+
+    ax1.set_ylabel('B [nT] RTN')
+    ax2.set_ylabel('V [km s$^{-1}$]')
+    ax3.set_ylabel('N [ccm$^{-3}]$')
+    ax4.set_ylabel('T [MK]')
+    ax1.legend(loc=3,ncol=4,fontsize=9)
+
+    box=dict(boxstyle='round', facecolor='white')
+    art['mag']=ax1.annotate('',xy=(0.85,0.09),xycoords='axes fraction',fontsize=11,ha='center',bbox=box)
+    art['plasma']=[ax.annotate('',xy=(0.9,0.88),xycoords='axes fraction',fontsize=11,ha='center',bbox=box) for ax in axes[1:]]
+    art['title']=ax1.set_title('')
+
+    for ax in axes:
+        ax.xaxis_date()
+    ax4.xaxis.set_major_formatter(mdates.DateFormatter('%b-%d %H:00'))
+    ax4.xaxis.set_minor_locator(mdates.HourLocator(interval=1))
+    ax4.tick_params(which="both", bottom=True)
+    #texts of the size set for each event, so the layout leaves room for them,
+    #and a margin on the right for half of the last date tick label
+    art['title'].set_text('ICME_SOLARORBITER_MOESTL_20200101_01  0.0000 au')
+    ax4.set_xlabel('Year 2000')
+    fig.tight_layout(rect=(0,0,0.96,1))
+    return art
+
+
+def _ylim(y,lower=0.0,symmetric=False):
+    top=np.nanmax(np.abs(y)) if np.any(np.isfinite(y)) else 1.0
+    top=1.1*top if top > 0 else 1.0
+    return (-top,top) if symmetric else (lower,top)
+
+
+def update_gallery_figure(art,ic,data,tnum,i,pad=0.3):
+    '''sets the data of all artists to catalog row i'''
+    bounds=time_num(np.array([ic.icme_start_time[i],ic.mo_start_time[i],ic.mo_end_time[i]]))
+    dur=bounds[2]-bounds[0]
+    t0=bounds[0]-pad*dur
+    t1=bounds[2]+pad*dur
+
+    [i0,i1]=event_indices(tnum,np.array([t0,t1]))
+    sl=slice(max(i0,0),i1+2)
+    t=tnum[sl]
+    sc=data[sl]
+
+    for c in ['bx','by','bz','bt','vt','np']:
+        art[c].set_data(t,sc[c])
+    art['tp'].set_data(t,sc.tp/1e6)
+
+    for lines in art['boundaries']:
+        for line,b in zip(lines,bounds):
+            line.set_xdata([b,b])
+
+    ax1,ax2,ax3,ax4=art['axes']
+    ax1.set_ylim(_ylim(sc.bt,symmetric=True))
+    ax2.set_ylim(_ylim(sc.vt))
+    ax3.set_ylim(_ylim(sc.np))
+    ax4.set_ylim(_ylim(sc.tp/1e6))
+    ax4.set_xlim(t0,t1)
+
+    hours=dur*24*(1+2*pad)
+    ax4.xaxis.set_major_locator(mdates.HourLocator(interval=max(1,int(hours//4))))
+    ax4.set_xlabel('Year '+str(ic.icme_start_time[i].year))
+
+    mag,plasma=instruments.get(ic.sc_insitu[i],('MAG','plasma'))
+    art['mag'].set_text(mag)
+    for a in art['plasma']:
+        a.set_text(plasma)
+    art['title'].set_text(ic.icmecat_id[i]+f'  {ic.mo_sc_heliodistance[i]:.4f} au')
+
+
+def init_worker(spec):
+    '''pool initializer, attaches the shared arrays and creates the figure of this worker'''
+    shared.init_worker(spec)
+    _art.update(gallery_figure())
+
+
+def _render(args):
+    '''worker: renders the events in ic of one spacecraft into path, returns the files written'''
+    sc,ic,path=args
+    data=shared.views()[sc]
+    tnum=shared.views()[sc+'/tnum']
+
+    art=_art
+    written=[]
+    for i in range(len(ic)):
+        plotfile=path+ic.icmecat_id[i]+'.png'
+        update_gallery_figure(art,ic,data,tnum,i)
+        art['fig'].savefig(plotfile)
+        written.append(plotfile)
+    return written
+
+
+def render_gallery(ic,sc_list=('PSP','SolarOrbiter'),path=gallery_path,datapath=data_path,files=insitu_files,jobs=4,chunk=20,overwrite=False):
+    '''
+    one PNG per event of the spacecraft in sc_list, rendered by jobs worker processes
+
+    the data files of the spacecraft with missing plots are loaded once and
+    shared with all workers, events are sent in chunks of one spacecraft;
+    returns the list of files written
+    '''
+    os.makedirs(path,exist_ok=True)
+    sc_insitu=ic.sc_insitu.to_numpy()
+    done=np.array([os.path.exists(path+i+'.png') for i in ic.icmecat_id])
+    if overwrite:
+        done[:]=False
+
+    tasks=[]
+    for sc in sc_list:
+        ind=np.where(np.logical_and(sc_insitu==sc,~done))[0]
+        for k in range(0,len(ind),chunk):
+            tasks.append((sc,ic.iloc[ind[k:k+chunk]].reset_index(drop=True),path))
+
+    written=[]
+    if len(tasks)==0:
+        return written
+    needed=sorted(set(t[0] for t in tasks))
+    with shared.published(shared.insitu_arrays(needed,path=datapath,files=files)) as spec:
+        with multiprocessing.Pool(jobs,initializer=init_worker,initargs=(spec,)) as pool:
+            for w in pool.imap_unordered(_render,tasks):
+                written.extend(w)
+                print('gallery:',len(written),'plots written')
+    return written
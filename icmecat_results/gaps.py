@@ -0,0 +1,124 @@
+'''
+Data gaps of the in situ arrays: NaN-run index, coverage and resampling.
+
+For every channel the runs of non-finite samples are found once, as sorted
+arrays of run starts and ends (sample indices, end exclusive) with the
+cumulative number of NaN samples. The number of finite samples in any
+window then follows from two np.searchsorted calls, O(log n) per window
+and vectorized over all events. Missing timestamps count as gaps too: the
+coverage of a window is the number of finite samples over the number of
+samples expected at the cadence of the data.
+
+    index=gaps.gap_index(psp)
+    cov=gaps.coverage(index,'np',ic.mo_start_time,ic.mo_end_time)
+
+The resampler interpolates each channel onto a uniform time grid between
+finite samples only, grid points inside gaps longer than max_gap are NaN.
+'''
+
+import numpy as np
+import matplotlib.dates as mdates
+
+from icmecat_results.data import time_num
+from icmecat_results.windows import channels
+
+
+def nan_runs(x):
+    '''start and end indices (end exclusive) of the runs of non-finite values in x'''
+    bad=~np.isfinite(np.asarray(x,dtype=float))
+    d=np.diff(np.concatenate([[0],bad.astype(np.int8),[0]]))
+    return np.where(d==1)[0],np.where(d==-1)[0]
+
+
+def data_cadence(t):
+    '''median sample spacing of the date numbers t in days'''
+    return float(np.median(np.diff(t))) if len(t) > 1 else np.nan
+
+
+def gap_index(data,channels=channels,tnum=None):
+    '''
+    NaN-run index of the recarray data: dict with the date numbers t, the
+    cadence and for each channel the run starts, ends and the number of NaN
+    samples before each run
+    '''
+    t=time_num(data.time) if tnum is None else tnum
+    runs={}
+    for c in channels:
+        start,end=nan_runs(data[c])
+        runs[c]=(start,end,np.concatenate([[0],np.cumsum(end-start)]))
+    return {'t':t,'cadence':data_cadence(t),'runs':runs}
+
+
+def nan_before(index,c,i):
+    '''number of NaN samples of channel c before the sample indices i'''
+    start,end,cum=index['runs'][c]
+    i=np.asarray(i)
+    if len(start)==0:
+        return np.zeros(i.shape,dtype=int)
+    k=np.searchsorted(start,i,side='left')
+    #the run k-1 starts before i and may extend past it
+    inside=np.where(k > 0,np.maximum(end[np.maximum(k-1,0)]-i,0),0)
+    return cum[k]-inside
+
+
+def finite_count(index,c,i0,i1):
+    '''number of finite samples of channel c in the index ranges [i0, i1)'''
+    i0=np.asarray(i0)
+    i1=np.maximum(np.asarray(i1),i0)
+    return (i1-i0)-(nan_before(index,c,i1)-nan_before(index,c,i0))
+
+
+def coverage(index,c,t0,t1):
+    '''
+    fraction of the samples expected at the data cadence in the time windows
+    [t0, t1) that are present and finite in channel c, NaN for empty windows
+    '''
+    t0=time_num(np.asarray(t0))
+    t1=time_num(np.asarray(t1))
+    t=index['t']
+    #samples within rounding of the date numbers count as on the bound
+    eps=1e-3*index['cadence']
+    n=finite_count(index,c,np.searchsorted(t,t0-eps),np.searchsorted(t,t1-eps))
+    expected=np.round((t1-t0)/index['cadence'])
+    with np.errstate(divide='ignore',invalid='ignore'):
+        return np.where(expected > 0,np.minimum(n/expected,1.0),np.nan)
+
+
+def covered(index,t0,t1,channels=channels,min_coverage=0.5):
+    '''boolean mask of the windows with at least min_coverage in all channels'''
+    ok=np.ones(np.shape(t0),dtype=bool)
+    for c in channels:
+        with np.errstate(invalid='ignore'):
+            ok&=coverage(index,c,t0,t1) >= min_coverage
+    return ok
+
+
+def resample(data,minutes=1,max_gap=10,channels=channels,tnum=None,start=None,end=None):
+    '''
+    recarray with time and channels on a uniform grid of minutes spacing,
+    linear interpolation between finite samples, NaN where the finite samples
+    around a grid point are more than max_gap minutes apart
+    '''
+    t=time_num(data.time) if tnum is None else tnum
+    step=minutes/1440
+    t0=np.ceil(t[0]/step)*step if start is None else time_num(start)
+    t1=t[-1] if end is None else time_num(end)
+    grid=t0+step*np.arange(int(np.floor((t1-t0)/step+1e-9))+1)
+
+    out=np.recarray(len(grid),dtype=[('time',object)]+[(c,float) for c in channels])
+    epoch=np.datetime64(mdates.get_epoch())
+    out.time=(epoch+np.round(grid*86400e6).astype('timedelta64[us]')).astype('M8[us]').astype(object)
+    for c in channels:
+        x=np.asarray(data[c],dtype=float)
+        ok=np.isfinite(x)
+        tf,xf=t[ok],x[ok]
+        if len(tf) < 2:
+            out[c]=np.nan
+            continue
+        v=np.interp(grid,tf,xf,left=np.nan,right=np.nan)
+        j=np.clip(np.searchsorted(tf,grid,side='right'),1,len(tf)-1)
+        #exact hits on a finite sample are always kept
+        wide=(tf[j]-tf[j-1] > max_gap/1440) & (tf[j-1]!=grid)
+        v[wide]=np.nan
+        out[c]=v
+    return out
@@ -0,0 +1,144 @@
+'''
+Incremental update of the derived results for a new ICMECAT release.
+
+The new catalog is compared with the cached previous one by icmecat_id.
+Event windows and gallery plots are only made for added or changed events,
+the log-log B(r) fits are updated from their cached sufficient statistics and
+the power law fits start from the cached parameters.
+
+The cache lives in results/cache/ and is created by the first call of update.
+'''
+
+import os
+import pickle
+import numpy as np
+import pandas as pd
+
+from icmecat_results import fits, windows, gallery
+
+
+cache_path='results/cache/'
+
+#log-log fits of the paper, name: (column, min distance, max distance) in au
+loglog_fits={'loglog_1au':('mo_bmean',0.0,1.02),
+             'loglog_all':('mo_bmean',0.0,6.0)}
+
+powerlaw_fits={'powerlaw_bmean':('mo_bmean',0.0,6.0),
+               'powerlaw_bmax':('mo_bmax',0.0,6.0)}
+
+
+def diff_catalogs(old,new,columns=None):
+    '''
+    added, removed and changed icmecat_ids between two catalogs; changed are
+    events in both catalogs where any of the columns differ (NaN equals NaN)
+
+    returns added, removed, changed as arrays of ids and a dataframe with one
+    boolean column per catalog column for the changed events
+    '''
+    if columns is None:
+        columns=[c for c in new.columns if c in old.columns and c!='icmecat_id']
+
+    old_ids=old.icmecat_id.to_numpy()
+    new_ids=new.icmecat_id.to_numpy()
+    added=new_ids[~np.isin(new_ids,old_ids)]
+    removed=old_ids[~np.isin(old_ids,new_ids)]
+
+    common,io,inew=np.intersect1d(old_ids,new_ids,assume_unique=True,return_indices=True)
+    flags={}
+    for c in columns:
+        a=old[c].to_numpy()[io]
+        b=new[c].to_numpy()[inew]
+        same=(a==b) | (pd.isna(a) & pd.isna(b))
+        flags[c]=~same
+    flags=pd.DataFrame(flags,index=common)
+    ischanged=flags.any(axis=1).to_numpy() if len(columns) > 0 else np.zeros(len(common),dtype=bool)
+    return added,removed,common[ischanged],flags[ischanged]
+
+
+def load_cache(path=cache_path):
+    '''previous catalog and results, None if there is no cache yet'''
+    file=path+'state.p'
+    if not os.path.exists(file):
+        return None
+    return pickle.load(open(file,'rb'))
+
+
+def save_cache(state,path=cache_path):
+    os.makedirs(path,exist_ok=True)
+    pickle.dump(state,open(path+'state.p','wb'))
+
+
+def full_state(ic,with_windows=False,jobs=None):
+    '''results for the whole catalog, used for the first run'''
+    state={'ic':ic,'stats':{},'params':{}}
+    for name,(column,rmin,rmax) in loglog_fits.items():
+        state['stats'][name]=fits.loglog_stats(ic,column,rmin,rmax)
+    for name,(column,rmin,rmax) in powerlaw_fits.items():
+        sel=fits.fit_selection(ic,column,rmin,rmax)
+        state['params'][name]=fits.fit_powerlaw(ic.mo_sc_heliodistance.to_numpy()[sel],ic[column].to_numpy()[sel])
+    if with_windows:
+        state['windows']=windows.extract_event_windows(ic,jobs=jobs)
+    return state
+
+
+def update(ic,path=cache_path,with_windows=False,with_plots=False,jobs=None):
+    '''
+    brings the cached results up to date with the catalog ic and returns them,
+    as dict with the catalog, fit parameters, sufficient statistics and windows
+    '''
+    state=load_cache(path)
+    if state is None:
+        print('no cache, processing all',len(ic),'events')
+        state=full_state(ic,with_windows,jobs)
+        added=ic.icmecat_id.to_numpy()
+        changed=np.array([],dtype=str)
+        removed=np.array([],dtype=str)
+    else:
+        old=state['ic']
+        added,removed,changed,_=diff_catalogs(old,ic)
+        print('added',len(added),'removed',len(removed),'changed',len(changed))
+
+        #old rows that go out, new rows that come in
+        out=old[np.isin(old.icmecat_id,np.concatenate([removed,changed]))]
+        new=ic[np.isin(ic.icmecat_id,np.concatenate([added,changed]))]
+
+        for name,(column,rmin,rmax) in loglog_fits.items():
+            state['stats'][name]=state['stats'][name]-fits.loglog_stats(out,column,rmin,rmax)+fits.loglog_stats(new,column,rmin,rmax)
+
+        #power law fits start from the previous parameters, usually a few iterations
+        if len(out)+len(new) > 0:
+            for name,(column,rmin,rmax) in powerlaw_fits.items():
+                sel=fits.fit_selection(ic,column,rmin,rmax)
+                state['params'][name]=fits.fit_powerlaw(ic.mo_sc_heliodistance.to_numpy()[sel],ic[column].to_numpy()[sel],p0=state['params'][name][0])
+
+        #cached windows are rows of the cached catalog, they go stale with it
+        if with_windows:
+            state['windows']=_update_windows(old,ic,state.get('windows'),new,jobs)
+        else:
+            state.pop('windows',None)
+        state['ic']=ic
+
+    if with_plots:
+        for i in np.concatenate([removed,changed]):
+            if os.path.exists(gallery.gallery_path+i+'.png'):
+                os.remove(gallery.gallery_path+i+'.png')
+        gallery.render_gallery(ic,jobs=jobs or 4)
+
+    for name in loglog_fits:
+        state['params'][name]=fits.linear_from_stats(state['stats'][name])
+
+    save_cache(state,path)
+    return state
+
+
+def _update_windows(old,ic,old_windows,new,jobs):
+    '''windows of unchanged events are copied, the others are extracted'''
+    if old_windows is None:
+        return windows.extract_event_windows(ic,jobs=jobs)
+    index=dict(zip(old.icmecat_id,range(len(old))))
+    w=np.full((len(ic),)+old_windows.shape[1:],np.nan)
+    keep=~np.isin(ic.icmecat_id,new.icmecat_id)
+    w[keep]=old_windows[[index[i] for i in ic.icmecat_id[keep]]]
+    if len(new) > 0:
+        w[~keep]=windows.extract_event_windows(ic[~keep].reset_index(drop=True),jobs=jobs)
+    return w
@@ -0,0 +1,177 @@
+'''
+Bayesian fits of the powerlaw and multipower B(r) models with MCMC.
+
+The sampler is the affine-invariant ensemble sampler (stretch move, Goodman
+& Weare 2010). The log likelihood is evaluated for all walkers and all events
+as one array, independent chains run in separate processes. The posterior
+samples give the field at 1 Rs, 1.3 Rs and in the Alfvén surface region
+16-20 Rs with credible intervals, instead of the linearized covariance.
+
+The likelihood is Gaussian in ln B with a free scatter ln_sigma (space='log'),
+or Gaussian in B as for the least squares fits (space='linear').
+'''
+
+import multiprocessing
+import numpy as np
+import scipy.optimize
+import astropy.constants as const
+
+from icmecat_results import fits
+
+
+rs=(const.R_sun/const.au).value
+gauss=1e5 #1 Gauss= 10^5 nT
+
+#sunspot field at 1 Rs added for the multipower fit, as in the paper script
+sunspot_r=rs
+sunspot_b=2000*gauss
+
+models={'powerlaw':fits.powerlaw,'multipower':fits.multipower}
+
+#distances for the posterior of the field
+field_points={'1 Rs':np.array([1.0])*rs,'1.3 Rs':np.array([1.3])*rs,'16-20 Rs':np.linspace(16,20,9)*rs}
+
+
+def log_prior(theta,model):
+    '''flat priors, -inf outside; theta (n_walkers, 3) with ln_sigma last'''
+    a,p,ln_sigma=theta[:,0],theta[:,1],theta[:,2]
+    ok=(a > 0) & (ln_sigma > -10) & (ln_sigma < 15)
+    if model=='powerlaw':
+        ok&=(p > -10) & (p < 2)
+    else:
+        ok&=p >= 0
+    return np.where(ok,0.0,-np.inf)
+
+
+def log_prob(theta,r,b,model,space='log'):
+    '''log posterior for all walkers at once, theta (n_walkers, 3)'''
+    lp=log_prior(theta,model)
+    ok=np.isfinite(lp)
+    out=np.full(len(theta),-np.inf)
+    if not np.any(ok):
+        return out
+    t=theta[ok]
+    with np.errstate(divide='ignore',invalid='ignore'):
+        m=models[model](r[None,:],t[:,0:1],t[:,1:2])
+        y=b[None,:]
+        if space=='log':
+            m=np.log(m)
+            y=np.log(y)
+    sigma=np.exp(t[:,2:3])
+    res=(y-m)/sigma
+    ll=-0.5*np.sum(res*res,axis=1)-len(r)*t[:,2]
+    out[ok]=np.where(np.isfinite(ll),ll,-np.inf)
+    return out
+
+
+def sample(r,b,model='powerlaw',space='log',n_walkers=32,n_steps=2000,p0=None,width=None,seed=None,stretch=2.0,ball=0.1):
+    '''
+    one ensemble chain, returns samples (n_steps, n_walkers, 3) and the acceptance fraction;
+    the walkers start at p0 with a spread of ball times width
+    '''
+    rng=np.random.default_rng(seed)
+    r=np.asarray(r,dtype=float)
+    b=np.asarray(b,dtype=float)
+    if p0 is None:
+        p0,width=start_point(r,b,model,space)
+    if width is None:
+        width=1e-2*np.maximum(np.abs(p0),1)
+    pos=p0[None,:]+ball*width[None,:]*rng.standard_normal((n_walkers,len(p0)))
+    lp=log_prob(pos,r,b,model,space)
+
+    chain=np.empty((n_steps,n_walkers,len(p0)))
+    accepted=0
+    half=n_walkers//2
+    groups=[np.arange(half),np.arange(half,n_walkers)]
+    for step in range(n_steps):
+        for k in range(2):
+            active=groups[k]
+            other=groups[1-k]
+            #stretch move towards a random walker of the other half
+            z=((stretch-1)*rng.random(len(active))+1)**2/stretch
+            partner=pos[rng.choice(other,len(active))]
+            proposal=partner+z[:,None]*(pos[active]-partner)
+            lp_new=log_prob(proposal,r,b,model,space)
+            accept=np.log(rng.random(len(active))) < (len(p0)-1)*np.log(z)+lp_new-lp[active]
+            pos[active[accept]]=proposal[accept]
+            lp[active[accept]]=lp_new[accept]
+            accepted+=accept.sum()
+        chain[step]=pos
+    return chain,accepted/(n_steps*n_walkers)
+
+
+def start_point(r,b,model,space):
+    '''
+    least squares parameters and scatter as start of the walkers, and their
+    standard deviations as width of the walker ball; the width of ln_sigma is
+    1/sqrt(2 n), so the ball does not collapse when ln_sigma is about 0
+    '''
+    if model=='powerlaw':
+        p,cov=fits.fit_powerlaw(r,b)
+    else:
+        p,cov=scipy.optimize.curve_fit(fits.multipower,r,b,method='lm')
+        p=np.abs(p)
+    m=models[model](r,*p)
+    res=np.log(b)-np.log(m) if space=='log' else b-m
+    res=res[np.isfinite(res)]
+    p0=np.array([p[0],p[1],np.log(np.std(res))])
+    width=np.append(np.sqrt(np.abs(np.diag(cov))),1/np.sqrt(2*len(res)))
+    #no usable covariance, e.g. for a singular fit
+    width=np.where(np.isfinite(width) & (width > 0),width,1e-2*np.maximum(np.abs(p0),1))
+    return p0,width
+
+
+def _chain(args):
+    r,b,model,space,n_walkers,n_steps,p0,width,seed=args
+    return sample(r,b,model,space,n_walkers,n_steps,p0,width,seed)
+
+
+def run_chains(r,b,model='powerlaw',space='log',n_chains=4,n_walkers=32,n_steps=2000,jobs=None,seed=0):
+    '''
+    n_chains independent chains on separate processes
+
+    returns samples (n_chains, n_steps, n_walkers, 3) and the acceptance fractions
+    '''
+    r=np.asarray(r,dtype=float)
+    b=np.asarray(b,dtype=float)
+    p0,width=start_point(r,b,model,space)
+    seeds=np.random.SeedSequence(seed).spawn(n_chains)
+    tasks=[(r,b,model,space,n_walkers,n_steps,p0,width,s) for s in seeds]
+    with multiprocessing.Pool(jobs or n_chains) as pool:
+        res=pool.map(_chain,tasks)
+    return np.stack([c for c,a in res]),np.array([a for c,a in res])
+
+
+def gelman_rubin(samples,burn=0.5):
+    '''potential scale reduction R-hat per parameter over the chains, after burn-in'''
+    s=samples[:,int(burn*samples.shape[1]):]
+    s=s.reshape(s.shape[0],-1,s.shape[-1])
+    n=s.shape[1]
+    w=s.var(axis=1,ddof=1).mean(axis=0)
+    bvar=n*s.mean(axis=1).var(axis=0,ddof=1)
+    return np.sqrt(((n-1)/n*w+bvar/n)/w)
+
+
+def field_posterior(samples,model='powerlaw',points=field_points,burn=0.5,thin=10):
+    '''
+    posterior samples of the field in Gauss at the distances in points,
+    with median and 16/84 percentiles for each
+    '''
+    s=samples[:,int(burn*samples.shape[1])::thin].reshape(-1,samples.shape[-1])
+    out={}
+    for name,rp in points.items():
+        field=models[model](rp[None,:],s[:,0:1],s[:,1:2])/gauss
+        out[name]={'samples':field,'median':np.median(field,axis=0),
+                   'p16':np.percentile(field,16,axis=0),'p84':np.percentile(field,84,axis=0)}
+    return out
+
+
+def catalog_data(ic,model='powerlaw',column='mo_bmean',rmin=0.0,rmax=6.0,min_quality=None):
+    '''distances and fields as for the paper fits, with the sunspot point for multipower'''
+    sel=fits.fit_selection(ic,column,rmin,rmax,min_quality)
+    r=ic.mo_sc_heliodistance.to_numpy()[sel]
+    b=ic[column].to_numpy()[sel]
+    if model=='multipower':
+        r=np.append(r,sunspot_r)
+        b=np.append(b,sunspot_b)
+    return r,b
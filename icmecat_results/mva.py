@@ -0,0 +1,99 @@
+'''
+Minimum variance analysis of the magnetic field in every magnetic obstacle.
+
+The samples of all MO intervals of one data file are concatenated with
+windows.segment_indices, sums of the components and their products are
+segmented reductions (np.bincount over the event number), and the 3x3
+covariance matrices of all events are solved in one np.linalg.eigh call on
+the stacked array (n_events, 3, 3).
+
+Eigenvalues are sorted as lambda_max >= lambda_int >= lambda_min with the
+eigenvectors of maximum, intermediate and minimum variance in RTN. The
+intermediate direction is the usual estimate of a flux rope axis; its sign
+is chosen so that the mean field along it is positive, the minimum variance
+direction is chosen with a positive R component.
+'''
+
+import numpy as np
+import pandas as pd
+
+from icmecat_results.data import load_insitu, time_num, data_path, insitu_files
+from icmecat_results.windows import event_indices, segment_indices, map_files
+
+
+components=('bx','by','bz')
+
+columns=['n','lambda_max','lambda_int','lambda_min','ratio_int_min','ratio_max_int',
+         'max_r','max_t','max_n','int_r','int_t','int_n','min_r','min_t','min_n',
+         'int_theta','int_phi','min_theta','min_phi','b_int','b_min']
+
+
+def covariance_matrices(data,start,end):
+    '''
+    mean field (n_events, 3), covariance matrices (n_events, 3, 3) and number
+    of samples with finite components for the sample ranges [start, end)
+    '''
+    ind,seg=segment_indices(start,end)
+    ne=len(start)
+    b=np.stack([np.asarray(data[c],dtype=float)[ind] for c in components],axis=-1)
+    ok=np.isfinite(b).all(axis=-1)
+    b=np.where(ok[:,None],b,0.0)
+
+    n=np.bincount(seg,weights=ok,minlength=ne)
+    nn=np.maximum(n,1)
+    mean=np.stack([np.bincount(seg,weights=b[:,i],minlength=ne) for i in range(3)],axis=-1)/nn[:,None]
+    cov=np.empty((ne,3,3))
+    for i in range(3):
+        for j in range(i,3):
+            cov[:,i,j]=np.bincount(seg,weights=b[:,i]*b[:,j],minlength=ne)/nn-mean[:,i]*mean[:,j]
+            cov[:,j,i]=cov[:,i,j]
+    return mean,cov,n
+
+
+def mva(mean,cov,n,min_samples=10):
+    '''eigen analysis of the stacked covariance matrices, array (n_events, len(columns))'''
+    valid=(n >= min_samples) & np.isfinite(cov).all(axis=(1,2))
+    lam,vec=np.linalg.eigh(np.where(valid[:,None,None],cov,np.eye(3)))
+    #eigh sorts ascending: columns are min, int, max
+    vmin,vint,vmax=vec[:,:,0],vec[:,:,1],vec[:,:,2]
+    b_int=np.sum(mean*vint,axis=-1)
+    vint=vint*np.where(b_int < 0,-1,1)[:,None]
+    vmin=vmin*np.where(vmin[:,0] < 0,-1,1)[:,None]
+    vmax=np.cross(vint,vmin)
+
+    with np.errstate(divide='ignore',invalid='ignore'):
+        out=np.column_stack([n,lam[:,2],lam[:,1],lam[:,0],lam[:,1]/lam[:,0],lam[:,2]/lam[:,1],
+                             vmax,vint,vmin,
+                             np.degrees(np.arcsin(np.clip(vint[:,2],-1,1))),np.degrees(np.arctan2(vint[:,1],vint[:,0])) % 360,
+                             np.degrees(np.arcsin(np.clip(vmin[:,2],-1,1))),np.degrees(np.arctan2(vmin[:,1],vmin[:,0])) % 360,
+                             np.abs(b_int),np.sum(mean*vmin,axis=-1)])
+    out[~valid,1:]=np.nan
+    return out
+
+
+def mva_data(data,ic,tnum=None):
+    '''MVA for all events in ic within the recarray data'''
+    t=time_num(data.time) if tnum is None else tnum
+    start=np.clip(event_indices(t,ic.mo_start_time.to_numpy())+1,0,len(t))
+    end=np.clip(event_indices(t,ic.mo_end_time.to_numpy())+1,0,len(t))
+    mean,cov,n=covariance_matrices(data,start,end)
+    return mva(mean,cov,n)
+
+
+def _mva_file(args):
+    sc,ic,path,files=args
+    data=load_insitu(sc,path=path,files=files)
+    return mva_data(data,ic)
+
+
+def mva_catalog(ic,path=data_path,files=insitu_files,jobs=None):
+    '''
+    MVA of every event with in situ data in files, one worker per data file;
+    dataframe with icmecat_id and the columns above, NaN without data
+    '''
+    out=np.full((len(ic),len(columns)),np.nan)
+    for ind,res in map_files(_mva_file,ic,(),path,files,jobs):
+        out[ind]=res
+    res=pd.DataFrame(out,columns=columns)
+    res.insert(0,'icmecat_id',ic.icmecat_id.to_numpy())
+    return res
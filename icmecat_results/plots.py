@@ -0,0 +1,185 @@
+'''
+Multi-panel event plots for lists of ICMECAT events, as in Fig. 3 of the paper.
+
+Data for each panel come through the shared event index in windows.py, the
+distance annotation is the minimum heliocentric distance of the spacecraft
+between icme_start_time and mo_end_time. For galleries, the Figure and Axes
+are created once and cleared for every page.
+
+Plot limits and tick intervals follow from the event duration, or are given
+per event; plot_fig3 passes the hand-picked values of the published Fig. 3.
+'''
+
+import datetime
+import numpy as np
+import matplotlib.pyplot as plt
+import matplotlib.dates as mdates
+
+from icmecat_results.data import time_num
+from icmecat_results.windows import event_indices
+
+
+sc_labels={'PSP':'PSP','SolarOrbiter':'Solar Orbiter','BepiColombo':'BepiColombo','Wind':'Wind','STEREO-A':'STEREO-A'}
+
+panel_labels='abcdefghijklmnopqrstuvwxyz'
+
+lw=1.3
+al=0.7
+
+date_format='%b-%d %Hh'
+
+#the 6 closest PSP events of Fig. 3, with the plot limits, major tick
+#intervals in hours and tick formats of the published figure
+fig3_ids=['ICME_PSP_MOESTL_20220905_01','ICME_PSP_MOESTL_20220602_01','ICME_PSP_MOESTL_20210430_01',
+          'ICME_PSP_MOESTL_20241222_01','ICME_PSP_MOESTL_20241004_01','ICME_PSP_MOESTL_20230313_01']
+
+fig3_xlim={'ICME_PSP_MOESTL_20220905_01':(datetime.datetime(2022,9,5,13),datetime.datetime(2022,9,6,10)),
+           'ICME_PSP_MOESTL_20220602_01':(datetime.datetime(2022,6,2,8),datetime.datetime(2022,6,2,18)),
+           'ICME_PSP_MOESTL_20210430_01':(datetime.datetime(2021,4,30,1),datetime.datetime(2021,4,30,18)),
+           'ICME_PSP_MOESTL_20241222_01':(datetime.datetime(2024,12,22,1),datetime.datetime(2024,12,23,1)),
+           'ICME_PSP_MOESTL_20241004_01':(datetime.datetime(2024,10,4,1),datetime.datetime(2024,10,4,15)),
+           'ICME_PSP_MOESTL_20230313_01':(datetime.datetime(2023,3,13,5),datetime.datetime(2023,3,13,23))}
+
+fig3_interval={'ICME_PSP_MOESTL_20220905_01':4,'ICME_PSP_MOESTL_20220602_01':2,'ICME_PSP_MOESTL_20210430_01':4,
+               'ICME_PSP_MOESTL_20241222_01':6,'ICME_PSP_MOESTL_20241004_01':6,'ICME_PSP_MOESTL_20230313_01':6}
+
+fig3_format={'ICME_PSP_MOESTL_20220905_01':'%b-%d %H:00'}
+
+#panel labels (a) to (f) in figure fraction
+fig3_label_xy=[(0.02,0.97),(0.50,0.97),(0.02,0.64),(0.50,0.64),(0.02,0.32),(0.50,0.32)]
+
+
+def event_window(ic,data,i,pad=0.3,tnum=None,xlim=None):
+    '''
+    data around catalog row i with pad times the ICME duration before and after,
+    or within the limits xlim, the plot limits and the minimum distance during
+    the ICME; tnum are the data times as date numbers, computed once for many events
+    '''
+    start=ic.icme_start_time[i]
+    end=ic.mo_end_time[i]
+    dur=end-start
+    t0,t1=(start-pad*dur,end+pad*dur) if xlim is None else xlim
+
+    [i0,i1,startind,endind]=event_indices(data.time if tnum is None else tnum,np.array([t0,t1,start,end]))
+    i0=max(i0,0)
+    sc=data[i0:i1+2]
+    rmin=np.nanmin(data.r[startind:endind]) if endind > startind else np.nan
+    return sc,(t0,t1),rmin
+
+
+def hour_interval(t0,t1):
+    '''major tick interval in hours for about 4 ticks'''
+    hours=(t1-t0).total_seconds()/3600
+    for h in [1,2,4,6,12]:
+        if hours/h <= 5:
+            return h
+    return 24
+
+
+def plot_boundaries(ax,ic,index):
+    #plot vertical lines
+    ax.axvline(ic.icme_start_time[index],color='black',linewidth=lw,alpha=al)
+    ax.axvline(ic.mo_start_time[index],color='black',linewidth=lw,alpha=al)
+    ax.axvline(ic.mo_end_time[index],color='black',linewidth=lw,alpha=al)
+
+
+def plot_event_panel(ax,ic,data,i,pad=0.3,tnum=None,xlim=None,interval=None,fmt=date_format):
+    '''
+    B RTN components and |B| for catalog row i on ax, returns the minimum distance;
+    xlim and the major tick interval in hours are chosen from the event if None
+    '''
+    sc,(t0,t1),rmin=event_window(ic,data,i,pad,tnum,xlim)
+
+    ax.plot(sc.time,sc.bx,'-r',label='$B_{R}$',linewidth=lw)
+    ax.plot(sc.time,sc.by,'-g',label='$B_{T}$',linewidth=lw)
+    ax.plot(sc.time,sc.bz,'-b',label='$B_{N}$',linewidth=lw)
+    ax.plot(sc.time,sc.bt,'-k',label='$|B|$',lw=lw)
+    ax.set_ylabel('B [nT] RTN')
+
+    start=ic.icme_start_time[i]
+    name=sc_labels.get(ic.sc_insitu[i],ic.sc_insitu[i])
+    ax.annotate(f'{name} {start:%Y %b} {start.day}',xy=(0.85,0.88),xycoords='axes fraction',fontsize=11,ha='center',bbox=dict(boxstyle='round', facecolor='white'))
+    ax.annotate(f'{rmin:.4f} au',xy=(0.85,0.08),xycoords='axes fraction',fontsize=11,ha='center',bbox=dict(boxstyle='round', facecolor='white'))
+
+    plot_boundaries(ax,ic,i)
+    ax.set_xlim(t0,t1)
+    ax.xaxis.set_major_formatter(mdates.DateFormatter(fmt))
+    ax.xaxis.set_major_locator(mdates.HourLocator(interval=hour_interval(t0,t1) if interval is None else interval))
+    ax.xaxis.set_minor_locator(mdates.HourLocator(interval=1))
+    ax.tick_params(which="both", bottom=True)
+    return rmin
+
+
+def event_figure(n,ncols=2,figsize=None,dpi=150):
+    '''Figure and flat list of Axes for n panels'''
+    nrows=int(np.ceil(n/ncols))
+    if figsize is None:
+        figsize=(6*ncols,10/3*nrows)
+    fig,axes=plt.subplots(nrows,ncols,figsize=figsize,dpi=dpi,squeeze=False)
+    return fig,list(axes.ravel())
+
+
+def plot_events(ic,data,ids,fig=None,axes=None,ncols=2,pad=0.3,figsize=None,labels=True,tnum=None,
+                xlim=None,interval=None,fmt=None,label_xy=None):
+    '''
+    N-panel plot of the events with icmecat_id in ids
+
+    data is a dict of in situ recarrays for each ic.sc_insitu name, e.g. {'PSP':psp};
+    fig and axes from a previous call are cleared and reused, as well as the
+    data times tnum as date numbers for each spacecraft.
+    xlim, interval and fmt are dicts by icmecat_id of the plot limits, major
+    tick intervals in hours and tick formats for the events that do not use
+    the defaults; label_xy are the panel label positions in figure fraction,
+    else the labels are placed next to each panel.
+    Returns fig, axes and the minimum distance for each event.
+    '''
+    xlim=xlim or {}
+    interval=interval or {}
+    fmt=fmt or {}
+    index=dict(zip(ic.icmecat_id,range(len(ic))))
+    rows=[index[i] for i in ids]
+    sc_insitu=ic.sc_insitu.to_numpy()
+
+    if fig is None:
+        fig,axes=event_figure(len(rows),ncols,figsize)
+
+    if tnum is None:
+        tnum={sc:time_num(data[sc].time) for sc in set(sc_insitu[rows])}
+
+    rmin=np.full(len(rows),np.nan)
+    for k,ax in enumerate(axes):
+        ax.cla()
+        if k >= len(rows):
+            ax.set_visible(False)
+            continue
+        ax.set_visible(True)
+        i=rows[k]
+        e=ids[k]
+        rmin[k]=plot_event_panel(ax,ic,data[sc_insitu[i]],i,pad,tnum[sc_insitu[i]],xlim.get(e),interval.get(e),fmt.get(e,date_format))
+        if labels and label_xy is None:
+            ax.text(-0.12,1.05,'('+panel_labels[k % 26]+')',transform=ax.transAxes,fontsize=13,va='top')
+
+    fig.tight_layout()
+    if labels and label_xy is not None:
+        for k,xy in enumerate(label_xy[:len(rows)]):
+            fig.text(xy[0],xy[1],'('+panel_labels[k % 26]+')',fontsize=13,ha='center')
+    return fig,axes,rmin
+
+
+def plot_fig3(ic,psp,figsize=(12,10)):
+    '''Fig. 3 of the paper with the published limits, ticks and panel labels, returns fig, axes, rmin'''
+    return plot_events(ic,{'PSP':psp},fig3_ids,ncols=2,figsize=figsize,
+                       xlim=fig3_xlim,interval=fig3_interval,fmt=fig3_format,label_xy=fig3_label_xy)
+
+
+def plot_event_pages(ic,data,ids,plotfile='results/events_{:03d}.png',per_page=6,ncols=2,pad=0.3):
+    '''gallery of all events in ids with per_page panels per file, one Figure for all pages'''
+    fig,axes=event_figure(per_page,ncols)
+    tnum={sc:time_num(d.time) for sc,d in data.items()}
+    files=[]
+    for p in range(0,len(ids),per_page):
+        plot_events(ic,data,ids[p:p+per_page],fig=fig,axes=axes,ncols=ncols,pad=pad,labels=False,tnum=tnum)
+        files.append(plotfile.format(p//per_page))
+        fig.savefig(files[-1])
+    plt.close(fig)
+    return files
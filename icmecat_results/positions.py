@@ -0,0 +1,82 @@
+'''
+Interpolated spacecraft and planet positions at arbitrary times.
+
+The positions file is read on first use, the prepared track of each body
+(date numbers, r, unwrapped lon, lat) is kept in an LRU cache. A lookup for
+any number of times and bodies is one searchsorted and one linear
+interpolation per body.
+'''
+
+import functools
+import numpy as np
+import astropy.constants as const
+
+from icmecat_results.data import load_positions, time_num, positions_file, sc_bodies
+
+
+au=const.au.value
+
+
+@functools.lru_cache(maxsize=2)
+def _positions(file):
+    return load_positions(file)
+
+
+@functools.lru_cache(maxsize=16)
+def track(body,file=positions_file):
+    '''time, r [au], unwrapped lon and lat [rad] of one body'''
+    pos=_positions(file)[body]
+    return time_num(pos.time),np.asarray(pos.r,dtype=float),np.unwrap(pos.lon),np.asarray(pos.lat,dtype=float)
+
+
+def lookup_indices(tt,t):
+    '''left index and interpolation weight of times t in track times tt, NaN weight outside'''
+    i=np.clip(np.searchsorted(tt,t,side='right')-1,0,len(tt)-2)
+    w=(t-tt[i])/(tt[i+1]-tt[i])
+    w[(t < tt[0]) | (t > tt[-1])]=np.nan
+    return i,w
+
+
+def interpolate(trk,i,w):
+    '''r, lon, lat (n, 3) for precomputed indices and weights, lon in -pi .. pi'''
+    out=np.empty((len(i),3))
+    for k,y in enumerate(trk[1:]):
+        out[:,k]=y[i]+w*(y[i+1]-y[i])
+    out[:,1]=(out[:,1]+np.pi) % (2*np.pi)-np.pi
+    return out
+
+
+def lookup(times,bodies,file=positions_file):
+    '''
+    interpolated HEEQ r [au], lon, lat [rad] as array (n, 3) for all times,
+    bodies is one name or an array of names for each time
+    '''
+    t=np.atleast_1d(time_num(times))
+    bodies=np.broadcast_to(np.asarray(bodies,dtype=object),t.shape)
+    bodies=np.where(bodies==None,'',bodies).astype(str)
+    out=np.full((len(t),3),np.nan)
+
+    #group the times by body with one sort
+    names,inv=np.unique(bodies,return_inverse=True)
+    order=np.argsort(inv,kind='stable')
+    bounds=np.searchsorted(inv[order],np.arange(len(names)+1))
+    for k,b in enumerate(names):
+        if b=='':
+            continue
+        sel=order[bounds[k]:bounds[k+1]]
+        trk=track(b,file)
+        i,w=lookup_indices(trk[0],t[sel])
+        out[sel]=interpolate(trk,i,w)
+    return out
+
+
+def event_positions(ic,time='mo_start_time',file=positions_file):
+    '''positions of the observing spacecraft at a catalog time column, NaN without a track'''
+    bodies=ic.sc_insitu.map(sc_bodies).to_numpy()
+    bodies=np.where(ic.sc_insitu.isin(list(sc_bodies)),bodies,None)
+    return lookup(ic[time].to_numpy(),bodies,file)
+
+
+def propagation_delay(r1,r2,v):
+    '''radial travel time in hours from r1 to r2 [au] at speed v [km/s]'''
+    return (np.asarray(r2)-np.asarray(r1))*au/(np.asarray(v)*1e3)/3600
@@ -0,0 +1,89 @@
+'''
+Data quality scores of every event from the in situ data.
+
+The NaN-run index of each data file is built once (gaps.gap_index) and the
+coverage of every interval is taken from it with gaps.coverage: the number
+of finite samples over the samples expected at the data cadence, so data
+gaps without timestamps count as missing.
+
+Scores, all between 0 and 1:
+    quality_mag        coverage of |B| in the MO
+    quality_plasma     lowest coverage of V, N, T in the MO
+    quality_boundary   lowest |B| coverage in the windows of boundary_hours
+                       around icme_start_time, mo_start_time and mo_end_time,
+                       a proxy for how well the boundaries are defined since
+                       the catalog has no boundary uncertainties
+    quality_score      lowest of the three
+
+The scores are added as catalog columns; fits.fit_selection takes a
+min_quality threshold on quality_score, so fits with other thresholds need
+no new pass over the data (see refit).
+'''
+
+import numpy as np
+import pandas as pd
+
+from icmecat_results import fits
+from icmecat_results.data import load_insitu, time_num, data_path, insitu_files
+from icmecat_results.gaps import gap_index, coverage
+from icmecat_results.windows import map_files
+
+
+coverage_channels=('bt','vt','np','tp')
+plasma_channels=('vt','np','tp')
+
+columns=['coverage_bt_mo','coverage_vt_mo','coverage_np_mo','coverage_tp_mo','coverage_bt_sheath',
+         'quality_mag','quality_plasma','quality_boundary','quality_score']
+
+boundary_hours=1.0
+
+
+def quality_data(data,ic,tnum=None,boundary_hours=boundary_hours):
+    '''coverage and quality scores for all events in ic within the recarray data, array (n_events, len(columns))'''
+    index=gap_index(data,coverage_channels,tnum)
+    icme_start=time_num(ic.icme_start_time.to_numpy())
+    mo_start=time_num(ic.mo_start_time.to_numpy())
+    mo_end=time_num(ic.mo_end_time.to_numpy())
+
+    mo={c:coverage(index,c,mo_start,mo_end) for c in coverage_channels}
+    sheath=coverage(index,'bt',icme_start,mo_start)
+    half=boundary_hours/48
+    boundary=np.min([coverage(index,'bt',tb-half,tb+half) for tb in (icme_start,mo_start,mo_end)],axis=0)
+    mag=mo['bt']
+    plasma=np.min([mo[c] for c in plasma_channels],axis=0)
+    score=np.min([mag,plasma,boundary],axis=0)
+    return np.column_stack([mo['bt'],mo['vt'],mo['np'],mo['tp'],sheath,mag,plasma,boundary,score])
+
+
+def _quality_file(args):
+    sc,ic,path,files,boundary_hours=args
+    data=load_insitu(sc,path=path,files=files)
+    return quality_data(data,ic,boundary_hours=boundary_hours)
+
+
+def score_catalog(ic,path=data_path,files=insitu_files,boundary_hours=boundary_hours,jobs=None):
+    '''
+    copy of ic with the coverage and quality columns, one worker per data file;
+    NaN for events of spacecraft without data file
+    '''
+    out=np.full((len(ic),len(columns)),np.nan)
+    for ind,res in map_files(_quality_file,ic,(boundary_hours,),path,files,jobs):
+        out[ind]=res
+    ic=ic.copy()
+    for k,c in enumerate(columns):
+        ic[c]=out[:,k]
+    return ic
+
+
+def refit(ic,thresholds=(None,0.5,0.7,0.9),column='mo_bmean',rmin=0.0,rmax=6.0):
+    '''power law and log-log fits of the scored catalog for each min_quality threshold, one row each'''
+    rows=[]
+    r=ic.mo_sc_heliodistance.to_numpy()
+    for q in thresholds:
+        sel=fits.fit_selection(ic,column,rmin,rmax,q)
+        (k,d),_=fits.linear_from_stats(fits.loglog_stats(ic,column,rmin,rmax,q))
+        param,cov=fits.fit_powerlaw(r[sel],ic[column].to_numpy()[sel])
+        err=np.sqrt(np.diag(cov))
+        rows.append({'min_quality':np.nan if q is None else q,'n':int(sel.sum()),
+                     'a':param[0],'a_err':err[0],'b':param[1],'b_err':err[1],'loglog_k':k,'loglog_d':d})
+    return pd.DataFrame(rows)
@@ -0,0 +1,117 @@
+'''
+Quantile regression envelopes of log10(B) vs log10(r).
+
+For a fixed slope k the best intercept of a quantile fit is the quantile of
+y - k x, so the fit reduces to minimizing a convex function of k alone. This
+is done with a golden section search for all quantiles and all bootstrap
+resamples at once, every step is one np.partition over the stacked arrays.
+The search stops when the slope bracket is narrower than tol (1e-10 by
+default), so the slope is that of the linear program solution to within tol
+and the intercept is the exact quantile for that slope. Parameters are k, d
+of the linear function in log-log space as for the paper fits, so
+B(r) = 10^d r^k.
+'''
+
+import numpy as np
+
+from icmecat_results import fits
+
+
+quantiles=(0.05,0.25,0.5,0.75,0.95)
+
+golden=(np.sqrt(5)-1)/2
+
+
+def _profile(x,y,k,tau,kth):
+    '''quantile loss and best intercept for slopes k of shape (n_sets, n_q)'''
+    z=y[:,None,:]-k[...,None]*x[:,None,:]
+    d=np.empty(k.shape)
+    for q in range(len(tau)):
+        d[:,q]=np.partition(z[:,q],kth[q],axis=-1)[:,kth[q]]
+    u=z-d[...,None]
+    loss=np.sum(u*(tau[None,:,None]-(u < 0)),axis=-1)
+    return loss,d
+
+
+def quantile_fit(x,y,q=quantiles,width=3.0,tol=1e-10,chunk=250):
+    '''
+    quantile regression y = k x + d for every quantile in q
+
+    x and y have shape (n,) or (n_sets, n) without NaNs; the slope is searched
+    within width around the least squares slope. Returns parameters of shape
+    (len(q), 2) or (n_sets, len(q), 2)
+    '''
+    x=np.asarray(x,dtype=float)
+    y=np.asarray(y,dtype=float)
+    single=x.ndim==1
+    x=np.atleast_2d(x)
+    y=np.atleast_2d(y)
+    param=np.empty((len(x),len(q),2))
+    #sets in chunks to bound the memory of the (n_sets, n_q, n) arrays
+    for s in range(0,len(x),chunk):
+        param[s:s+chunk]=_golden_fit(x[s:s+chunk],y[s:s+chunk],np.asarray(q,dtype=float),width,tol)
+    return param[0] if single else param
+
+
+def _golden_fit(x,y,tau,width,tol):
+    n=x.shape[1]
+    kth=np.clip(np.ceil(n*tau).astype(int)-1,0,n-1)
+
+    #bracket around the least squares slope
+    xm=x.mean(-1,keepdims=True)
+    k0=np.sum((x-xm)*y,-1)/np.sum((x-xm)**2,-1)
+    a=np.repeat(k0[:,None]-width,len(tau),axis=1)
+    b=np.repeat(k0[:,None]+width,len(tau),axis=1)
+
+    c=b-golden*(b-a)
+    d=a+golden*(b-a)
+    fc,_=_profile(x,y,c,tau,kth)
+    fd,_=_profile(x,y,d,tau,kth)
+    while np.max(b-a) > tol:
+        #minimum in [a, d] if fc < fd, else in [c, b]; one new point per set and quantile
+        left=fc < fd
+        b=np.where(left,d,b)
+        a=np.where(left,a,c)
+        fkeep=np.where(left,fc,fd)
+        c,d=np.where(left,b-golden*(b-a),d),np.where(left,c,a+golden*(b-a))
+        fnew,_=_profile(x,y,np.where(left,c,d),tau,kth)
+        fc=np.where(left,fnew,fkeep)
+        fd=np.where(left,fkeep,fnew)
+
+    k=(a+b)/2
+    _,d=_profile(x,y,k,tau,kth)
+    return np.stack([k,d],axis=-1)
+
+
+def loglog_quantiles(ic,column='mo_bmean',rmin=0.0,rmax=6.0,q=quantiles,min_quality=None):
+    '''quantile envelopes of the catalog, parameters (len(q), 2) of k, d'''
+    sel=fits.fit_selection(ic,column,rmin,rmax,min_quality)
+    x=np.log10(ic.mo_sc_heliodistance.to_numpy()[sel])
+    y=np.log10(ic[column].to_numpy()[sel])
+    return quantile_fit(x,y,q)
+
+
+def bootstrap_quantiles(ic,n_boot=1000,column='mo_bmean',rmin=0.0,rmax=6.0,q=quantiles,seed=None):
+    '''quantile envelopes for n_boot resamples of the events, parameters (n_boot, len(q), 2)'''
+    sel=fits.fit_selection(ic,column,rmin,rmax)
+    x=np.log10(ic.mo_sc_heliodistance.to_numpy()[sel])
+    y=np.log10(ic[column].to_numpy()[sel])
+    rng=np.random.default_rng(seed)
+    ind=rng.integers(0,len(x),size=(n_boot,len(x)))
+    return quantile_fit(x[ind],y[ind],q)
+
+
+def quantile_curves(param,fitx):
+    '''B(r) for each quantile on the distances fitx, shape (len(q), len(fitx))'''
+    return 10**param[:,1,None]*fitx[None,:]**param[:,0,None]
+
+
+def plot_quantile_bands(ax,param,fitx,q=quantiles,color='k'):
+    '''outer and inner quantile bands and the median line, as in figures.fig4_quantiles'''
+    curves=quantile_curves(param,fitx)
+    q=list(q)
+    ax.fill_between(fitx,curves[0],curves[-1],color=color,alpha=0.1,lw=0,label=f'{q[0]*100:.0f}-{q[-1]*100:.0f}% quantiles')
+    if len(q) >= 5:
+        ax.fill_between(fitx,curves[1],curves[-2],color=color,alpha=0.2,lw=0,label=f'{q[1]*100:.0f}-{q[-2]*100:.0f}% quantiles')
+    if 0.5 in q:
+        ax.plot(fitx,curves[q.index(0.5)],'--',color=color,label='median fit')
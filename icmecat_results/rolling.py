@@ -0,0 +1,154 @@
+'''
+Window statistics over the raw in situ series and ambient solar wind baselines.
+
+Means over any set of sample windows come from prefix sums of the values and
+of the finite mask, O(1) per window after one cumulative sum. Medians of many
+windows are taken at once: the samples of all windows are concatenated
+(windows.segment_indices), sorted by window and value with one np.lexsort,
+and the median is read at the middle position of each window, NaNs sort to
+the end of their window. For full rolling series the median keeps the finite
+values of the current window in a sorted list, each step deletes the sample
+that leaves and inserts the one that enters with a binary search.
+
+The ambient wind around each ICME is taken in windows of given lengths
+before icme_start_time (upstream) and after mo_end_time (downstream).
+'''
+
+import bisect
+import numpy as np
+import pandas as pd
+
+from icmecat_results.data import load_insitu, time_num, data_path, insitu_files
+from icmecat_results.windows import event_indices, segment_indices, map_files
+
+
+ambient_channels=('bt','vt','np','tp')
+
+
+def prefix_sums(x):
+    '''cumulative sum of the finite values and their count, both with a leading 0'''
+    x=np.asarray(x,dtype=float)
+    ok=np.isfinite(x)
+    s=np.concatenate([[0.0],np.cumsum(np.where(ok,x,0.0))])
+    n=np.concatenate([[0],np.cumsum(ok)])
+    return s,n
+
+
+def window_means(prefix,start,end):
+    '''mean of the finite values and their number in the windows [start, end)'''
+    s,n=prefix
+    count=n[end]-n[start]
+    with np.errstate(divide='ignore',invalid='ignore'):
+        return (s[end]-s[start])/count,count
+
+
+def window_medians(x,start,end):
+    '''median of the finite values in every window [start, end), NaN for empty windows'''
+    x=np.asarray(x,dtype=float)
+    ind,seg=segment_indices(start,end)
+    v=x[ind]
+    bad=~np.isfinite(v)
+    #sorted by window, then finite before NaN, then by value
+    order=np.lexsort((np.where(bad,0.0,v),bad,seg))
+    v=v[order]
+    length=np.maximum(np.asarray(end)-np.asarray(start),0)
+    first=np.cumsum(length)-length
+    count=np.bincount(seg,weights=~bad,minlength=len(length)).astype(int)
+    lo=first+np.maximum(count-1,0)//2
+    hi=first+count//2
+    out=np.full(len(length),np.nan)
+    ok=count > 0
+    out[ok]=0.5*(v[lo[ok]]+v[hi[ok]])
+    return out
+
+
+def rolling_mean(x,window,center=True):
+    '''rolling mean over window samples of the finite values, NaN at the edges'''
+    prefix=prefix_sums(x)
+    n=len(prefix[1])-1
+    i=np.arange(n)
+    start=i-window//2 if center else i-window+1
+    end=start+window
+    ok=(start >= 0) & (end <= n)
+    out=np.full(n,np.nan)
+    out[ok]=window_means(prefix,start[ok],end[ok])[0]
+    return out
+
+
+def rolling_median(x,window,center=True):
+    '''rolling median over window samples of the finite values, NaN at the edges'''
+    x=np.asarray(x,dtype=float)
+    out=np.full(len(x),np.nan)
+    if len(x) < window:
+        return out
+    values=x.tolist()
+    finite=np.isfinite(x).tolist()
+    nan=float('nan')
+    w=sorted(v for v,f in zip(values[:window],finite[:window]) if f)
+    res=[]
+    for k in range(len(x)-window+1):
+        if k > 0:
+            if finite[k-1]:
+                del w[bisect.bisect_left(w,values[k-1])]
+            if finite[k+window-1]:
+                bisect.insort(w,values[k+window-1])
+        m=len(w)
+        res.append(0.5*(w[(m-1)//2]+w[m//2]) if m > 0 else nan)
+    offset=window//2 if center else window-1
+    out[offset:offset+len(res)]=res
+    return out
+
+
+def ambient_windows(t,ic,hours,gap=0.0):
+    '''
+    sample ranges (start, end) of the upstream and downstream windows of
+    hours length for all events, gap hours away from the ICME boundaries
+    '''
+    up_end=time_num(ic.icme_start_time.to_numpy())-gap/24
+    down_start=time_num(ic.mo_end_time.to_numpy())+gap/24
+    bounds=np.concatenate([up_end-hours/24,up_end,down_start,down_start+hours/24])
+    i=np.clip(event_indices(t,bounds)+1,0,len(t)).reshape(4,-1)
+    return (i[0],i[1]),(i[2],i[3])
+
+
+def ambient_data(data,ic,hours=(6,12,24),gap=0.0,channels=ambient_channels,tnum=None):
+    '''
+    upstream and downstream median, mean and sample count of every channel for
+    all events in ic and each window length, as dataframe with columns like
+    up_bt_median_6h; one prefix sum per channel serves all windows
+    '''
+    t=time_num(data.time) if tnum is None else tnum
+    out={}
+    for c in channels:
+        x=np.asarray(data[c],dtype=float)
+        prefix=prefix_sums(x)
+        for h in np.atleast_1d(hours):
+            for side,(start,end) in zip(['up','down'],ambient_windows(t,ic,h,gap)):
+                mean,count=window_means(prefix,start,end)
+                out[f'{side}_{c}_median_{h:g}h']=window_medians(x,start,end)
+                out[f'{side}_{c}_mean_{h:g}h']=mean
+                out[f'{side}_{c}_n_{h:g}h']=count
+    return pd.DataFrame(out)
+
+
+def _ambient_file(args):
+    sc,ic,path,files,hours,gap,channels=args
+    data=load_insitu(sc,path=path,files=files)
+    return ambient_data(data,ic,hours,gap,channels)
+
+
+def ambient_catalog(ic,hours=(6,12,24),gap=0.0,channels=ambient_channels,path=data_path,files=insitu_files,jobs=None):
+    '''
+    ambient baselines for every event with in situ data in files, one worker
+    per file; also the ratio of mo_bmean to the upstream median |B|
+    '''
+    parts=[]
+    for ind,res in map_files(_ambient_file,ic,(hours,gap,channels),path,files,jobs):
+        res.index=ind
+        parts.append(res)
+    res=pd.concat(parts).reindex(range(len(ic))) if parts else pd.DataFrame(index=range(len(ic)))
+    if 'bt' in channels:
+        for h in np.atleast_1d(hours):
+            res[f'mo_bmean_ratio_{h:g}h']=ic.mo_bmean.to_numpy()/res[f'up_bt_median_{h:g}h'].to_numpy()
+    res.insert(0,'icmecat_id',ic.icmecat_id.to_numpy())
+    return res
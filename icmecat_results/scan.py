@@ -0,0 +1,152 @@
+'''
+Parameter scan over the physics constants of Fig. 5.
+
+The solar field values (sunspot, quiet Sun, coronal loops), the Mann+ 2023
+solar wind model parameters asw and b0sw and the two exponents of the
+multipower model are taken from a grid; for every combination the
+multipower fit is done with the solar anchor point and the fit is evaluated
+at 1 Rs, 1.3 Rs, 16 Rs and 20 Rs. For fixed exponents the model is linear in
+a and a1, so each fit is an exact linear least squares solve, the same
+result as curve_fit(multipower, ..., method='lm') in the paper script.
+
+The catalog distances and fields go to the worker processes once through the
+pool initializer, each worker evaluates a chunk of configurations and the
+results are collected into one dataframe with one row per configuration.
+'''
+
+import itertools
+import multiprocessing
+import numpy as np
+import pandas as pd
+
+from icmecat_results import fits, mcmc
+
+
+rs=mcmc.rs
+gauss=mcmc.gauss
+
+#values of the paper, fields in Gauss
+defaults={'anchor':'sunspot',
+          'sunspot_b':2000.0,
+          'quiet_b':46.0,
+          'coronal_b':50.0,
+          'asw':1.538,
+          'b0sw':(2.51+0.78)/2,
+          'k1':-1.57,
+          'k2':-6.0}
+
+#distance of the solar points in Rs
+anchor_r={'sunspot':1.0,'quiet':1.0,'coronal':1.3}
+
+#distances in Rs where the fits are evaluated, and for the crossing with the solar wind model
+eval_r=(1.0,1.3,16.0,20.0)
+cross_r=np.logspace(0,np.log10(250),2000)
+
+scan_file='results/scan.p'
+
+
+def multipower(x,a,a1,k1=-1.57,k2=-6.0):
+    '''multipower of the paper script with free exponents'''
+    return a*x**k1+a1*x**k2
+
+
+def solar_wind(x,b0sw=defaults['b0sw'],asw=defaults['asw']):
+    '''Mann+ 2023 equation 16, x in Rs and b0sw in Gauss, returns Gauss'''
+    return b0sw*x/((asw**2+x**2)**(3/2))
+
+
+def fit_multipower(r,b,k1,k2):
+    '''
+    linear least squares a, a1 and their standard deviations for fixed exponents,
+    columns are scaled to unit norm before the solve
+    '''
+    x=np.stack([r**k1,r**k2],axis=-1)
+    norm=np.sqrt((x*x).sum(0))
+    p=np.linalg.lstsq(x/norm,b,rcond=None)[0]
+    p=p/norm
+    res=b-x@p
+    s2=(res@res)/(len(b)-2)
+    cov=s2*np.linalg.inv(x.T@x)
+    return p,np.sqrt(np.diag(cov))
+
+
+def parameter_grid(**values):
+    '''all combinations of the given values, other parameters at their defaults'''
+    names=list(defaults)
+    lists=[np.atleast_1d(values.pop(n,defaults[n])).tolist() for n in names]
+    if values:
+        raise ValueError('unknown parameters '+', '.join(values))
+    return pd.DataFrame(list(itertools.product(*lists)),columns=names)
+
+
+def evaluate(r,b,cfg):
+    '''fit and evaluation for one configuration (dict of the parameters), returns a dict'''
+    anchor_b=cfg[cfg['anchor']+'_b']*gauss
+    rr=np.append(r,anchor_r[cfg['anchor']]*rs)
+    bb=np.append(b,anchor_b)
+    (a,a1),(a_err,a1_err)=fit_multipower(rr,bb,cfg['k1'],cfg['k2'])
+    out=dict(cfg)
+    out.update({'a':a,'a1':a1,'a_err':a_err,'a1_err':a1_err})
+    for x in eval_r:
+        out[f'b_{x:g}rs']=multipower(x*rs,a,a1,cfg['k1'],cfg['k2'])/gauss
+        out[f'sw_{x:g}rs']=solar_wind(x,cfg['b0sw'],cfg['asw'])
+    out['ratio_sunspot']=out['b_1rs']/cfg['sunspot_b']
+    out['ratio_quiet']=out['b_1rs']/cfg['quiet_b']
+    out['ratio_coronal']=out['b_1.3rs']/cfg['coronal_b']
+
+    #first distance where the MO fit drops below the solar wind model
+    below=multipower(cross_r*rs,a,a1,cfg['k1'],cfg['k2'])/gauss < solar_wind(cross_r,cfg['b0sw'],cfg['asw'])
+    out['r_cross']=cross_r[np.argmax(below)] if below.any() else np.nan
+    return out
+
+
+_shared={}
+
+def _init(r,b):
+    _shared['r']=r
+    _shared['b']=b
+
+
+def _evaluate_chunk(cfgs):
+    return [evaluate(_shared['r'],_shared['b'],cfg) for cfg in cfgs]
+
+
+def run_scan(ic,grid,jobs=None,chunk=50,column='mo_bmean',rmin=0.0,rmax=6.0,file=None):
+    '''
+    evaluates every row of grid (from parameter_grid) on worker processes,
+    returns a dataframe with the parameters and results of each configuration
+    '''
+    sel=fits.fit_selection(ic,column,rmin,rmax)
+    r=ic.mo_sc_heliodistance.to_numpy()[sel].astype(float)
+    b=ic[column].to_numpy()[sel].astype(float)
+
+    cfgs=grid.to_dict('records')
+    tasks=[cfgs[i:i+chunk] for i in range(0,len(cfgs),chunk)]
+    if jobs==1:
+        _init(r,b)
+        res=[_evaluate_chunk(t) for t in tasks]
+    else:
+        with multiprocessing.Pool(jobs,initializer=_init,initargs=(r,b)) as pool:
+            res=pool.map(_evaluate_chunk,tasks)
+    table=pd.DataFrame([row for rows in res for row in rows])
+    if file is not None:
+        table.to_pickle(file)
+    return table
+
+
+def default_grid():
+    '''
+    ranges of the solar values given in the paper script and exponents around
+    the fit; for each anchor only its own solar value is varied, the others
+    do not change the fit
+    '''
+    solar={'sunspot_b':[1000.0,2000.0,3000.0],
+           'coronal_b':[1.0,50.0,100.0]}
+    grids=[]
+    for anchor in anchor_r:
+        field=anchor+'_b'
+        grids.append(parameter_grid(anchor=anchor,**{field:solar.get(field,defaults[field])},
+                                    b0sw=[0.78,(2.51+0.78)/2,2.51],
+                                    k1=[-1.7,-1.57,-1.45],
+                                    k2=[-7.0,-6.0,-5.0,-3.0]))
+    return pd.concat(grids,ignore_index=True)
@@ -0,0 +1,155 @@
+'''
+Catalog and in situ arrays in shared memory for worker processes.
+
+The parent process loads the catalog and the in situ files once and copies
+each column into a multiprocessing.shared_memory block. Workers get a small
+picklable spec (block name, shape, dtype) and attach to the blocks as
+read-only numpy views, so N workers need neither N copies in memory nor N
+loads of the pickle files.
+
+Object columns are converted on publishing: datetimes to datetime64[us],
+strings to fixed width unicode. In situ recarrays are shared as one
+structured block, together with their times as date numbers.
+
+    with shared.published(shared.insitu_arrays(['PSP'])) as spec:
+        with multiprocessing.Pool(4,initializer=shared.init_worker,initargs=(spec,)) as pool:
+            ...
+    #in the worker
+    psp=shared.views()['PSP']
+'''
+
+import sys
+import datetime
+import contextlib
+from multiprocessing import shared_memory, resource_tracker
+import numpy as np
+import pandas as pd
+
+from icmecat_results.data import load_insitu, time_num, data_path, insitu_files
+
+
+#views and attached blocks of the current worker process
+_views={}
+_blocks=[]
+
+
+def _column_dtype(a):
+    '''dtype an object array is converted to, datetimes or strings'''
+    first=next((x for x in a.ravel() if x is not None and x==x),None)
+    if isinstance(first,(datetime.datetime,np.datetime64,pd.Timestamp)):
+        return np.dtype('M8[us]')
+    if isinstance(first,str):
+        return np.dtype(str)
+    return np.dtype(float)
+
+
+def shareable(a):
+    '''a as array without object fields, structured arrays keep their fields'''
+    a=np.asarray(a)
+    if a.dtype.names is not None:
+        if not any(a.dtype[n].kind=='O' for n in a.dtype.names):
+            return a
+        fields=[]
+        for n in a.dtype.names:
+            dt=a.dtype[n]
+            if dt.kind=='O':
+                dt=_column_dtype(a[n])
+                if dt.kind=='U':
+                    dt=np.asarray(a[n].astype(str)).dtype
+            fields.append((n,dt))
+        out=np.empty(a.shape,dtype=fields)
+        for n in a.dtype.names:
+            out[n]=np.asarray(a[n].tolist(),dtype=out.dtype[n]) if a.dtype[n].kind=='O' else a[n]
+        return out
+    if a.dtype.kind=='O':
+        dt=_column_dtype(a)
+        if dt.kind=='M':
+            return np.asarray(pd.to_datetime(pd.Series(a.ravel())).to_numpy(dtype='M8[us]')).reshape(a.shape)
+        return np.asarray(a.astype(str) if dt.kind=='U' else a.astype(float))
+    return a
+
+
+def publish(arrays):
+    '''
+    copies the arrays (dict name: array) into new shared memory blocks,
+    returns the spec for attach and the blocks to release
+    '''
+    spec={}
+    blocks=[]
+    for name,a in arrays.items():
+        a=shareable(a)
+        block=shared_memory.SharedMemory(create=True,size=max(a.nbytes,1))
+        blocks.append(block)
+        np.ndarray(a.shape,dtype=a.dtype,buffer=block.buf)[...]=a
+        spec[name]=(block.name,a.shape,a.dtype,a.dtype.names is not None,_tracker_pid())
+    return spec,blocks
+
+
+def _tracker_pid():
+    return getattr(resource_tracker._resource_tracker,'_pid',None)
+
+
+def release(blocks):
+    '''closes and removes the blocks of publish'''
+    for block in blocks:
+        block.close()
+        block.unlink()
+
+
+@contextlib.contextmanager
+def published(arrays):
+    '''publish as context manager, the blocks are released at the end'''
+    spec,blocks=publish(arrays)
+    try:
+        yield spec
+    finally:
+        release(blocks)
+
+
+def attach(spec):
+    '''read-only views (dict name: array) on the blocks of a spec'''
+    views={}
+    for name,(block_name,shape,dtype,rec,tracker) in spec.items():
+        if sys.version_info >= (3,13):
+            block=shared_memory.SharedMemory(name=block_name,track=False)
+        else:
+            block=shared_memory.SharedMemory(name=block_name)
+            #the publisher owns the block; pool workers share its resource tracker,
+            #other processes must not let their own tracker remove the block at exit
+            if _tracker_pid()!=tracker:
+                resource_tracker.unregister(block._name,'shared_memory')
+        _blocks.append(block)
+        a=np.ndarray(shape,dtype=dtype,buffer=block.buf)
+        a.flags.writeable=False
+        views[name]=a.view(np.recarray) if rec else a
+    return views
+
+
+def init_worker(spec):
+    '''pool initializer, attaches the worker to all arrays of spec'''
+    _views.update(attach(spec))
+
+
+def views():
+    '''arrays attached in this worker by init_worker'''
+    return _views
+
+
+def catalog_arrays(ic,prefix='ic/'):
+    '''all catalog columns, with the prefix in the names'''
+    return {prefix+c:ic[c].to_numpy() for c in ic.columns}
+
+
+def catalog_frame(views,prefix='ic/'):
+    '''the catalog as dataframe on the shared columns'''
+    return pd.DataFrame({k[len(prefix):]:v for k,v in views.items() if k.startswith(prefix)},copy=False)
+
+
+def insitu_arrays(sc_list,path=data_path,files=insitu_files):
+    '''in situ recarray and its date numbers for each spacecraft, names sc and sc/tnum'''
+    arrays={}
+    for sc in sc_list:
+        data=shareable(load_insitu(sc,path=path,files=files)).view(np.recarray)
+        arrays[sc]=data
+        arrays[sc+'/tnum']=time_num(data.time)
+    return arrays
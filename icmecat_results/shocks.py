@@ -0,0 +1,167 @@
+'''
+Pre-screening of the whole PSP and Solar Orbiter series for fast forward shocks.
+
+At every step-th sample t the mean of |B|, V, N and T in the window of
+window minutes before t is compared with the window after t, leaving out
+gap minutes on both sides of t. Window means come from prefix sums of the
+finite values (rolling.prefix_sums), so all test times of a chunk are
+evaluated at once with a few array operations. A test time is a candidate
+when it meets the criteria of fast forward shocks used for the IPshocks
+list (Kilpua et al. 2015):
+
+    B_after / B_before >= 1.2, N_after / N_before >= 1.2,
+    T_after / T_before >= 1/1.2, V_after - V_before >= 20 km/s
+
+Consecutive candidates within merge minutes are one jump, at the time of
+the largest |B| ratio. The series is shared once with all workers
+(shared.py) and cut into chunks of chunk_days with overlapping margins,
+so memory per worker is bounded by the chunk size.
+
+match_catalog checks the candidates against the event intervals of the
+ICMECAT: candidates at icme_start_time, inside a listed event, or outside
+of all events (new candidates to look at).
+'''
+
+import multiprocessing
+import numpy as np
+import pandas as pd
+import matplotlib.dates as mdates
+
+from icmecat_results import shared
+from icmecat_results.data import time_num, data_path, insitu_files
+from icmecat_results.gaps import data_cadence
+from icmecat_results.rolling import prefix_sums, window_means
+
+
+#fast forward shock criteria
+min_b_ratio=1.2
+min_n_ratio=1.2
+min_t_ratio=1/1.2
+min_v_jump=20.0
+
+jump_channels=('bt','vt','np','tp')
+
+columns=['time','b_before','b_after','b_ratio','n_ratio','t_ratio','v_jump']
+
+
+def jumps(data,tnum,test,window,gap,min_samples):
+    '''
+    before and after means around the sample indices test for windows of
+    window samples at gap samples from the test time, dict of arrays
+    '''
+    n=len(tnum)
+    b0=np.clip(test-gap-window,0,n)
+    b1=np.clip(test-gap,0,n)
+    a0=np.clip(test+gap+1,0,n)
+    a1=np.clip(test+gap+1+window,0,n)
+    out={}
+    for c in jump_channels:
+        prefix=prefix_sums(data[c])
+        before,nb=window_means(prefix,b0,b1)
+        after,na=window_means(prefix,a0,a1)
+        few=(nb < min_samples) | (na < min_samples)
+        out[c]=(np.where(few,np.nan,before),np.where(few,np.nan,after))
+    return out
+
+
+def screen_series(data,tnum,window=60,gap=5,step=1,merge=120,min_coverage=0.5,start=0,end=None):
+    '''
+    candidates in the samples [start, end) of the recarray data, with window,
+    gap and merge in minutes; dataframe with the date number of each jump and
+    the ratios of the criteria
+    '''
+    cadence=data_cadence(tnum)*1440
+    w=max(int(round(window/cadence)),1)
+    g=int(round(gap/cadence))
+    end=len(tnum) if end is None else end
+    test=np.arange(start,end,step)
+    m=jumps(data,tnum,test,w,g,max(int(min_coverage*w),1))
+
+    with np.errstate(divide='ignore',invalid='ignore'):
+        b_ratio=m['bt'][1]/m['bt'][0]
+        n_ratio=m['np'][1]/m['np'][0]
+        t_ratio=m['tp'][1]/m['tp'][0]
+        v_jump=m['vt'][1]-m['vt'][0]
+        ok=(b_ratio >= min_b_ratio) & (n_ratio >= min_n_ratio) & (t_ratio >= min_t_ratio) & (v_jump >= min_v_jump)
+    k=np.where(ok)[0]
+    res=pd.DataFrame({'time':tnum[test[k]],'b_before':m['bt'][0][k],'b_after':m['bt'][1][k],
+                      'b_ratio':b_ratio[k],'n_ratio':n_ratio[k],'t_ratio':t_ratio[k],'v_jump':v_jump[k]})
+    return merge_candidates(res,merge)
+
+
+def merge_candidates(res,merge=120):
+    '''one row for each group of candidates less than merge minutes apart, the one with the largest |B| ratio'''
+    if len(res)==0:
+        return res
+    res=res.sort_values('time').reset_index(drop=True)
+    group=np.concatenate([[0],np.cumsum(np.diff(res.time.to_numpy()) > merge/1440)])
+    best=res.assign(group=group).groupby('group').b_ratio.idxmax().to_numpy()
+    return res.loc[best].reset_index(drop=True)
+
+
+def _screen_chunk(args):
+    sc,start,end,window,gap,step,merge,min_coverage=args
+    data=shared.views()[sc]
+    tnum=shared.views()[sc+'/tnum']
+    #margins so that the windows of the chunk edges are complete
+    cadence=data_cadence(tnum)*1440
+    margin=int(round((window+gap)/cadence))+1
+    i0=max(start-margin,0)
+    i1=min(end+margin,len(tnum))
+    return screen_series(data[i0:i1],tnum[i0:i1],window,gap,step,merge,min_coverage,start-i0,end-i0)
+
+
+def screen(sc_list=('PSP','SolarOrbiter'),window=60,gap=5,step=1,merge=120,min_coverage=0.5,chunk_days=30,path=data_path,files=insitu_files,jobs=None):
+    '''
+    fast forward shock candidates in the whole in situ series of the
+    spacecraft in sc_list, chunks of chunk_days on worker processes;
+    dataframe with sc_insitu, the candidate time as datetime and the ratios
+    '''
+    parts=[]
+    arrays=shared.insitu_arrays(sc_list,path=path,files=files)
+    with shared.published(arrays) as spec:
+        tasks=[]
+        for sc in sc_list:
+            tnum=arrays[sc+'/tnum']
+            edges=np.searchsorted(tnum,np.arange(tnum[0],tnum[-1]+chunk_days,chunk_days))
+            edges[-1]=len(tnum)
+            tasks+=[(sc,a,b,window,gap,step,merge,min_coverage) for a,b in zip(edges[:-1],edges[1:]) if b > a]
+        with multiprocessing.Pool(jobs,initializer=shared.init_worker,initargs=(spec,)) as pool:
+            for task,res in zip(tasks,pool.imap(_screen_chunk,tasks)):
+                parts.append(res.assign(sc_insitu=task[0]))
+    res=pd.concat(parts,ignore_index=True) if parts else pd.DataFrame(columns=columns+['sc_insitu'])
+    #jumps at chunk edges are found in both chunks
+    res=pd.concat([merge_candidates(g,merge) for sc,g in res.groupby('sc_insitu')],ignore_index=True) if len(res) else res
+    res.insert(0,'sc_insitu',res.pop('sc_insitu'))
+    epoch=np.datetime64(mdates.get_epoch())
+    res['time']=(epoch+np.round(res.time.to_numpy(dtype=float)*86400e6).astype('timedelta64[us]')).astype('M8[us]')
+    return res
+
+
+def match_catalog(res,ic,tol=2.0,sc_list=('PSP','SolarOrbiter')):
+    '''
+    adds to the candidates the icmecat_id of the event whose interval
+    icme_start_time - tol hours to mo_end_time contains them and the match
+    'icme_start' (within tol hours of icme_start_time), 'inside' or 'none';
+    also returns the catalog events of the spacecraft in sc_list without a
+    candidate at icme_start_time
+    '''
+    res=res.copy()
+    res['icmecat_id']=None
+    res['match']='none'
+    found=set()
+    for sc,g in res.groupby('sc_insitu'):
+        ev=ic[ic.sc_insitu==sc].sort_values('icme_start_time')
+        start=time_num(ev.icme_start_time.to_numpy())
+        end=time_num(ev.mo_end_time.to_numpy())
+        t=time_num(g.time.to_numpy())
+        #last event starting before each candidate, within the tolerance
+        k=np.searchsorted(start,t+tol/24,side='right')-1
+        ok=(k >= 0) & (t <= end[np.maximum(k,0)])
+        near=ok & (np.abs(t-start[np.maximum(k,0)]) <= tol/24)
+        ids=ev.icmecat_id.to_numpy()[np.maximum(k,0)]
+        res.loc[g.index[ok],'icmecat_id']=ids[ok]
+        res.loc[g.index[ok],'match']=np.where(near[ok],'icme_start','inside')
+        found.update(ids[near])
+    listed=ic[ic.sc_insitu.isin(sc_list) & ~ic.icmecat_id.isin(found)]
+    return res,listed
@@ -0,0 +1,202 @@
+'''
+Versioned store of ICMECAT releases.
+
+All releases share one columnar table of unique event rows: rows are
+compared by the hash of their values (pandas.util.hash_pandas_object) over
+the columns a release shares with the store, so an event that is the same
+in several releases is stored once, and a new release only appends its
+added and changed rows. Columns new in a release are filled in for the rows
+it reuses, earlier versions do not read them. Each version is an array of
+row numbers into the table plus its column list and the sha256 of the
+source file. Datetime columns are stored as datetime64[us], load_version
+gives back the catalog with the column types of the pickle file.
+
+As rows are deduplicated, two versions differ in an event exactly where its
+row numbers differ, so diff_versions finds added, removed and changed
+events by icmecat_id with a few array operations and compares column
+values (incremental.diff_catalogs) only for the changed events; columns
+added or removed between the versions are reported as well.
+
+    store=snapshots.load_store()
+    snapshots.add_version(store,23,'icmecat/HELIO4CAST_ICMECAT_v23_pandas.p')
+    snapshots.save_store(store)
+    ic=snapshots.as_of(store,24)
+'''
+
+import os
+import pickle
+import datetime
+import numpy as np
+import pandas as pd
+
+from icmecat_results import fits, incremental
+from icmecat_results.data import load_icmecat
+from icmecat_results.export import file_hash
+from icmecat_results.shared import shareable
+
+
+store_file='results/snapshots/icmecat_snapshots.p'
+
+
+def empty_store():
+    return {'columns':{},'kinds':{},'versions':{}}
+
+
+def load_store(file=store_file):
+    '''the store in file, an empty store if there is none'''
+    if not os.path.exists(file):
+        return empty_store()
+    return pickle.load(open(file,'rb'))
+
+
+def save_store(store,file=store_file):
+    os.makedirs(os.path.dirname(file),exist_ok=True)
+    pickle.dump(store,open(file,'wb'))
+
+
+def _kind(a):
+    '''storage kind and values of a catalog column, strings stay python objects'''
+    b=shareable(a)
+    if b.dtype.kind=='U':
+        return 'str',np.asarray(a,dtype=object)
+    return {'M':'datetime'}.get(b.dtype.kind,'value'),b
+
+
+def _missing(kind,n):
+    '''column values of rows that do not have the column'''
+    if kind=='datetime':
+        return np.full(n,np.datetime64('NaT'),dtype='M8[us]')
+    if kind=='str':
+        return np.full(n,None,dtype=object)
+    return np.full(n,np.nan)
+
+
+def row_hashes(columns):
+    '''one uint64 per row over the values of the columns (dict name: array)'''
+    return pd.util.hash_pandas_object(pd.DataFrame(columns,copy=False),index=False).to_numpy()
+
+
+def _n_rows(store):
+    return len(next(iter(store['columns'].values()))) if store['columns'] else 0
+
+
+def add_version(store,version,file=None,ic=None):
+    '''
+    adds the catalog of file (or the dataframe ic) as version; only rows not
+    yet in the store are appended; returns the number of new rows
+    '''
+    if ic is None:
+        ic=load_icmecat(file)[0]
+    n_old=_n_rows(store)
+    values={}
+    kinds={}
+    for c in ic.columns:
+        kinds[c],v=_kind(ic[c].to_numpy())
+        if c in store['columns']:
+            #column types can change between releases, e.g. int columns with NaN in a later one
+            old=store['columns'][c]
+            dtype=np.result_type(old,v) if n_old else v.dtype
+            store['columns'][c]=old.astype(dtype)
+            v=v.astype(dtype)
+        values[c]=v
+    shared=[c for c in ic.columns if c in store['columns']]
+
+    rows=np.full(len(ic),-1,dtype=np.int64)
+    if n_old and shared:
+        stored=row_hashes({c:store['columns'][c] for c in shared})
+        h=row_hashes({c:values[c] for c in shared})
+        order=np.argsort(stored,kind='stable')
+        k=np.clip(np.searchsorted(stored,h,sorter=order),0,n_old-1)
+        rows=np.where(stored[order[k]]==h,order[k],-1).astype(np.int64)
+    found=np.where(rows >= 0)[0]
+    new=np.where(rows < 0)[0]
+    #duplicate rows inside this release are stored once
+    _,first,inverse=np.unique(row_hashes(values)[new],return_index=True,return_inverse=True)
+    rows[new]=n_old+inverse.ravel()
+    add=new[first]
+
+    for c in ic.columns:
+        if c not in store['columns']:
+            col=_missing(kinds[c],n_old)
+            col=col.astype(np.result_type(col,values[c])) if n_old else col.astype(values[c].dtype)
+            #rows reused by this release get their values of the new column
+            col[rows[found]]=values[c][found]
+            store['columns'][c]=col
+            store['kinds'][c]=kinds[c]
+        store['columns'][c]=np.concatenate([store['columns'][c],values[c][add]])
+    for c in store['columns']:
+        if c not in ic.columns:
+            store['columns'][c]=np.concatenate([store['columns'][c],_missing(store['kinds'][c],len(add))])
+
+    store['versions'][version]={'rows':rows,'columns':list(ic.columns),
+                                'sha256':file_hash(file) if file is not None else None,
+                                'file':file,'added':datetime.datetime.now(datetime.timezone.utc).isoformat()}
+    return len(add)
+
+
+def versions(store):
+    return sorted(store['versions'])
+
+
+def load_version(store,version):
+    '''the catalog of version as dataframe, with the columns and column types of the source'''
+    v=store['versions'][version]
+    out={}
+    for c in v['columns']:
+        values=store['columns'][c][v['rows']]
+        #datetime.datetime objects as in the pickle files, NaT as None
+        out[c]=pd.Series(values.astype(object),dtype=object) if store['kinds'][c]=='datetime' else values
+    return pd.DataFrame(out)
+
+
+def as_of(store,version):
+    '''the catalog of the latest version at or before version'''
+    earlier=[v for v in versions(store) if v <= version]
+    if not earlier:
+        raise KeyError(f'no version at or before {version}, versions are {versions(store)}')
+    return load_version(store,earlier[-1])
+
+
+def diff_versions(store,old,new):
+    '''
+    added, removed and changed icmecat_ids from version old to new and the
+    changed-column flags of the changed events, as incremental.diff_catalogs,
+    and the lists of added and removed columns; only events with different
+    row numbers are compared column by column
+    '''
+    ids=store['columns']['icmecat_id']
+    ro=store['versions'][old]['rows']
+    rn=store['versions'][new]['rows']
+    old_ids=ids[ro]
+    new_ids=ids[rn]
+    added=new_ids[~np.isin(new_ids,old_ids)]
+    removed=old_ids[~np.isin(old_ids,new_ids)]
+    _,io,inew=np.intersect1d(old_ids,new_ids,assume_unique=True,return_indices=True)
+    changed=ro[io]!=rn[inew]
+
+    a=load_version(store,old).iloc[io[changed]]
+    b=load_version(store,new).iloc[inew[changed]]
+    _,_,changed,flags=incremental.diff_catalogs(a,b)
+    cold=store['versions'][old]['columns']
+    cnew=store['versions'][new]['columns']
+    added_columns=[c for c in cnew if c not in cold]
+    removed_columns=[c for c in cold if c not in cnew]
+    return added,removed,changed,flags,added_columns,removed_columns
+
+
+def fits_by_version(store,versions_list=None):
+    '''power law and log-log B(r) fits of the paper for each version, one row each'''
+    rows=[]
+    for version in versions_list or versions(store):
+        ic=load_version(store,version)
+        r=ic.mo_sc_heliodistance.to_numpy()
+        row={'version':version,'n_events':len(ic)}
+        for name,(column,rmin,rmax) in incremental.powerlaw_fits.items():
+            sel=fits.fit_selection(ic,column,rmin,rmax)
+            param,cov=fits.fit_powerlaw(r[sel],ic[column].to_numpy()[sel])
+            row.update({name+'_a':param[0],name+'_b':param[1],name+'_b_err':np.sqrt(cov[1,1]),name+'_n':int(sel.sum())})
+        for name,(column,rmin,rmax) in incremental.loglog_fits.items():
+            (k,_),cov=fits.linear_from_stats(fits.loglog_stats(ic,column,rmin,rmax))
+            row.update({name+'_k':k,name+'_k_err':np.sqrt(cov[0,0])})
+        rows.append(row)
+    return pd.DataFrame(rows)
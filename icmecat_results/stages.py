@@ -0,0 +1,180 @@
+'''
+Pipeline stages of the paper script for batch runs.
+
+Every stage is a function of one shared context dict, which holds the
+loaded inputs, the results of earlier stages and the run options (jobs,
+data_path for the in situ files, data.data_path if not set).
+Stages list the stages they need, run resolves them so each stage runs once
+and only when it is requested or needed by a requested stage.
+'''
+
+import time
+import numpy as np
+import matplotlib.pyplot as plt
+
+from icmecat_results import data, expansion, export, figures, gallery, mcmc, plots, quality, quantile, scan, shocks, windows
+
+
+def catalog(ctx):
+    ctx['ic'],ctx['h'],ctx['p']=data.load_icmecat(ctx.get('icmecat_file',data.icmecat_file))
+
+
+def insitu(ctx):
+    ctx['data']={sc:data.load_insitu(sc,path=ctx.get('data_path',data.data_path)) for sc in data.insitu_files}
+
+
+def positions(ctx):
+    ctx['pos']=data.load_positions()
+
+
+def stats(ctx):
+    ic=ctx['ic']
+    print('Number of events in ICMECAT',len(ic))
+    print('earliest and latest event time',np.min(ic.icme_start_time),np.max(ic.icme_start_time))
+    print(ic.sc_insitu.value_counts().to_string())
+
+
+def quality_scores(ctx):
+    ctx['ic']=quality.score_catalog(ctx['ic'],path=ctx.get('data_path',data.data_path),jobs=ctx['jobs'])
+    scored=np.isfinite(ctx['ic'].quality_score.to_numpy())
+    print(scored.sum(),'events scored, median quality_score',np.round(np.median(ctx['ic'].quality_score[scored]),3) if scored.any() else '-')
+    print(quality.refit(ctx['ic']).to_string(index=False))
+
+
+def aging(ctx):
+    ctx['expansion']=expansion.expansion_catalog(ctx['ic'],path=ctx.get('data_path',data.data_path),jobs=ctx['jobs'])
+    ctx['ic']=expansion.corrected_catalog(ctx['ic'],ctx['expansion'])
+    ctx['field']='mo_bmean_aged'
+    print(ctx['ic'].aging_source.value_counts().to_string())
+
+
+def fits(ctx):
+    ctx['results']=export.collect(ctx['ic'],min_quality=ctx.get('min_quality'),field=ctx.get('field','mo_bmean'))
+    for name,fit in ctx['results']['fits'].items():
+        err=np.sqrt(np.diag(fit['cov']))
+        print(f"{name:16s} {fit['attrs']['model']:10s} n={fit['attrs']['n']} param {np.round(fit['param'],4)} ± {np.round(err,4)}")
+
+
+def fig1(ctx):
+    figures.fig1(ctx['ic'],ctx['data']['PSP'],ctx['pos']['PSP'],ctx['pos']['SolarOrbiter'])
+
+
+def fig2(ctx):
+    figures.fig2(ctx['ic'],ctx['data']['SolarOrbiter'])
+
+
+def fig3(ctx):
+    fig=plots.plot_fig3(ctx['ic'],ctx['data']['PSP'])[0]
+    for ext in ['.png','.pdf']:
+        fig.savefig('results/fig3_psp_close'+ext)
+
+
+def fig4(ctx):
+    figures.fig4(ctx['ic'],ctx['results'])
+
+
+def fig5(ctx):
+    figures.fig5(ctx['ic'],ctx['results'],ctx['data']['PSP'],ctx['data']['SolarOrbiter'])
+
+
+def quantile_bands(ctx):
+    #same field and events as the fits
+    attrs=ctx['results']['fits']['powerlaw_bmean']['attrs']
+    ctx['quantiles']=quantile.loglog_quantiles(ctx['ic'],attrs['column'],min_quality=attrs.get('min_quality'))
+    for q,(k,d) in zip(quantile.quantiles,ctx['quantiles']):
+        print(f'{q:4.2f} quantile  B = {10**d:.4g} r^{k:.4f}')
+    figures.fig4_quantiles(ctx['ic'],ctx['results'],ctx['quantiles'])
+
+
+def export_results(ctx):
+    export.write_results(ctx['results'])
+
+
+def event_windows(ctx):
+    w=windows.extract_event_windows(ctx['ic'],path=ctx.get('data_path',data.data_path),jobs=ctx['jobs'])
+    windows.save_windows(w,ctx['ic'].icmecat_id)
+
+
+def event_gallery(ctx):
+    gallery.render_gallery(ctx['ic'],datapath=ctx.get('data_path',data.data_path),jobs=ctx['jobs'] or 4)
+
+
+def bayes(ctx):
+    ctx['mcmc']={}
+    for model in ['powerlaw','multipower']:
+        r,b=mcmc.catalog_data(ctx['ic'],model)
+        samples,acc=mcmc.run_chains(r,b,model,jobs=ctx['jobs'])
+        ctx['mcmc'][model]=samples
+        print(model,'acceptance',np.round(acc,3),'R-hat',np.round(mcmc.gelman_rubin(samples),4))
+        for name,post in mcmc.field_posterior(samples,model).items():
+            #over a distance range, the range of the medians and the outer 16/84 percentiles
+            med=post['median']
+            median=f'{med[0]:.4g}' if len(med)==1 else f'{med.min():.4g}-{med.max():.4g}'
+            print(f"  B at {name}: {median} [{post['p16'].min():.4g}, {post['p84'].max():.4g}] Gauss")
+
+
+def parameter_scan(ctx):
+    ctx['scan']=scan.run_scan(ctx['ic'],scan.default_grid(),jobs=ctx['jobs'],file=scan.scan_file)
+    print(len(ctx['scan']),'configurations saved as',scan.scan_file)
+
+
+def shock_screen(ctx):
+    res,missed=shocks.match_catalog(shocks.screen(path=ctx.get('data_path',data.data_path),jobs=ctx['jobs']),ctx['ic'])
+    ctx['shocks']=res
+    res.to_csv('results/shock_candidates.csv',index=False)
+    print(res.match.value_counts().to_string())
+    print(len(missed),'catalog events without a candidate at icme_start_time')
+
+
+#name: (function, stages it needs)
+stages={'catalog':(catalog,[]),
+        'insitu':(insitu,[]),
+        'positions':(positions,[]),
+        'stats':(stats,['catalog']),
+        'quality':(quality_scores,['catalog']),
+        'aging':(aging,['catalog']),
+        'fits':(fits,['catalog']),
+        'fig1':(fig1,['catalog','insitu','positions']),
+        'fig2':(fig2,['catalog','insitu']),
+        'fig3':(fig3,['catalog','insitu']),
+        'fig4':(fig4,['fits']),
+        'fig5':(fig5,['fits','insitu']),
+        'quantiles':(quantile_bands,['fits']),
+        'export':(export_results,['fits']),
+        'windows':(event_windows,['catalog']),
+        'gallery':(event_gallery,['catalog']),
+        'mcmc':(bayes,['catalog']),
+        'scan':(parameter_scan,['catalog']),
+        'shocks':(shock_screen,['catalog'])}
+
+#what runs without --stages, the paper script
+default=['stats','fig1','fig2','fig3','fig4','fig5','export']
+
+
+def resolve(names):
+    '''requested stages and their dependencies, each once, dependencies first'''
+    order=[]
+    def visit(name):
+        if name not in stages:
+            raise ValueError('unknown stage '+name+', available: '+', '.join(stages))
+        if name in order:
+            return
+        for dep in stages[name][1]:
+            visit(dep)
+        order.append(name)
+    for name in names:
+        visit(name)
+    return order
+
+
+def run(names=default,jobs=None,ctx=None):
+    '''runs the stages in names with their dependencies, returns the context'''
+    ctx={} if ctx is None else ctx
+    ctx.setdefault('jobs',jobs)
+    for name in resolve(names):
+        t0=time.time()
+        print('stage',name)
+        stages[name][0](ctx)
+        plt.close('all')
+        print(f'stage {name} done in {time.time()-t0:.1f} s')
+    return ctx
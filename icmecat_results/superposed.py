@@ -0,0 +1,111 @@
+'''
+Superposed epoch analysis over normalized magnetic obstacle time.
+
+The samples of each event are mapped to tau = (t - mo_start_time) /
+(mo_end_time - mo_start_time), so tau=0 is the MO start and tau=1 the MO end.
+All events of one data file are put on one axis by shifting event k by k*span,
+so a single np.interp per channel resamples every event onto the common grid.
+'''
+
+import warnings
+import numpy as np
+
+from icmecat_results.data import load_insitu, time_num, data_path, insitu_files
+from icmecat_results.windows import segment_indices
+
+
+tau_grid=np.linspace(-0.5,1.5,201)
+
+#distance bins in au, the PSP / SolO / MESSENGER+VEX / 1 au / outer heliosphere ranges
+distance_bins=np.array([0,0.2,0.4,0.6,0.8,1.1,6.0])
+
+
+def superpose(data,mo_start,mo_end,grid=tau_grid,channels=('bt',)):
+    '''
+    resamples the recarray data for all events onto the normalized MO time grid
+
+    returns array (n_events, len(channels), len(grid)), NaN where an event has no data
+    '''
+    t=time_num(data.time)
+    s=time_num(mo_start)
+    e=time_num(mo_end)
+    dur=e-s
+    valid=dur > 0
+    dur=np.where(valid,dur,1.0)
+    n=len(s)
+
+    #samples covering the grid range for each event
+    i0=np.searchsorted(t,s+grid[0]*dur,side='left')
+    i1=np.searchsorted(t,s+grid[-1]*dur,side='right')
+    i1=np.where(valid,i1,i0)
+    ind,seg=segment_indices(i0,i1)
+
+    tau=(t[ind]-s[seg])/dur[seg]
+    span=2*(grid[-1]-grid[0])+1
+    x=tau+seg*span
+    gx=(grid[None,:]+np.arange(n)[:,None]*span).ravel()
+
+    #grid points outside of the samples of an event are set to NaN
+    count=i1-i0
+    has=count > 0
+    first=np.cumsum(count)-count
+    lo=np.full(n,np.inf)
+    hi=np.full(n,-np.inf)
+    lo[has]=tau[first[has]]
+    hi[has]=tau[first[has]+count[has]-1]
+    outside=(grid[None,:] < lo[:,None]) | (grid[None,:] > hi[:,None])
+
+    out=np.full((n,len(channels),len(grid)),np.nan)
+    if len(ind)==0:
+        return out
+    for j,c in enumerate(channels):
+        y=np.interp(gx,x,data[c][ind]).reshape(n,len(grid))
+        y[outside]=np.nan
+        out[:,j,:]=y
+    return out
+
+
+def superpose_catalog(ic,grid=tau_grid,channels=('bt',),path=data_path,files=insitu_files):
+    '''superposed samples for all events in ic with an in situ data file, rows as in ic'''
+    out=np.full((len(ic),len(channels),len(grid)),np.nan)
+    sc_insitu=ic.sc_insitu.to_numpy()
+    for sc in files:
+        ind=np.where(sc_insitu==sc)[0]
+        if len(ind)==0:
+            continue
+        data=load_insitu(sc,path=path,files=files)
+        out[ind]=superpose(data,ic.mo_start_time.to_numpy()[ind],ic.mo_end_time.to_numpy()[ind],grid,channels)
+    return out
+
+
+def epoch_profiles(stack,r,bins=distance_bins,quantiles=(0.1,0.25,0.75,0.9)):
+    '''
+    mean, median and quantile profiles of stack (n_events, ..., n_grid) for
+    each heliocentric distance bin; returns a dict of arrays (n_bins, ..., n_grid)
+    and the number of events in each bin
+    '''
+    r=np.asarray(r)
+    ibin=np.digitize(r,bins)-1
+    nbins=len(bins)-1
+    shape=(nbins,)+stack.shape[1:]
+
+    res={'mean':np.full(shape,np.nan),'median':np.full(shape,np.nan),'n':np.zeros(nbins,dtype=int)}
+    for q in quantiles:
+        res[q]=np.full(shape,np.nan)
+
+    for k in range(nbins):
+        sel=stack[ibin==k]
+        #events without any data in this bin are not counted
+        sel=sel[~np.all(np.isnan(sel.reshape(len(sel),-1)),axis=1)]
+        res['n'][k]=len(sel)
+        if len(sel)==0:
+            continue
+        #grid points without data in all events of a bin stay NaN
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore',RuntimeWarning)
+            res['mean'][k]=np.nanmean(sel,axis=0)
+            res['median'][k]=np.nanmedian(sel,axis=0)
+            qs=np.nanquantile(sel,quantiles,axis=0)
+        for q,v in zip(quantiles,qs):
+            res[q][k]=v
+    return res
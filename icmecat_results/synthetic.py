@@ -0,0 +1,344 @@
+'''
+Synthetic ICME catalogs for testing the B(r) fits.
+
+Events are drawn with the heliocentric distance distribution of the real
+catalog and a known power law B = a r^b with log-normal scatter. Many
+catalogs are generated as one array (n_sets, n_events) and fitted at once
+with the batched fits, which shows whether the uneven distance sampling
+biases the recovered exponent, and doubles as a benchmark of the fit code.
+
+Synthetic in situ data stand in for the PSP and Solar Orbiter files in
+data/ and the positions file in positions/, which are not in the
+repository. The 1 minute recarrays have the fields and dtypes of the data
+files for the whole mission, with Kepler orbits of the mission phases, a
+Parker spiral field with sectors, recurrent fast streams, red noise
+turbulence, NaN runs as data gaps, and a sheath and a Lundquist flux rope at
+the times of every catalog event, with the mean field and speeds of the
+catalog. All samples are computed as arrays, a multi-year file takes
+seconds. The files have the size of the real ones, about 0.5 GB for PSP,
+and take about 3 GB of memory to load. write_insitu and write_positions
+save them under the file names of data.py, so all stages run offline:
+
+    ic=data.load_icmecat()[0]
+    synthetic.write_insitu(ic)
+    synthetic.write_positions()
+'''
+
+import os
+import time
+import pickle
+import datetime
+import numpy as np
+import scipy.signal
+import scipy.special
+import matplotlib.dates as mdates
+
+from icmecat_results import fits, fluxrope
+from icmecat_results.coords import sphere2cart
+from icmecat_results.data import data_path, insitu_files, positions_file, position_bodies
+from icmecat_results.windows import segment_indices
+
+
+#parameters close to the mean(B_MO) fit of the paper
+a_true=10.7
+b_true=-1.57
+
+
+def catalog_distances(ic,column='mo_bmean',rmin=0.0,rmax=6.0):
+    '''distances of the events used for the fits'''
+    sel=fits.fit_selection(ic,column,rmin,rmax)
+    return ic.mo_sc_heliodistance.to_numpy()[sel]
+
+
+def catalog_scatter(ic,column='mo_bmean',rmin=0.0,rmax=6.0):
+    '''standard deviation of ln(B) around the log-log fit of the catalog'''
+    (k,d),_=fits.linear_from_stats(fits.loglog_stats(ic,column,rmin,rmax))
+    sel=fits.fit_selection(ic,column,rmin,rmax)
+    res=np.log10(ic[column].to_numpy()[sel])-fits.linear(np.log10(ic.mo_sc_heliodistance.to_numpy()[sel]),k,d)
+    return np.std(res,ddof=2)*np.log(10)
+
+
+def synthetic_catalogs(r,n_sets=1,n_events=None,a=a_true,b=b_true,sigma=0.45,seed=None):
+    '''
+    n_sets synthetic catalogs with distances resampled from r and
+    B = a r^b exp(sigma N(0,1)); returns r and B of shape (n_sets, n_events)
+    '''
+    rng=np.random.default_rng(seed)
+    if n_events is None:
+        n_events=len(r)
+    rs=rng.choice(np.asarray(r),size=(n_sets,n_events),replace=True)
+    bs=fits.powerlaw(rs,a,b)*np.exp(sigma*rng.standard_normal((n_sets,n_events)))
+    return rs,bs
+
+
+def bias_study(ic,n_sets=1000,a=a_true,b=b_true,sigma=None,seed=None):
+    '''
+    recovered exponents of the power law and log-log fits for n_sets synthetic
+    catalogs with the real distance sampling; prints bias, the spread of the
+    exponents next to the mean error given by the fits, and runtime
+    '''
+    r=catalog_distances(ic)
+    if sigma is None:
+        sigma=catalog_scatter(ic)
+
+    t0=time.time()
+    rs,bs=synthetic_catalogs(r,n_sets,a=a,b=b,sigma=sigma,seed=seed)
+    t1=time.time()
+    p,cov=fits.fit_powerlaw_batch(rs,bs)
+    t2=time.time()
+    k,d,k_err,d_err=fits.fit_loglog_batch(rs,bs)
+    t3=time.time()
+
+    print(f'{n_sets} synthetic catalogs with {len(r)} events, sigma {sigma:.3f}')
+    print(f'generation {t1-t0:.3f} s, power law fits {t2-t1:.3f} s, log-log fits {t3-t2:.3f} s')
+    print(f'true exponent {b}')
+    print(f'power law fit exponent {np.mean(p[:,1]):.4f} ± {np.std(p[:,1]):.4f}, mean fit error {np.mean(np.sqrt(cov[:,1,1])):.4f}')
+    print(f'log-log fit exponent {np.mean(k):.4f} ± {np.std(k):.4f}, mean fit error {np.mean(k_err):.4f}')
+    return {'powerlaw':p,'powerlaw_cov':cov,'loglog':np.stack([k,d],axis=-1),'loglog_err':np.stack([k_err,d_err],axis=-1),'sigma':sigma}
+
+
+####synthetic in situ data and positions
+
+#mission phases: date of a perihelion, perihelion and aphelion in au, inclination to the solar equator in deg
+orbits={'PSP':[(datetime.datetime(2018,11,6),0.166,0.94,3.4),
+               (datetime.datetime(2020,1,29),0.130,0.87,3.4),
+               (datetime.datetime(2020,9,27),0.095,0.82,3.4),
+               (datetime.datetime(2021,4,29),0.074,0.78,3.4),
+               (datetime.datetime(2021,11,21),0.062,0.75,3.4),
+               (datetime.datetime(2023,9,27),0.053,0.73,3.4),
+               (datetime.datetime(2024,12,24),0.046,0.73,3.4)],
+        'SolarOrbiter':[(datetime.datetime(2020,6,15),0.52,1.02,3.0),
+                        (datetime.datetime(2022,3,26),0.32,1.00,4.0),
+                        (datetime.datetime(2025,3,31),0.29,0.91,17.0)],
+        'BepiColombo':[(datetime.datetime(2019,4,1),0.33,1.0,3.0)],
+        'STEREO-A':[(datetime.datetime(2020,1,1),0.955,0.967,7.3)],
+        'JUICE':[(datetime.datetime(2024,1,1),0.72,1.02,7.0)],
+        'Mercury':[(datetime.datetime(2020,1,1),0.307,0.467,3.4)],
+        'Venus':[(datetime.datetime(2020,1,1),0.718,0.728,3.9)],
+        'Mars':[(datetime.datetime(2020,1,1),1.381,1.666,5.7)],
+        'Jupiter':[(datetime.datetime(2023,1,21),4.95,5.46,6.1)],
+        'Saturn':[(datetime.datetime(2032,11,29),9.04,10.12,5.5)],
+        'Uranus':[(datetime.datetime(2050,8,19),18.3,20.1,6.5)],
+        'Neptune':[(datetime.datetime(2042,9,4),29.8,30.3,6.4)]}
+
+#Earth based bodies, HEEQ longitude in deg
+earth_longitudes={'Earth':0.0,'L4':60.0,'L5':-60.0}
+
+#start of the data files and default end of the synthetic series
+mission_start={'PSP':datetime.datetime(2018,10,6),'SolarOrbiter':datetime.datetime(2020,4,15)}
+data_end=datetime.datetime(2025,9,1)
+
+#ambient solar wind at 1 au
+b1au=5.0
+n1au=7.0
+t1au=8e4
+omega_sun=2*np.pi/(25.38*86400)
+au_km=1.495978707e8
+
+
+def kepler_orbit(t,t_peri,rp,ra,inclination):
+    '''
+    r [au], HEEQ lon and lat [rad] of a Kepler orbit at date numbers t,
+    prograde in the ecliptic, with perihelion at t_peri
+    '''
+    a=(rp+ra)/2
+    e=(ra-rp)/(ra+rp)
+    period=365.25*a**1.5
+    m=2*np.pi*((np.asarray(t)-t_peri)/period)
+    ecc=m.copy()
+    for it in range(8):
+        ecc-=(ecc-e*np.sin(ecc)-m)/(1-e*np.cos(ecc))
+    nu=2*np.arctan2(np.sqrt(1+e)*np.sin(ecc/2),np.sqrt(1-e)*np.cos(ecc/2))
+    r=a*(1-e*np.cos(ecc))
+    #HEEQ longitude is measured from the Earth, which moves with 1/365.25 per day
+    lon=nu-2*np.pi*(np.asarray(t)-t_peri)/365.25
+    lat=np.radians(inclination)*np.sin(nu)
+    return r,(lon+np.pi) % (2*np.pi)-np.pi,lat
+
+
+def body_orbit(body,t):
+    '''r [au], HEEQ lon and lat [rad] of a body at date numbers t, switching mission phases at aphelion'''
+    t=np.asarray(t,dtype=float)
+    if body in earth_longitudes:
+        #Earth about 1 au with the 7.25 deg tilt of the solar equator
+        phase=2*np.pi*(t-mdates.date2num(datetime.datetime(2020,6,6)))/365.25
+        r=1-0.0167*np.cos(2*np.pi*(t-mdates.date2num(datetime.datetime(2020,1,4)))/365.25)
+        return r,np.full(len(t),np.radians(earth_longitudes[body])),np.radians(7.25)*np.sin(phase)
+    phases=orbits[body]
+    out=np.empty((3,len(t)))
+    tp=np.array([mdates.date2num(p[0]) for p in phases])
+    periods=np.array([365.25*((p[1]+p[2])/2)**1.5 for p in phases])
+    switch=np.concatenate([[-np.inf],(tp-periods/2)[1:]])
+    k=np.searchsorted(switch,t,side='right')-1
+    for j,(tpj,rp,ra,inc) in enumerate(phases):
+        sel=k==j
+        if sel.any():
+            out[:,sel]=kepler_orbit(t[sel],tp[j],rp,ra,inc)
+    return out[0],out[1],out[2]
+
+
+def red_noise(rng,n,tau,sigma=1.0):
+    '''correlated noise with correlation length tau samples and standard deviation sigma (AR(1))'''
+    a=np.exp(-1/tau)
+    x=scipy.signal.lfilter([1.0],[1.0,-a],rng.standard_normal(n))
+    return sigma*x*np.sqrt(1-a*a)
+
+
+def nan_runs_mask(rng,n,fraction,mean_length):
+    '''boolean mask of random runs covering about fraction of n samples, exponential run lengths'''
+    runs=rng.poisson(fraction*n/mean_length)
+    start=rng.integers(0,n,runs)
+    end=np.minimum(start+np.ceil(rng.exponential(mean_length,runs)).astype(int),n)
+    count=np.cumsum(np.bincount(start,minlength=n+1)-np.bincount(end,minlength=n+1))[:n]
+    return count > 0
+
+
+insitu_dtype=[('time',object),('bx',float),('by',float),('bz',float),('bt',float),('vt',float),('np',float),
+              ('tp',float),('x',float),('y',float),('z',float),('r',float),('lat',float),('lon',float)]
+
+
+def _event_fields(rng,t,ic,bx,by,bz,vt,den,tp,r):
+    '''writes sheath and flux rope of the events in ic into the arrays, in place'''
+    icme_start=mdates.date2num(ic.icme_start_time.to_numpy())
+    mo_start=mdates.date2num(ic.mo_start_time.to_numpy())
+    mo_end=mdates.date2num(ic.mo_end_time.to_numpy())
+    i0=np.searchsorted(t,icme_start)
+    i1=np.searchsorted(t,mo_start)
+    i2=np.searchsorted(t,mo_end)
+    ne=len(ic)
+    bmean=ic.mo_bmean.to_numpy().astype(float)
+    bmean=np.where(np.isfinite(bmean),bmean,10.7*np.interp(mo_start,t,r)**-1.57)
+    vmo=ic.mo_speed_mean.to_numpy().astype(float)
+    vmo=np.where(np.isfinite(vmo),vmo,450.0)
+    vexp=np.nan_to_num(ic.mo_expansion_speed.to_numpy().astype(float))
+    vsh=ic.sheath_speed_mean.to_numpy().astype(float)
+    vsh=np.where(np.isfinite(vsh),vsh,vmo+30)
+    nmo=ic.mo_density_mean.to_numpy().astype(float)
+
+    #sheath: compressed, turbulent field and plasma
+    ind,seg=segment_indices(i0,i1)
+    if len(ind):
+        amb=np.sqrt(bx[ind]**2+by[ind]**2+bz[ind]**2)
+        scale=np.where(amb > 0,1.2*bmean[seg]/amb,1.0)
+        for comp in (bx,by,bz):
+            comp[ind]=comp[ind]*scale*(1+0.3*rng.standard_normal(len(ind)))
+        vt[ind]=vsh[seg]+10*rng.standard_normal(len(ind))
+        den[ind]*=2.5
+        tp[ind]*=2.0
+
+    #magnetic obstacle: Lundquist flux rope along the path, mean |B| as in the catalog
+    ind,seg=segment_indices(i1,i2)
+    if len(ind):
+        theta=rng.uniform(-60,60,ne)
+        phi=rng.uniform(0,360,ne)
+        p=rng.uniform(-0.6,0.6,ne)
+        h=rng.choice([-1.0,1.0],ne)
+        frac=(t[ind]-mo_start[seg])/np.maximum(mo_end-mo_start,1e-9)[seg]
+        z,x,y=fluxrope.axis_frame(theta[seg],phi[seg])
+        half=np.sqrt(1-p[seg]**2)
+        s=-half+2*half*frac
+        rho=np.sqrt(s*s+p[seg]**2)
+        e_phi=(s[:,None]*y-p[seg][:,None]*x)/np.maximum(rho,1e-12)[:,None]
+        b=scipy.special.j0(fluxrope.alpha*rho)[:,None]*z+h[seg][:,None]*scipy.special.j1(fluxrope.alpha*rho)[:,None]*e_phi
+        norm=np.linalg.norm(b,axis=-1)
+        b0=bmean/np.maximum(np.bincount(seg,weights=norm,minlength=ne)/np.maximum(np.bincount(seg,minlength=ne),1),1e-9)
+        b=b0[seg][:,None]*(b+0.08*rng.standard_normal((len(ind),3)))
+        bx[ind],by[ind],bz[ind]=b[:,0],b[:,1],b[:,2]
+        vt[ind]=vmo[seg]+vexp[seg]*(0.5-frac)+5*rng.standard_normal(len(ind))
+        den[ind]=np.where(np.isfinite(nmo[seg]),nmo[seg],0.5*den[ind])*(1+0.1*rng.standard_normal(len(ind)))
+        tp[ind]*=0.3
+
+
+def synthetic_insitu(sc,ic=None,start=None,end=data_end,seed=None,plasma_gaps=0.1,mag_gaps=0.01):
+    '''
+    1 minute recarray for spacecraft sc (a key of orbits) from start (mission
+    start) to end, with the fields and dtypes of the data files: time as
+    datetime, B in RTN [nT], vt [km/s], np [cm^-3], tp [K], x, y, z, r [au]
+    and lat, lon [deg] in HEEQ; with the events of sc in ic embedded;
+    plasma_gaps and mag_gaps are the fractions in NaN runs
+    '''
+    rng=np.random.default_rng(seed)
+    start=mission_start.get(sc,datetime.datetime(2020,1,1)) if start is None else start
+    n=int((end-start).total_seconds()//60)
+    time64=np.datetime64(start,'m')+np.arange(n).astype('timedelta64[m]')
+    t=mdates.date2num(time64)
+    #np.zeros fills the object field much faster than np.recarray
+    out=np.zeros(n,dtype=insitu_dtype).view(np.recarray)
+    out.time=time64.astype('M8[us]').astype(object)
+
+    #orbit every hour, interpolated to the samples
+    th=np.arange(t[0],t[-1]+1/24,1/24)
+    rh,lonh,lath=body_orbit(sc,th)
+    r=np.interp(t,th,rh)
+    lon=(np.interp(t,th,np.unwrap(lonh))+np.pi) % (2*np.pi)-np.pi
+    lat=np.interp(t,th,lath)
+    out.r=r
+    out.lon=np.degrees(lon)
+    out.lat=np.degrees(lat)
+    xyz=sphere2cart(r,lon,lat)
+    out.x,out.y,out.z=xyz[:,0],xyz[:,1],xyz[:,2]
+
+    #recurrent fast streams and the Parker spiral with two sectors per rotation
+    days=t-t[0]
+    rot=2*np.pi*days/27.27
+    vt=360+300*np.clip(np.sin(rot+rng.uniform(0,2*np.pi)),0,None)**4+red_noise(rng,n,600,25)
+    vt=np.maximum(vt,250)
+    polarity=np.sign(np.sin(2*rot+0.5*np.sin(rot)))
+    psi=np.arctan(omega_sun*r*au_km/vt)
+    bmag=b1au*r**-1.6*np.exp(red_noise(rng,n,120,0.25))
+    bx=polarity*bmag*np.cos(psi)+red_noise(rng,n,30,0.3)*bmag
+    by=-polarity*bmag*np.sin(psi)+red_noise(rng,n,30,0.3)*bmag
+    bz=red_noise(rng,n,30,0.3)*bmag
+    den=n1au*r**-2*(400/vt)*np.exp(red_noise(rng,n,240,0.3))
+    tp=t1au*r**-0.7*(vt/400)**2*np.exp(red_noise(rng,n,240,0.2))
+
+    if ic is not None:
+        ev=ic[(ic.sc_insitu==sc) & (ic.mo_end_time > start) & (ic.icme_start_time < end)]
+        _event_fields(rng,t,ev,bx,by,bz,vt,den,tp,r)
+
+    bad=nan_runs_mask(rng,n,mag_gaps,30)
+    out.bx,out.by,out.bz=[np.where(bad,np.nan,c) for c in (bx,by,bz)]
+    out.bt=np.sqrt(out.bx**2+out.by**2+out.bz**2)
+    bad=nan_runs_mask(rng,n,plasma_gaps,120)
+    out.vt=np.where(bad,np.nan,vt)
+    out.np=np.where(bad,np.nan,den)
+    out.tp=np.where(bad,np.nan,tp)
+    return out
+
+
+def synthetic_positions(start=datetime.datetime(2020,1,1),end=datetime.datetime(2030,1,1),bodies=position_bodies):
+    '''hourly position recarrays (time as date number, r [au], lon, lat [rad], x, y, z [au] in HEEQ) in the order of bodies'''
+    t=mdates.date2num(start)+np.arange(int((end-start).total_seconds()//3600))/24
+    out=[]
+    for body in bodies:
+        pos=np.recarray(len(t),dtype=[('time',float),('r',float),('lon',float),('lat',float),('x',float),('y',float),('z',float)])
+        pos.time=t
+        pos.r,pos.lon,pos.lat=body_orbit(body,t)
+        xyz=sphere2cart(pos.r,pos.lon,pos.lat)
+        pos.x,pos.y,pos.z=xyz[:,0],xyz[:,1],xyz[:,2]
+        out.append(pos)
+    return out
+
+
+def write_insitu(ic,path=data_path,files=insitu_files,end=data_end,seed=0,overwrite=False):
+    '''synthetic data files for all spacecraft in files, as [data, header] like the real files'''
+    os.makedirs(path,exist_ok=True)
+    for k,(sc,f) in enumerate(files.items()):
+        if os.path.exists(path+f) and not overwrite:
+            print(path+f,'exists, not overwritten')
+            continue
+        t0=time.time()
+        data=synthetic_insitu(sc,ic,end=end,seed=seed+k)
+        header='synthetic '+sc+' data from icmecat_results.synthetic, not for science'
+        pickle.dump([data,header],open(path+f,'wb'),protocol=pickle.HIGHEST_PROTOCOL)
+        print(f'{path+f}: {len(data)} samples in {time.time()-t0:.1f} s')
+
+
+def write_positions(file=positions_file,overwrite=False,**kwargs):
+    '''synthetic positions file with all bodies of data.position_bodies'''
+    if os.path.exists(file) and not overwrite:
+        print(file,'exists, not overwritten')
+        return
+    if os.path.dirname(file):
+        os.makedirs(os.path.dirname(file),exist_ok=True)
+    pickle.dump(synthetic_positions(**kwargs),open(file,'wb'),protocol=pickle.HIGHEST_PROTOCOL)
@@ -0,0 +1,118 @@
+'''
+Fixed-length feature windows for every ICMECAT event.
+
+Each event is resampled onto n_sheath samples from icme_start_time to
+mo_start_time and n_mo samples from mo_start_time to mo_end_time, for the
+channels below. One worker process per in situ data file loads its file once
+and resamples all events of that spacecraft with one np.interp per channel.
+
+The result is a single array (n_events, n_channels, n_samples) with rows in
+the same order as the catalog, rows of spacecraft without data stay NaN.
+'''
+
+import multiprocessing
+import numpy as np
+
+from icmecat_results.data import load_insitu, time_num, data_path, insitu_files
+
+
+channels=('bx','by','bz','bt','vt','np','tp')
+
+windows_file='results/event_windows.npy'
+
+
+def event_indices(time,t):
+    '''
+    index of the last sample before each time in t, vectorized version of
+    np.where(t > time)[0][-1] as used for the figures; -1 if t is before the data
+    '''
+    return np.searchsorted(time_num(time),time_num(t),side='left')-1
+
+
+def segment_indices(start,end):
+    '''
+    concatenated sample indices of the segments [start, end) and the segment
+    number of each sample, for reductions over many events without a loop
+    '''
+    n=np.maximum(np.asarray(end)-np.asarray(start),0)
+    seg=np.repeat(np.arange(len(n)),n)
+    offset=np.cumsum(n)-n
+    ind=np.arange(n.sum())-np.repeat(offset,n)+np.repeat(start,n)
+    return ind,seg
+
+
+def window_grid(ic,n_sheath=30,n_mo=70):
+    '''time grid (n_events, n_sheath+n_mo) in matplotlib date numbers'''
+    icme_start=time_num(ic.icme_start_time.to_numpy())
+    mo_start=time_num(ic.mo_start_time.to_numpy())
+    mo_end=time_num(ic.mo_end_time.to_numpy())
+
+    #sheath excludes mo_start_time, which is the first sample of the MO
+    fs=np.arange(n_sheath)/n_sheath
+    fm=np.linspace(0,1,n_mo)
+    sheath=icme_start[:,None]+fs[None,:]*(mo_start-icme_start)[:,None]
+    mo=mo_start[:,None]+fm[None,:]*(mo_end-mo_start)[:,None]
+    return np.hstack([sheath,mo])
+
+
+def resample_windows(data,grid,channels=channels):
+    '''linear resampling of the recarray data onto grid, NaN outside of the data'''
+    t=time_num(data.time)
+    flat=grid.ravel()
+    out=np.full((grid.shape[0],len(channels),grid.shape[1]),np.nan)
+    for j,c in enumerate(channels):
+        out[:,j,:]=np.interp(flat,t,data[c],left=np.nan,right=np.nan).reshape(grid.shape)
+    return out
+
+
+def map_files(func,ic,args=(),path=data_path,files=insitu_files,jobs=None):
+    '''
+    func for the events of each data file in files, one worker per file
+
+    func gets the tuple (sc, catalog rows of sc with a new index, path, files, *args);
+    returns a list of (row indices in ic, result), empty without events in files
+    '''
+    sc_insitu=ic.sc_insitu.to_numpy()
+    tasks=[]
+    rows=[]
+    for sc in files:
+        ind=np.where(sc_insitu==sc)[0]
+        if len(ind) > 0:
+            tasks.append((sc,ic.iloc[ind].reset_index(drop=True),path,files)+tuple(args))
+            rows.append(ind)
+    if len(tasks)==0:
+        return []
+    with multiprocessing.Pool(min(jobs or len(tasks),len(tasks))) as pool:
+        return list(zip(rows,pool.imap(func,tasks)))
+
+
+def _extract_file(args):
+    sc,ic,path,files,n_sheath,n_mo,channels=args
+    data=load_insitu(sc,path=path,files=files)
+    print('windows for',sc,len(ic),'events')
+    return resample_windows(data,window_grid(ic,n_sheath,n_mo),channels)
+
+
+def extract_event_windows(ic,n_sheath=30,n_mo=70,path=data_path,files=insitu_files,channels=channels,jobs=None):
+    '''
+    windows for all events in ic, one worker per data file in files
+
+    returns array (len(ic), len(channels), n_sheath+n_mo)
+    '''
+    windows=np.full((len(ic),len(channels),n_sheath+n_mo),np.nan)
+    for ind,w in map_files(_extract_file,ic,(n_sheath,n_mo,channels),path,files,jobs):
+        windows[ind]=w
+    return windows
+
+
+def save_windows(windows,ids,file=windows_file):
+    '''saves the window array and the icmecat_ids of its rows next to it'''
+    np.save(file,windows)
+    np.save(file.replace('.npy','_ids.npy'),np.asarray(ids,dtype=str))
+
+
+def load_windows(file=windows_file,mmap_mode='r'):
+    '''returns windows (memory mapped by default) and icmecat_ids'''
+    windows=np.load(file,mmap_mode=mmap_mode)
+    ids=np.load(file.replace('.npy','_ids.npy'))
+    return windows,ids
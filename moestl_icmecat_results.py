@@ -39,12 +39,8 @@
 import pickle 
 import numpy as np
 import pandas as pd
-import matplotlib
 import matplotlib.pyplot as plt
-import matplotlib.dates as mdates
-from matplotlib.ticker import MultipleLocator
 import seaborn as sns
-import datetime
 import os
 import scipy
 import copy
@@ -52,6 +48,9 @@ import astropy.constants as const
 from sunpy.time import parse_time
 from scipy.optimize import curve_fit
 
+from icmecat_results import export, figures
+from icmecat_results.plots import fig3_ids, plot_fig3
+
 
 #one solar radius in au
 rs=(const.R_sun/const.au).value
@@ -174,275 +173,27 @@ print('0.0685 au in solar radii', 0.0685/rs)
 # In[4]:
 
 
-sns.set_context("paper")     
-sns.set_style('whitegrid')
-
-fig=plt.figure(3,figsize=(14,10),dpi=100)
-
-###########################################################
-ax1=plt.subplot(221)
-ms=5
-al=0.8
-
-ax1.plot(ic.mo_start_time[ipsp],ic.mo_sc_heliodistance[ipsp],'o',c='black', alpha=al,ms=ms,label='Parker Solar Probe')
-ax1.plot(ic.mo_start_time[isol],ic.mo_sc_heliodistance[isol],'o',c='black',markerfacecolor='white', alpha=1.0,ms=ms,label='Solar Orbiter')
-ax1.plot(ic.mo_start_time[ibep],ic.mo_sc_heliodistance[ibep],'o',c='darkblue',markerfacecolor='lightgrey', alpha=al,ms=ms,label='BepiColombo')
-ax1.plot(ic.mo_start_time[imav],ic.mo_sc_heliodistance[imav],'o',c='orangered', alpha=al,ms=ms,label='MAVEN')
-ax1.plot(ic.mo_start_time[ista],ic.mo_sc_heliodistance[ista],'o',c='red', alpha=al,ms=ms, label='STEREO-A')
-
-ax1.plot(ic.mo_start_time[imes],ic.mo_sc_heliodistance[imes],'o',c='coral', alpha=al,ms=ms,label='MESSENGER')
-ax1.plot(ic.mo_start_time[ivex],ic.mo_sc_heliodistance[ivex],'o',c='orange', alpha=al,ms=ms,label='Venus Express')
-ax1.plot(ic.mo_start_time[istb],ic.mo_sc_heliodistance[istb],'o',c='royalblue', alpha=al,ms=ms,label='STEREO-B')
-ax1.plot(ic.mo_start_time[iwin],ic.mo_sc_heliodistance[iwin],'o',c='mediumseagreen', alpha=al,ms=ms,label='Wind')
-ax1.plot(ic.mo_start_time[ijun],ic.mo_sc_heliodistance[ijun],'o',c='black',markerfacecolor='yellow', alpha=1,ms=ms,label='Juno')
-ax1.plot(ic.mo_start_time[iuly],ic.mo_sc_heliodistance[iuly],'o',c='chocolate', alpha=al,ms=ms,label='Ulysses')
-
-ax1.set_ylabel('Heliocentric distance $r$ [au]')
-ax1.set_xlabel('Year')
-
-years = mdates.YearLocator(2)   
-ax1.xaxis.set_major_locator(years)
-myformat = mdates.DateFormatter('%Y')
-ax1.xaxis.set_major_formatter(myformat)
-
-#ax1.tick_params(axis="x", labelsize=12)
-#ax1.tick_params(axis="y", labelsize=12)
-
-ax1.set_xlim([datetime.datetime(1990,1,1),datetime.datetime(2025,12,1)])
-#ax1.legend(loc=1,fontsize=14)
-
-ax1.set_yticks(np.arange(0,6,0.5))
-ax1.set_ylim([0,5.5])
-
-
-##############################################################
-
-ax4=plt.subplot(222,projection='polar')
-
-ax4.plot(np.radians(ic.mo_sc_long_heeq[iuly]),ic.mo_sc_heliodistance[iuly],'o',markersize=ms,c='brown', alpha=al, label='Ulysses')
-ax4.plot(np.radians(ic.mo_sc_long_heeq[imav]),ic.mo_sc_heliodistance[imav],'o',markersize=ms,c='orangered', alpha=al, label='MAVEN')
-ax4.plot(np.radians(ic.mo_sc_long_heeq[imes]),ic.mo_sc_heliodistance[imes],'o',markersize=ms,c='coral', alpha=al,label='MESSENGER')
-ax4.plot(np.radians(ic.mo_sc_long_heeq[ivex]),ic.mo_sc_heliodistance[ivex],'o',markersize=ms,c='orange', alpha=al,label='Venus Express')
-ax4.plot(np.radians(ic.mo_sc_long_heeq[istb]),ic.mo_sc_heliodistance[istb],'o',markersize=ms,c='royalblue', alpha=al,label='STEREO-B')
-ax4.plot(np.radians(ic.mo_sc_long_heeq[ijun]),ic.mo_sc_heliodistance[ijun],'o',markersize=ms,c='black',markerfacecolor='yellow',alpha=al,label='Juno')
-ax4.plot(np.radians(ic.mo_sc_long_heeq[ista]),ic.mo_sc_heliodistance[ista],'o',markersize=ms, c='red', alpha=al, label='STEREO-A')
-ax4.plot(np.radians(ic.mo_sc_long_heeq[iwin]),ic.mo_sc_heliodistance[iwin],'o',markersize=ms, c='mediumseagreen', alpha=al, label='Wind')
-ax4.plot(np.radians(ic.mo_sc_long_heeq[ipsp]),ic.mo_sc_heliodistance[ipsp],'o',markersize=ms, c='black', alpha=al,label='Parker Solar Probe')
-ax4.plot(np.radians(ic.mo_sc_long_heeq[isol]),ic.mo_sc_heliodistance[isol],'o',markersize=ms, c='black',markerfacecolor='white', alpha=al, label='Solar Orbiter')
-ax4.plot(np.radians(ic.mo_sc_long_heeq[ibep]),ic.mo_sc_heliodistance[ibep],'o',markersize=ms, c='darkblue',markerfacecolor='lightgrey', alpha=al, label='BepiColombo')
-
-fsize=10
-frame='HEEQ'
-backcolor='white'
-plt.rgrids((0.1,0.2,0.3,0.4,0.6,0.8,1.0,1.2, 1.4,1.6,1.8,2.0),('','0.2','','0.4','0.6','0.8','1.0','1.2','1.4','','',''),angle=180, fontsize=fsize-4,alpha=0.8, ha='center',color=backcolor,zorder=5)
-plt.thetagrids(range(0,360,45),(u'0\u00b0',u'45\u00b0',u'90\u00b0',u'135\u00b0',u'±180\u00b0',u'- 135\u00b0',u'- 90\u00b0',u'- 45\u00b0'), fmt='%d',ha='center',fontsize=fsize,color=backcolor, zorder=5, alpha=1.0)
-
-ax4.set_ylim([0,1.6])
-ax4.text(0,0,'Sun', color='black', ha='center',fontsize=fsize-5,verticalalignment='top')
-ax4.text(0,1.1,'Earth', color='green', ha='center',fontsize=fsize-5,verticalalignment='center')
-ax4.scatter(0,0,s=100,c='yellow',alpha=1, edgecolors='black', linewidth=0.3)
-ax4.legend(bbox_to_anchor=(-0.35, 1.05),loc='upper left', fontsize=9)
-
-##############################################################
-ax2=plt.subplot(223)
+#plot functions in icmecat_results/figures.py, saved as png and pdf in results/
+fig=figures.fig1(ic,psp,psppos,solopos)
 
+#marker size and transparency of the scatter plots below
 ms=5
 al=0.7
 
-ax2.plot(ic.mo_start_time[iwin],ic.mo_sc_heliodistance[iwin],'o',c='mediumseagreen', alpha=al,ms=ms)
-ax2.plot(ic.mo_start_time[ista],ic.mo_sc_heliodistance[ista],'o',c='red', alpha=al,ms=ms)
-ax2.plot(ic.mo_start_time[ipsp],ic.mo_sc_heliodistance[ipsp],'o',c='black', alpha=al,ms=ms)
-ax2.plot(ic.mo_start_time[isol],ic.mo_sc_heliodistance[isol],'o',c='black',markerfacecolor='white', alpha=1.0,ms=ms)
-ax2.plot(ic.mo_start_time[ibep],ic.mo_sc_heliodistance[ibep],'o',c='darkblue',markerfacecolor='lightgrey', alpha=al,ms=ms)
-
-#from data
-#psp
-ax2.plot(psp.time,psp.r,'k-',alpha=0.5)   ###########******* dont double plot for the beginning ********
-ax2.plot(psppos.time,psppos.r,'k-',alpha=0.5)
-
-ax2.set_ylabel('Heliocentric distance $r$ [au]')
-ax2.set_yticks(np.arange(0,6,0.1))
-ax2.set_ylim([0,1.1])
-#ax1.tick_params(axis="y", labelsize=12)
-
-ax2.set_xlabel('Year')
-years = mdates.YearLocator(1)   # every year
-ax2.xaxis.set_major_locator(years)
-myformat = mdates.DateFormatter('%Y')
-ax2.xaxis.set_major_formatter(myformat)
-
-#ax1.tick_params(axis="x", labelsize=12)
-
-#ax1.set_xlim([datetime.datetime(2007,1,1),datetime.datetime.utcnow()+datetime.timedelta(days=50)])
-
-
-ax2.set_xlim([datetime.datetime(2018,1,1),datetime.datetime(2030,1,1)])
-
-
-
-##############################################################################
-ax3=plt.subplot(224)
-#plt.title('ICMECAT event times and latitude')
-ax3.set_xlabel('Year')
-ax3.set_ylabel('latitude HEEQ [degrees]')
-
-ax3.plot(ic.mo_start_time[iwin],ic.mo_sc_lat_heeq[iwin],'o',c='mediumseagreen', alpha=al,ms=ms, label='Wind')
-ax3.plot(ic.mo_start_time[ista],ic.mo_sc_lat_heeq[ista],'o',c='red', alpha=al,ms=ms, label='STEREO-A')
-ax3.plot(ic.mo_start_time[ipsp],ic.mo_sc_lat_heeq[ipsp],'o',c='black', alpha=al,ms=ms, label='Parker Solar Probe')
-ax3.plot(ic.mo_start_time[isol],ic.mo_sc_lat_heeq[isol],'o',c='black',markerfacecolor='white', alpha=1.0,ms=ms, label='Solar Orbiter')
-ax3.plot(ic.mo_start_time[ibep],ic.mo_sc_lat_heeq[ibep],'o',c='darkblue',markerfacecolor='lightgrey', alpha=al,ms=ms, label='BepiColombo')
-
-#solar orbiter
-ax3.plot(solopos.time,np.rad2deg(solopos.lat),'g-', alpha=0.5)
-
-ax3.set_xlim([datetime.datetime(2018,1,1),datetime.datetime(2030,1,1)])
-#ax3.set_xticks(np.arange(0,6,0.5))
-#ax3.tick_params(axis="x", labelsize=12)
-#ax3.set_xlim([0,5.6])
-
-#ax3.set_yscale('log')
-#ax3.set_ylim([0,np.max(ic.mo_bmean)+50])
-ax3.set_yticks(np.arange(-90,90,10))
-ax3.set_ylim([-40,40])
-#ax3.tick_params(axis="y", labelsize=12)
-
-ax3.set_xlabel('Year')
-years = mdates.YearLocator(1)   # every year
-ax3.xaxis.set_major_locator(years)
-myformat = mdates.DateFormatter('%Y')
-ax3.xaxis.set_major_formatter(myformat)
-ax3.legend(loc='upper left',fontsize=12)#, rows=2)
-
-################################
-
-plt.tight_layout()
-plt.annotate('(a)',xy=(0.02,0.97),xycoords='figure fraction',fontsize=13,ha='center')
-plt.annotate('(b)',xy=(0.49,0.97),xycoords='figure fraction',fontsize=13,ha='center')
-plt.annotate('(c)',xy=(0.02,0.48),xycoords='figure fraction',fontsize=13,ha='center')
-plt.annotate('(d)',xy=(0.49,0.48),xycoords='figure fraction',fontsize=13,ha='center')
-
-plt.savefig('results/fig1_icmecat_obs.png', dpi=150,bbox_inches='tight')
-plt.savefig('results/fig1_icmecat_obs.pdf', dpi=150,bbox_inches='tight')
-
 
 # ### Figure (2) Solar Orbiter example event April 2023
 
 # In[5]:
 
 
-sns.set_style('whitegrid')
-sns.set_context('paper')
-
-fig=plt.figure(figsize=(8,7), dpi=150)
-
 start=parse_time('2023-04-10 02:00').datetime
 end=parse_time('2023-04-10 20:00').datetime
-
-startind=np.where(start > solo.time)[0][-1]
-endind=np.where(end > solo.time)[0][-1]
-
-i=np.where(ic.icmecat_id=='ICME_SOLO_MOESTL_20230410_01')[0][0]
-
-sc=solo[startind:endind]
 print(start)
 print(end)
 
-lw=1.1
-
-###################################
-
-ax1 = plt.subplot(411) 
+fig=figures.fig2(ic,solo,'ICME_SOLO_MOESTL_20230410_01',start,end)
 
-ax1.plot(sc.time,sc.bx,'-r',label='$B_{R}$',linewidth=lw)
-ax1.plot(sc.time,sc.by,'-g',label='$B_{T}$',linewidth=lw)
-ax1.plot(sc.time,sc.bz,'-b',label='$B_{N}$',linewidth=lw)
-ax1.plot(sc.time,sc.bt,'-k',label='$|B|$',lw=lw)
-
-######## plot vertical lines
-ax1.plot([ic.icme_start_time[i],ic.icme_start_time[i]],[-500,500],'-k',linewidth=1)            
-ax1.plot([ic.mo_start_time[i],ic.mo_start_time[i]],[-500,500],'-k',linewidth=1)            
-ax1.plot([ic.mo_end_time[i],ic.mo_end_time[i]],[-500,500],'-k',linewidth=1)
-
-plt.ylabel('B [nT] RTN')
-plt.legend(loc=3,ncol=4,fontsize=9)
-ax1.set_xlim(start,end)
-ax1.xaxis.set_major_formatter(matplotlib.dates.DateFormatter('%b-%d') )
-ax1.set_yticks(np.arange(-200,200,50))
-ax1.set_ylim((-150, 150))
-
-#ax1.set_xticklabels([]) does not work with sharex
-#plt.setp(ax1.get_xticklabels(), fontsize=6)
-plt.setp(ax1.get_xticklabels(), visible=False)
-
-#########
-ax2 = plt.subplot(412,sharex=ax1) 
-ax2.plot(sc.time,sc.vt,'-k',label='V',linewidth=lw)
-
-plt.ylabel('V [km s$^{-1}$]')
-ax2.set_xlim(start,end)
-ax2.xaxis.set_major_formatter( matplotlib.dates.DateFormatter('%b-%d %H') )
-ax2.set_yticks(np.arange(0,1000,100))
-#ax2.tick_params(axis="y", labelsize=12)
-plt.ylim((250, 700))
-
-#ax2.set_xticklabels([])
-plt.setp(ax2.get_xticklabels(), visible=False)
-
-ax2.plot([ic.icme_start_time[i],ic.icme_start_time[i]],[0,3000],'-k',linewidth=1)            
-ax2.plot([ic.mo_start_time[i],ic.mo_start_time[i]],[0,3000],'-k',linewidth=1)            
-ax2.plot([ic.mo_end_time[i],ic.mo_end_time[i]],[0,3000],'-k',linewidth=1)     
-
-#########
-ax3 = plt.subplot(413,sharex=ax1) 
-ax3.plot(sc.time,sc.np,'-k',label='Np',linewidth=lw)
-
-plt.ylabel('N [ccm$^{-3}]$')
-ax3.set_xlim(start,end)
-ax3.xaxis.set_major_formatter( matplotlib.dates.DateFormatter('%b-%d %H') )
-plt.ylim((0, 1200))
-#ax3.set_xticklabels([])
-plt.setp(ax3.get_xticklabels(), visible=False)
-
-#plot vertical lines
-ax3.plot([ic.icme_start_time[i],ic.icme_start_time[i]],[0,10000],'-k',linewidth=1)
-ax3.plot([ic.mo_start_time[i],  ic.mo_start_time[i]],  [0,10000],'-k',linewidth=1)
-ax3.plot([ic.mo_end_time[i],ic.mo_end_time[i]],        [0,10000],'-k',linewidth=1)   
-
-
-#############
-ax4 = plt.subplot(414,sharex=ax1) 
-ax4.plot(sc.time,sc.tp/1e6,'-k',label='Tp',linewidth=lw)
-
-plt.ylabel('T [MK]')
-ax4.set_xlim(start,end)
-ax4.set_yticks(np.arange(0,1,0.1))
-ax4.xaxis.set_major_formatter( matplotlib.dates.DateFormatter('%b-%d %H:00') )
-plt.ylim((0, 0.8))
-
-#plot vertical lines
-ax4.plot([ic.icme_start_time[i],ic.icme_start_time[i]],[0,100],'-k',linewidth=1)            
-ax4.plot([ic.mo_start_time[i],ic.mo_start_time[i]],[0,100],'-k',linewidth=1)            
-ax4.plot([ic.mo_end_time[i],ic.mo_end_time[i]],[0,100],'-k',linewidth=1)            
-
-
-ax1.annotate('Solar Orbiter MAG',xy=(0.85,0.09),xycoords='axes fraction',fontsize=11,ha='center',bbox=dict(boxstyle='round', facecolor='white') )
-ax2.annotate('SWA/PAS',xy=(0.9,0.88),xycoords='axes fraction',fontsize=11,ha='center',bbox=dict(boxstyle='round', facecolor='white'))
-ax3.annotate('SWA/PAS',xy=(0.9,0.88),xycoords='axes fraction',fontsize=11,ha='center',bbox=dict(boxstyle='round', facecolor='white'))
-ax4.annotate('SWA/PAS',xy=(0.9,0.88),xycoords='axes fraction',fontsize=11,ha='center',bbox=dict(boxstyle='round', facecolor='white'))
-
-ax4.xaxis.set_minor_locator(mdates.HourLocator(interval=1))
-ax4.tick_params(which="both", bottom=True)
-ax4.xaxis.set_major_locator(mdates.HourLocator(interval=4))
-ax4.set_xlabel('Year 2023')
-
-plt.tight_layout()
-
-plotfile='results/fig2_solo_example.png'
-plt.savefig(plotfile)
-plotfile='results/fig2_solo_example.pdf'
-plt.savefig(plotfile)
-
-print('saved as ',plotfile)
+print('saved as ','results/fig2_solo_example.pdf')
 
 
 # ### Figure (3) PSP magnetic fields close-to-Sun observations
@@ -453,8 +204,6 @@ print('saved as ',plotfile)
 sns.set_style('whitegrid')
 sns.set_context('paper')
 
-fig=plt.figure(figsize=(12,10), dpi=150)
-
 #these are the 6 closest PSP events from above
 #462     ICME_PSP_MOESTL_20220905_01
 #494     ICME_PSP_MOESTL_20220602_01
@@ -463,194 +212,13 @@ fig=plt.figure(figsize=(12,10), dpi=150)
 #103     ICME_PSP_MOESTL_20241004_01
 #407     ICME_PSP_MOESTL_20230313_01
 
+#panels, boundaries and the minimum distance during the ICME come from the catalog and the data,
+#plot limits, tick intervals and panel labels are the published ones in plots.py
+fig,axes,fig3_rmin=plot_fig3(ic,psp)
 
-#extract PSP event data
-i1=np.where(ic.icmecat_id=='ICME_PSP_MOESTL_20220905_01')[0][0]
-starttime1=ic.icme_start_time[i1]
-endtime1=ic.mo_end_time[i1]
-startind1=np.where(starttime1 > psp.time)[0][-1]
-endind1=np.where(endtime1 > psp.time)[0][-1]
-sc1=psp[startind1-1000:endind1+1000]
-print('Event 1 min distance during ICME',np.round(np.min(psp.r[startind1:endind1]),4), ic.icmecat_id[i1])
-
-i2=np.where(ic.icmecat_id=='ICME_PSP_MOESTL_20220602_01')[0][0]
-starttime2=ic.icme_start_time[i2]
-endtime2=ic.mo_end_time[i2]
-startind2=np.where(starttime2 > psp.time)[0][-1]
-endind2=np.where(endtime2 > psp.time)[0][-1]
-sc2=psp[startind2-1000:endind2+1000]
-print('Event 2 min distance during ICME',np.round(np.min(psp.r[startind2:endind2]),4), ic.icmecat_id[i2])
-
-
-i3=np.where(ic.icmecat_id=='ICME_PSP_MOESTL_20210430_01')[0][0]
-starttime3=ic.icme_start_time[i3]
-endtime3=ic.mo_end_time[i3]
-startind3=np.where(starttime3 > psp.time)[0][-1]
-endind3=np.where(endtime3 > psp.time)[0][-1]
-sc3=psp[startind3-1500:endind3+1500]
-print('Event 3 min distance during ICME',np.round(np.min(psp.r[startind3:endind3]),4),ic.icmecat_id[i3])
-
-
-i4=np.where(ic.icmecat_id=='ICME_PSP_MOESTL_20241222_01')[0][0]
-starttime4=ic.icme_start_time[i4]
-endtime4=ic.mo_end_time[i4]
-startind4=np.where(starttime4 > psp.time)[0][-1]
-endind4=np.where(endtime4 > psp.time)[0][-1]
-sc4=psp[startind4-1500:endind4+1500]
-print('Event 4 min distance during ICME',np.round(np.min(psp.r[startind4:endind4]),4),ic.icmecat_id[i4])
-
-i5=np.where(ic.icmecat_id=='ICME_PSP_MOESTL_20241004_01')[0][0]
-starttime5=ic.icme_start_time[i5]
-endtime5=ic.mo_end_time[i5]
-startind5=np.where(starttime5 > psp.time)[0][-1]
-endind5=np.where(endtime5 > psp.time)[0][-1]
-sc5=psp[startind5-1500:endind5+1500]
-print('Event 5 min distance during ICME',np.round(np.min(psp.r[startind5:endind5]),4),ic.icmecat_id[i5])
-
-#i6=np.where(ic.icmecat_id=='ICME_PSP_MOESTL_20220912_01')[0][0]
-i6=np.where(ic.icmecat_id=='ICME_PSP_MOESTL_20230313_01')[0][0]
-starttime6=ic.icme_start_time[i6]
-endtime6=ic.mo_end_time[i6]
-startind6=np.where(starttime6 > psp.time)[0][-1]
-endind6=np.where(endtime6 > psp.time)[0][-1]
-sc6=psp[startind6-1500:endind6+1500]
-
-min6=np.round(np.min(psp.r[startind6:endind6]),4)
-print('Event 6 min distance during ICME',min6,ic.icmecat_id[i6])
-print(ic.mo_sc_heliodistance[i6])
-
-
-
-def plot_boundaries(ax,index):
-    #plot vertical lines
-    ax.axvline(ic.icme_start_time[index],color='black',linewidth=lw,alpha=al)
-    ax.axvline(ic.mo_start_time[index],color='black',linewidth=lw,alpha=al)
-    ax.axvline(ic.mo_end_time[index],color='black',linewidth=lw,alpha=al)
-
-lw=1.3
-al=0.7
-
-#################################
-ax1 = plt.subplot(321) 
-ax1.plot(sc1.time,sc1.bx,'-r',label='$B_{R}$',linewidth=lw)
-ax1.plot(sc1.time,sc1.by,'-g',label='$B_{T}$',linewidth=lw)
-ax1.plot(sc1.time,sc1.bz,'-b',label='$B_{N}$',linewidth=lw)
-ax1.plot(sc1.time,sc1.bt,'-k',label='$|B|$',lw=lw)
-ax1.set_ylabel('B [nT] RTN')
-ax1.xaxis.set_major_formatter( matplotlib.dates.DateFormatter('%b-%d %H:00') )
-ax1.annotate('PSP 2022 Sep 5',xy=(0.85,0.88),xycoords='axes fraction',fontsize=11,ha='center',bbox=dict(boxstyle='round', facecolor='white'))
-ax1.annotate('0.0632 au',xy=(0.85,0.08),xycoords='axes fraction',fontsize=11,ha='center',bbox=dict(boxstyle='round', facecolor='white'))
-plot_boundaries(ax1,i1)
-ax1.set_xlim(datetime.datetime(2022,9,5,13),datetime.datetime(2022,9,6,10))
-ax1.xaxis.set_major_locator(mdates.HourLocator(interval=4))
-ax1.xaxis.set_minor_locator(mdates.HourLocator(interval=1))
-ax1.tick_params(which="both", bottom=True)
-
-
-#################################
-ax2 = plt.subplot(322) 
-ax2.plot(sc2.time,sc2.bx,'-r',label='Bx',linewidth=lw)
-ax2.plot(sc2.time,sc2.by,'-g',label='By',linewidth=lw)
-ax2.plot(sc2.time,sc2.bz,'-b',label='Bz',linewidth=lw)
-ax2.plot(sc2.time,sc2.bt,'-k',label='Btotal',lw=lw)
-ax2.set_ylabel('B [nT] RTN')
-ax2.xaxis.set_major_formatter( matplotlib.dates.DateFormatter('%b-%d %Hh') )
-ax2.annotate('PSP 2022 Jun 2',xy=(0.85,0.88),xycoords='axes fraction',fontsize=11,ha='center',bbox=dict(boxstyle='round', facecolor='white'))
-ax2.annotate('0.0705 au',xy=(0.85,0.08),xycoords='axes fraction',fontsize=11,ha='center',bbox=dict(boxstyle='round', facecolor='white'))
-plot_boundaries(ax2,i2)
-ax2.set_xlim(datetime.datetime(2022,6,2,8),datetime.datetime(2022,6,2,18))
-ax2.xaxis.set_major_locator(mdates.HourLocator(interval=2))
-ax2.xaxis.set_minor_locator(mdates.HourLocator(interval=1))
-ax2.tick_params(which="both", bottom=True)
-
-#################################
-ax3 = plt.subplot(323) 
-
-ax3.plot(sc3.time,sc3.bx,'-r',label='$B_{R}$',linewidth=lw)
-ax3.plot(sc3.time,sc3.by,'-g',label='$B_{T}$',linewidth=lw)
-ax3.plot(sc3.time,sc3.bz,'-b',label='$B_{N}$',linewidth=lw)
-ax3.plot(sc3.time,sc3.bt,'-k',label='$|B|$',lw=lw)
-
-ax3.set_ylabel('B [nT] RTN')
-ax3.xaxis.set_major_formatter( matplotlib.dates.DateFormatter('%b-%d %Hh') )
-ax3.annotate('PSP 2021 Apr 30',xy=(0.85,0.88),xycoords='axes fraction',fontsize=11,ha='center',bbox=dict(boxstyle='round', facecolor='white'))
-ax3.annotate('0.0892 au',xy=(0.85,0.08),xycoords='axes fraction',fontsize=11,ha='center',bbox=dict(boxstyle='round', facecolor='white'))
-
-plot_boundaries(ax3,i3)
-ax3.set_xlim(datetime.datetime(2021,4,30,1),datetime.datetime(2021,4,30,18))
-ax3.xaxis.set_major_locator(mdates.HourLocator(interval=4))
-ax3.xaxis.set_minor_locator(mdates.HourLocator(interval=1))
-ax3.tick_params(which="both", bottom=True)
-
-
-#################################
-ax4 = plt.subplot(324) 
-ax4.plot(sc4.time,sc4.bx,'-r',label='Bx',linewidth=lw)
-ax4.plot(sc4.time,sc4.by,'-g',label='By',linewidth=lw)
-ax4.plot(sc4.time,sc4.bz,'-b',label='Bz',linewidth=lw)
-ax4.plot(sc4.time,sc4.bt,'-k',label='Btotal',lw=lw)
-
-ax4.set_ylabel('B [nT] RTN')
-ax4.xaxis.set_major_formatter( matplotlib.dates.DateFormatter('%b-%d %Hh') )
-ax4.annotate('PSP 2024 Dec 22',xy=(0.85,0.88),xycoords='axes fraction',fontsize=11,ha='center',bbox=dict(boxstyle='round', facecolor='white'))
-ax4.annotate('0.1354 au',xy=(0.85,0.08),xycoords='axes fraction',fontsize=11,ha='center',bbox=dict(boxstyle='round', facecolor='white'))
-
-plot_boundaries(ax4,i4)
-ax4.set_xlim(datetime.datetime(2024,12,22,1),datetime.datetime(2024,12,23,1))
-ax4.tick_params(which="both", bottom=True)
-ax4.xaxis.set_major_locator(mdates.HourLocator(interval=6))
-ax4.xaxis.set_minor_locator(mdates.HourLocator(interval=1))
-ax4.tick_params(which="both", bottom=True)
-
-
-#################################
-ax5 = plt.subplot(325) 
-ax5.plot(sc5.time,sc5.bx,'-r',label='Bx',linewidth=lw)
-ax5.plot(sc5.time,sc5.by,'-g',label='By',linewidth=lw)
-ax5.plot(sc5.time,sc5.bz,'-b',label='Bz',linewidth=lw)
-ax5.plot(sc5.time,sc5.bt,'-k',label='Btotal',lw=lw)
-
-ax5.set_ylabel('B [nT] RTN')
-ax5.xaxis.set_major_formatter( matplotlib.dates.DateFormatter('%b-%d %Hh') )
-ax5.annotate('PSP 2024 Oct 4',xy=(0.85,0.88),xycoords='axes fraction',fontsize=11,ha='center',bbox=dict(boxstyle='round', facecolor='white'))
-ax5.annotate('0.2056 au',xy=(0.85,0.08),xycoords='axes fraction',fontsize=11,ha='center',bbox=dict(boxstyle='round', facecolor='white'))
-
-plot_boundaries(ax5,i5)
-ax5.set_xlim(datetime.datetime(2024,10,4,1),datetime.datetime(2024,10,4,15))
-ax5.tick_params(which="both", bottom=True)
-ax5.xaxis.set_major_locator(mdates.HourLocator(interval=6))
-ax5.xaxis.set_minor_locator(mdates.HourLocator(interval=1))
-ax5.tick_params(which="both", bottom=True)
-
-
-#################################
-ax6 = plt.subplot(326) 
-ax6.plot(sc6.time,sc6.bx,'-r',label='Bx',linewidth=lw)
-ax6.plot(sc6.time,sc6.by,'-g',label='By',linewidth=lw)
-ax6.plot(sc6.time,sc6.bz,'-b',label='Bz',linewidth=lw)
-ax6.plot(sc6.time,sc6.bt,'-k',label='Btotal',lw=lw)
-
-ax6.set_ylabel('B [nT] RTN')
-ax6.xaxis.set_major_formatter( matplotlib.dates.DateFormatter('%b-%d %Hh') )
-ax6.annotate('PSP 2023 Mar 13',xy=(0.85,0.88),xycoords='axes fraction',fontsize=11,ha='center',bbox=dict(boxstyle='round', facecolor='white'))
-ax6.annotate('0.2187 au',xy=(0.85,0.08),xycoords='axes fraction',fontsize=11,ha='center',bbox=dict(boxstyle='round', facecolor='white'))
-
-plot_boundaries(ax6,i6)
-ax6.set_xlim(datetime.datetime(2023,3,13,5),datetime.datetime(2023,3,13,23))
-ax6.tick_params(which="both", bottom=True)
-ax6.xaxis.set_major_locator(mdates.HourLocator(interval=6))
-ax6.xaxis.set_minor_locator(mdates.HourLocator(interval=1))
-ax6.tick_params(which="both", bottom=True)
-
-##################
-plt.tight_layout()
-
-plt.annotate('(a)',xy=(0.02,0.97),xycoords='figure fraction',fontsize=13,ha='center')
-plt.annotate('(b)',xy=(0.50,0.97),xycoords='figure fraction',fontsize=13,ha='center')
-plt.annotate('(c)',xy=(0.02,0.64),xycoords='figure fraction',fontsize=13,ha='center')
-plt.annotate('(d)',xy=(0.50,0.64),xycoords='figure fraction',fontsize=13,ha='center')
-plt.annotate('(e)',xy=(0.02,0.32),xycoords='figure fraction',fontsize=13,ha='center')
-plt.annotate('(f)',xy=(0.50,0.32),xycoords='figure fraction',fontsize=13,ha='center')
+for k in range(len(fig3_ids)):
+    print('Event',k+1,'min distance during ICME',np.round(fig3_rmin[k],4), fig3_ids[k])
+print(ic.mo_sc_heliodistance[np.where(ic.icmecat_id==fig3_ids[-1])[0][0]])
 
 
 plotfile='results/fig3_psp_close.png'
@@ -1045,90 +613,10 @@ print()
 # In[12]:
 
 
-sns.set_context("talk")     
-sns.set_style('whitegrid')
-
-###############################################################################
-fig=plt.figure(3,figsize=(14,13),dpi=100)
+#fit parameters and plotted arrays of Figs. 4 and 5, the same fits as in the cells above
+res=export.collect(ic)
 
-
-gs = fig.add_gridspec(2, 2, hspace=0.3, wspace=0.3,height_ratios=[1.7, 1])
-
-##############################################################################
-ax = fig.add_subplot(gs[0, :])
-#plt.title('ICMECAT mean magnetic field in the magnetic obstacle')
-ax.set_xlabel('Heliocentric distance $R$ [au]')
-ax.set_ylabel('Magnetic field magnitude $B$ [nT]')
-
-ax.plot(ic.mo_sc_heliodistance[ipsp],ic.mo_bmean[ipsp],'o',c='black', alpha=al,ms=ms, label='Parker Solar Probe',zorder=3)
-ax.plot(ic.mo_sc_heliodistance[isol],ic.mo_bmean[isol],'o',c='black', markerfacecolor='white',alpha=al,ms=ms, label='Solar Orbiter',zorder=3)
-ax.plot(ic.mo_sc_heliodistance[ibep],ic.mo_bmean[ibep],'o',c='darkblue',markerfacecolor='lightgrey', alpha=al,ms=ms,label='BepiColombo')
-ax.plot(ic.mo_sc_heliodistance[iwin],ic.mo_bmean[iwin],'o',c='mediumseagreen', alpha=al,ms=ms,label='Wind')
-ax.plot(ic.mo_sc_heliodistance[ista],ic.mo_bmean[ista],'o',c='red', alpha=al,ms=ms, label='STEREO-A')
-
-ax.plot(ic.mo_sc_heliodistance[imes],ic.mo_bmean[imes],'o',c='coral', alpha=al,ms=ms,label='MESSENGER')
-ax.plot(ic.mo_sc_heliodistance[ivex],ic.mo_bmean[ivex],'o',c='orange', alpha=al,ms=ms,label='Venus Express')
-ax.plot(ic.mo_sc_heliodistance[iuly],ic.mo_bmean[iuly],'o',c='chocolate', alpha=al,ms=ms, label='Ulysses')
-ax.plot(ic.mo_sc_heliodistance[imav],ic.mo_bmean[imav],'o',c='orangered', alpha=al,ms=ms, label='MAVEN')
-ax.plot(ic.mo_sc_heliodistance[istb],ic.mo_bmean[istb],'o',c='royalblue', alpha=al,ms=ms, label='STEREO-B')
-ax.plot(ic.mo_sc_heliodistance[ijun],ic.mo_bmean[ijun],'o', c='black',markerfacecolor='yellow', alpha=al,ms=ms, label='Juno')
-ax.text(-0.08, 1.05, '(a)', transform=ax.transAxes, fontsize=16, fontweight='bold', va='top')
-
-
-au_axis=np.arange(0,5.5,0.2)
-ax.set_xticks(au_axis)
-#ax3.tick_params(axis="x", labelsize=12)
-ax.set_xlim([0,5.5])
-
-ax.set_ylim([1e-1,1*1e4])
-ax.set_yscale('log')
-
-########### plot fits
-ax.plot(fitx,powerlaw(fitx,param[0],param[1]),'-k', zorder=5, label='mean($B_{MO}$) fit')
-#with errors 2 std
-ax.plot(fitx,powerlaw(fitx,param[0]-2*perr[0],fit_lm[0][1])-2*perr[0],'-k',alpha=0.5, zorder=5)
-ax.plot(fitx,powerlaw(fitx,param[0]+2*perr[0],fit_lm[0][1])+2*perr[0],'-k',alpha=0.5, zorder=5)
-
-ax.plot(fitx,powerlaw(fitx,param2[0],param2[1]),'-.r', zorder=5, label='max($B_{MO}$) fit')
-
-formulastring=r'$\mathrm{mean}(B_{MO}(R)) = '+str(np.round(param[0],2))+r' \times R^{'+str(np.round(param[1],2))+'}$'
-ax.annotate(formulastring,xy=(0.403,0.73),xycoords='axes fraction',fontsize=15,ha='center',bbox=dict(boxstyle='round', facecolor='white'))
-
-formulastring=r'$\mathrm{max}(B_{MO}(R)) = '+str(np.round(param2[0],2))+r' \times R^{'+str(np.round(param2[1],2))+'}$'
-ax.annotate(formulastring,xy=(0.4,0.66),xycoords='axes fraction',fontsize=15,ha='center',bbox=dict(boxstyle='round', facecolor='white'))
-
-ax.legend(loc=1,fontsize=11)
-
-############### Bottom left plot
-ax2 = fig.add_subplot(gs[1, 0])
-ax2.plot(rmeanlog1,bmeanlog1,'o', markersize=1.5, alpha=0.9, color='dimgrey')
-ax2.plot(rmeanlog1,linear(rmeanlog1,k1,d1),'-k',linewidth=1)
-ax2.set_ylim(-0.5,3.1)
-ax2.set_xlabel(r'$\log_{10}(R \text{[au]})$')
-ax2.set_ylabel(r'$\log_{10}(B \text{[nT]})$')
-ax2.text(-0.15, 1.05, '(b)', transform=ax2.transAxes, fontsize=16, fontweight='bold', va='top')
-strd=f'{np.round(10**d1, 2):.2f}+'
-formulastring=r'$\mathrm{mean}(B_{MO}(R)) ='+strd+r' \times R^{'+str(np.round(k1,2))+'}$'
-ax2.annotate(formulastring,xy=(0.4,0.1),xycoords='axes fraction',fontsize=12,ha='center',bbox=dict(boxstyle='round', facecolor='white'))
-
-
-############### Bottom right plot
-ax3 = fig.add_subplot(gs[1, 1])
-ax3.plot(rmeanlog2,bmeanlog2,'o', markersize=1.5, alpha=0.9,color='dimgrey')
-ax3.plot(rmeanlog2,linear(rmeanlog2,k2,d2),'-k',linewidth=1)
-ax3.set_ylim(-0.5,3.1)
-ax3.set_xlabel(r'$\log_{10}(R \text{[au]})$')
-ax3.set_ylabel(r'$\log_{10}(B \text{[nT]})$')
-ax3.text(-0.15, 1.05, '(c)', transform=ax3.transAxes, fontsize=16, fontweight='bold', va='top')
-
-strd=f'{np.round(10**d2, 2):.2f}+'
-formulastring=r'$\mathrm{mean}(B_{MO}(R)) ='+strd+r' \times R^{'+str(np.round(k2,2))+'}$'
-ax3.annotate(formulastring,xy=(0.4,0.1),xycoords='axes fraction',fontsize=12,ha='center',bbox=dict(boxstyle='round', facecolor='white'))
-
-#plt.tight_layout()
-
-plt.savefig('results/fig4_br_mo.png', dpi=300,bbox_inches='tight')
-plt.savefig('results/fig4_br_mo.pdf', dpi=300,bbox_inches='tight')
+fig=figures.fig4(ic,res)
 
 
 # ## Figure (5) connecting to solar observations
@@ -1216,128 +704,13 @@ plt.xscale('log')
 # In[87]:
 
 
-sns.set_context("talk")     
-sns.set_style('whitegrid')
-
-###############################################################################
-fig=plt.figure(figsize=(15,9),dpi=100)
-
-ax=plt.subplot(111)
-#plt.title('ICME magnetic obstacle field compared to solar observations of active regions')
-ax.set_xlabel('Heliocentric distance $R$ [au]')
-ax.set_ylabel('$B$ [nT]')
-
-#plot psp data Btotal
-ax.plot(psp.r,psp.bt,color='mediumseagreen',linewidth=0.2, label='Parker Solar Probe |B|',alpha=0.9)
-#plot SolO data Btotal
-ax.plot(solo.r,solo.bt,color='lightblue',linewidth=0.2, label='Solar Orbiter |B|')
-
-ax.plot(ic.mo_sc_heliodistance[imes],ic.mo_bmean[imes],'o',c='coral', alpha=al,ms=ms,label='MESSENGER ICMEs')
-ax.plot(ic.mo_sc_heliodistance[ibep],ic.mo_bmean[ibep],'o',c='darkblue',markerfacecolor='lightgrey', alpha=al,ms=ms,label='BepiColombo ICMEs')
-ax.plot(ic.mo_sc_heliodistance[ipsp],ic.mo_bmean[ipsp],'o',c='black', alpha=1.0,ms=ms, label='Parker Solar Probe ICMEs',zorder=4)
-ax.plot(ic.mo_sc_heliodistance[isol],ic.mo_bmean[isol],'o',c='black', markerfacecolor='white',alpha=al,ms=ms, label='Solar Orbiter ICMEs')
-
-ax.set_xticks(np.arange(0,0.5,0.05))
-ax_max_x=0.33
-ax.set_xlim([0,ax_max_x])
-
-ax.set_yscale('log')
-ax.set_yticks([1,10,10**2,10**3,10**4,10**5,10**6,10**7,10**8,10**9])
-ax.set_ylim([0.1,10**9])
-
-ax.grid(True, which='both', zorder=2)
-
-##### create a second x-axis with solar radii
-ax1 = ax.twiny()
-ax1.set_xlabel('$R$ [R$_{\odot}$]', color='black')
-#plot something in the solar radii scale but do not show it
-ax1.plot(ic.mo_sc_heliodistance[ista]*scale, ic.mo_bmean[ista], '.',color=None)
-ax1_ticks=np.arange(0,ax_max_x*scale,5)
-ax1.set_xlim(0,ax_max_x*scale)
-ax1.set_xticks(ax1_ticks)
-#a 2nd axis grid is always in front of the data, for fix see bottom of https://github.com/matplotlib/matplotlib/issues/7984
-ax1.set_zorder(-1)
-ax.patch.set_visible(False)
-ax1.patch.set_visible(True)
-
-############## plot power law from fits, param is the bmean fit
-ax.plot(fitx,powerlaw(fitx,param[0],param[1]),'-k',label=r'$\langle B_{MO} \rangle$) fit, k= -1.57', zorder=3)
-#with errors 3 std
-#ax3.plot(fitx,powerlaw(fitx,param[0]-3*perr[0],fit_lm[0][1])-3*perr[0],'--k',alpha=0.5)
-#ax3.plot(fitx,powerlaw(fitx,param[0]+3*perr[0],fit_lm[0][1])+3*perr[0],'--k',alpha=0.5)
-
-############## combined multipole power law
-ax.plot(fitx,multipower(fitx,param10[0],param10[1]),color='tab:orange',linewidth=2,zorder=3, label='multipole fit, k1=-1.57, k2=-6')
-
-########### solar wind model
-ax.plot(fitx,Brsw2,color='tab:blue',linestyle='-.',label='solar wind model')
-
+fig=figures.fig5(ic,res,psp,solo)
 
-####### #start from quiet Sun
+#solar values, also used in the zoom below
+coronal_b=50*gauss #coronal loop field at 1.3 Rs, https://iopscience.iop.org/article/10.3847/2041-8213/ac0c84/pdf
 n3=-3
-const_quiet1=0.46
-ax.plot(fitx,powerlaw(fitx,const_quiet1,n3),color='tab:red',label='dipole field k=-3')
-
-#active region with n-3
-#const2=20
-#ax.plot(fitx,powerlaw(fitx,const2,n3),'-b',label='coronal decay k=-3')
-
-#active region with n-5
-#n5=-5
-#const3=5*1e-4
-#ax.plot(fitx,powerlaw(fitx,const3,n5),'-r',label='coronal decay k=-5')
-
-
-########################## add solar data points
-
-gauss=1e5 #1 Gauss= 10^5 nT
-#sunspot field strength at 1 solar radii
-#https://link.springer.com/article/10.1007/s11207-006-0265-4
-#average 2000 Gauss, or 0.2 Tesla, or 2 x 10^8 nT
-
-sunspot_dist=const.R_sun/const.au #1 Rs correct
-sunspot_b=2000*gauss              #general value for ARs fine?
-
-### add coronal magnetic field
-#https://iopscience.iop.org/article/10.3847/2041-8213/ac0c84/pdf
-coronal_dist=1.3*const.R_sun/const.au  
-coronal_b=50*gauss             
-
-ax.plot(sunspot_dist,sunspot_b,marker='s', markerfacecolor='white',markersize='10')
-#ax.plot(coronal_dist,coronal_b,marker='s', markerfacecolor='white',markersize='10')
-
-#quiet sun 46 Gauss
-quiet_dist1=1*rs   #1 Rs correct
-quiet_b1=46*gauss              
-ax.errorbar(quiet_dist1,quiet_b1,yerr=0,marker='s', markerfacecolor='white',markersize='10',capsize=5)
-
-#vertical lines
-ax.axvline(rs,linestyle='-', color='k', linewidth=0.9)
-#ax.axvline(17*rs,linestyle='-', color='blue', linewidth=0.8)
-#ax.axvline(3*rs,linestyle='--', color='k', linewidth=0.5)
-ax.axvspan(16*rs, 20*rs, alpha=0.2, color='skyblue')
-
+const_quiet1=0.46 #dipole field from the quiet Sun
 
-#PSP minimum orbit
-ax.axvline(np.min(psp.r),linestyle='-', color='b', linewidth=0.5)
-
-###################### plot annotations
-annotfs=13
-ax.annotate(r'9.87 R$_{\odot}$ PSP closest approach',xy=(psp_min+0.001,5*1e7),xycoords='data',fontsize=annotfs,ha='left')
-#ax.annotate('3 Rs',xy=(0.015,3*1e4),xycoords='data',fontsize=annotfs,ha='left')
-ax.annotate('1 R$_{\odot}$',xy=(0.0048,5*1e8),xycoords='data',fontsize=annotfs,ha='left')
-ax.annotate('16-20 R$_{\odot}$, Alfvén surface',xy=(20.1*rs,2*1e8),xycoords='data',fontsize=annotfs,ha='left')
-ax.annotate('Sunspots',xy=(0.005,1e8),xycoords='data',fontsize=annotfs,ha='left',zorder=2)
-#ax.annotate('Coronal loops',xy=(0.0065,3*1e6),xycoords='data',fontsize=annotfs,ha='left')
-ax.annotate('Quiet Sun',xy=(0.0065,3*1e6),xycoords='data',fontsize=annotfs,ha='left')
-
-ax.legend(fontsize=14,facecolor='white')
-ax.xaxis.set_minor_locator(MultipleLocator(0.01))
-ax.tick_params(which="both", bottom=True)
-#ax.set_minor_grid('off')
-ax.grid(False, which='minor')
-
-#########################
 print('value of power law at 1 Rs from in situ')
 print('predicted field by MO power law at 1 Rs',np.round(powerlaw(rs,param[0],param[1])/gauss,2), ' Gauss')
 print('sunspot field:', sunspot_b/gauss, 'Gauss ')
@@ -1346,12 +719,6 @@ print('coronal loop field:', coronal_b/gauss, 'Gauss ')
 print()
 
 
-plt.tight_layout()
-
-plt.savefig('results/fig5_br_mo_zoom.png', dpi=300,bbox_inches='tight')
-plt.savefig('results/fig5_br_mo_zoom.pdf', dpi=300,bbox_inches='tight')
-
-
 # #### same with zoom in on close-in solar distances, for trying out power laws
 
 # In[55]:
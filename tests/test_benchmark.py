@@ -0,0 +1,39 @@
+'''fit checks of the benchmark against the reference values of ICMECAT v23'''
+
+import os
+import copy
+import pytest
+
+from icmecat_results import benchmark, data, export
+
+
+repo=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope='module')
+def results():
+    ic=data.load_icmecat(os.path.join(repo,data.icmecat_file))[0]
+    return export.collect(ic)
+
+
+def test_v23_passes(results):
+    checks=benchmark.check_fits(results)
+    assert len(checks)==2*len(benchmark.reference)
+    assert checks.ok.all(), checks[~checks.ok].to_string()
+
+
+def test_shifted_parameter_fails(results):
+    res=copy.deepcopy(results)
+    err=benchmark.reference['powerlaw_bmean'][1][1]
+    res['fits']['powerlaw_bmean']['param'][1]+=2*benchmark.sigma_tol*err
+    checks=benchmark.check_fits(res)
+    failed=checks[~checks.ok]
+    assert list(zip(failed.fit,failed.param))==[('powerlaw_bmean',1)]
+
+
+def test_event_count_and_missing_fit_fail(results):
+    res=copy.deepcopy(results)
+    res['fits']['loglog_1au']['attrs']['n']+=1
+    del res['fits']['multipower']
+    checks=benchmark.check_fits(res)
+    assert set(checks.fit[~checks.ok])=={'loglog_1au','multipower'}